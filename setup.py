@@ -70,6 +70,7 @@ setup(
             'bardVideoCalibrationChecker=sksurgeryutils.ui.sksurgeryvideocalibrationchecker_command_line:main',
             'bardPivotCalibration=sksurgerycalibration.ui.pivot_calibration_command_line:main',
             'bardProcrustes=sksurgerybard.ui.bard_procrustes_command_line:main',
+            'bardBenchmark=sksurgerybard.ui.bard_benchmark_command_line:main',
             'sksurgerybard=sksurgerybard.ui.sksurgerybard_command_line:main',
         ],
     },
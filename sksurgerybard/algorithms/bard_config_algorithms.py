@@ -2,12 +2,17 @@
 
 """ Algorithms used by the B.A.R.D. """
 
+import os
 import numpy as np
 from sksurgerycalibration.video.video_calibration_params import \
         MonoCalibrationParams
 from sksurgerybard.interaction.interaction import BardKBEvent, \
         BardMouseEvent, BardFootSwitchEvent
 
+#Calibrations that have already been loaded, keyed by directory,
+#prefix and file modification times, see load_calibration
+_CALIBRATION_CACHE = {}
+
 
 def replace_calibration_dir(config, calibration_dir):
     """
@@ -60,11 +65,7 @@ def configure_camera(config):
         calib_dir = camera_config.get('calibration directory', None)
         calib_prefix = camera_config.get('calibration prefix', 'calib')
         if calib_dir is not None:
-            calib_param = MonoCalibrationParams()
-            calib_param.load_data(calib_dir, calib_prefix,
-                            halt_on_ioerror = False)
-            mtx33d = calib_param.camera_matrix
-            dist5d = calib_param.dist_coeffs
+            mtx33d, dist5d = load_calibration(calib_dir, calib_prefix)
 
         dims = camera_config.get('window size', None)
         if dims is None:
@@ -86,6 +87,57 @@ def configure_camera(config):
     return video_source, mtx33d, dist5d, dims, roi
 
 
+def load_calibration(calib_dir, calib_prefix = 'calib'):
+    """
+    Loads the camera matrix and distortion coefficients from a
+    calibration directory. Each calibration is only parsed once per
+    process, later calls return the same (read only) arrays unless
+    the calibration files have changed.
+
+    :param calib_dir: the calibration directory
+    :param calib_prefix: the prefix of the calibration files
+    :returns: camera matrix, distortion coefficients
+    :raises IOError: if the calibration can't be read
+    """
+    key = _calibration_key(calib_dir, calib_prefix)
+    if key not in _CALIBRATION_CACHE:
+        calib_param = MonoCalibrationParams()
+        calib_param.load_data(calib_dir, calib_prefix,
+                        halt_on_ioerror = False)
+        mtx33d = calib_param.camera_matrix
+        dist5d = calib_param.dist_coeffs
+        mtx33d.setflags(write = False)
+        dist5d.setflags(write = False)
+        _CALIBRATION_CACHE[key] = (mtx33d, dist5d)
+
+    return _CALIBRATION_CACHE[key]
+
+
+def clear_calibration_cache():
+    """
+    Empties the calibration cache used by load_calibration
+    """
+    _CALIBRATION_CACHE.clear()
+
+
+def _calibration_key(calib_dir, calib_prefix):
+    """
+    Makes a cache key from the calibration directory, prefix and the
+    names, sizes and modification times of the calibration files
+    """
+    files = []
+    try:
+        with os.scandir(calib_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(calib_prefix) and entry.is_file():
+                    stat = entry.stat()
+                    files.append((entry.name, stat.st_size,
+                                  stat.st_mtime_ns))
+    except OSError:
+        pass
+    return os.path.abspath(calib_dir), calib_prefix, tuple(sorted(files))
+
+
 def configure_interaction(interaction_config, vtk_window, pointer_writer,
                           bard_visualisation, bard_widget):
     """
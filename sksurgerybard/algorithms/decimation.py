@@ -1,18 +1,13 @@
 """Functions to reduce the number of vertices on the anatomy data"""
 
-from vtk.vtkFiltersCore import vtkDecimatePro
+from concurrent.futures import ThreadPoolExecutor
+from vtk.vtkFiltersCore import vtkDecimatePro, vtkQuadricDecimation
 from vtk.vtkCommonDataModel import vtkPolyData
 
-def decimate_actor(actor, target_vertices):
+def _decimate_pro(polydata, target_vertices):
     """
-    Function to reduce the number of triangles in the mesh
-    :param actor: the actor to work modify
-    :param target_vertices: target number of vertices
-
-    :returns: the number of vertices after reduction
-
+    Decimates with vtkDecimatePro, preserving topology
     """
-    polydata = actor.GetMapper().GetInput()
     start_points = polydata.GetNumberOfPoints()
     target_reduction = 1.0 - target_vertices/start_points
 
@@ -25,6 +20,7 @@ def decimate_actor(actor, target_vertices):
         decimate.SetTargetReduction(0.9)
         decimate.PreserveTopologyOn()
         decimate.Update()
+        polydata = vtkPolyData()
         polydata.ShallowCopy(decimate.GetOutput())
         start_points = polydata.GetNumberOfPoints()
         target_reduction = 1.0 - target_vertices/start_points
@@ -36,5 +32,159 @@ def decimate_actor(actor, target_vertices):
     decimate.Update()
     decimated.ShallowCopy(decimate.GetOutput())
 
+    return decimated
+
+
+def _decimate_quadric(polydata, target_vertices):
+    """
+    Decimates with vtkQuadricDecimation, which collapses edges in order
+    of quadric error so gets much closer to the target than
+    vtkDecimatePro with topology preserved.
+    """
+    target_reduction = 1.0 - target_vertices/polydata.GetNumberOfPoints()
+
+    decimate = vtkQuadricDecimation()
+    decimate.SetInputData(polydata)
+    decimate.SetTargetReduction(min(max(target_reduction, 0.0), 1.0))
+    decimate.VolumePreservationOn()
+    decimate.Update()
+    decimated = vtkPolyData()
+    decimated.ShallowCopy(decimate.GetOutput())
+
+    return decimated
+
+
+#The available decimation engines, each with a function and a
+#description of its settings, so cached results can be invalidated if
+#they change
+DECIMATION_ENGINES = {
+    'pro' : (_decimate_pro,
+             'vtkDecimatePro;PreserveTopologyOn;two stage at 0.9'),
+    'quadric' : (_decimate_quadric,
+                 'vtkQuadricDecimation;VolumePreservationOn')
+    }
+
+def get_decimation_engine(engine):
+    """
+    :param engine: the name of a decimation engine, 'pro' or 'quadric'
+    :returns: the engine's decimation function and parameter description
+    :raises ValueError: if the engine is not known
+    """
+    try:
+        return DECIMATION_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown decimation engine {engine}, " +
+                         f"should be one of {list(DECIMATION_ENGINES)}") \
+                                        from KeyError
+
+
+def decimate_polydata(polydata, target_vertices, engine = 'pro'):
+    """
+    Reduces the number of triangles in a mesh, without modifying
+    the input.
+    :param polydata: the vtkPolyData to decimate
+    :param target_vertices: target number of vertices
+    :param engine: the decimation engine to use, 'pro' or 'quadric'
+
+    :returns: a new, decimated vtkPolyData
+    :raises ValueError: if the engine is not known
+    """
+    decimate, _ = get_decimation_engine(engine)
+    return decimate(polydata, target_vertices)
+
+
+def get_decimated_polydata(polydata, target_vertices, model_cache = None,
+                           engine = 'pro'):
+    """
+    Decimates polydata, going through model_cache if it is not None
+
+    :returns: a new, decimated vtkPolyData
+    :raises ValueError: if the engine is not known
+    """
+    decimate, parameters = get_decimation_engine(engine)
+    if model_cache is None:
+        return decimate(polydata, target_vertices)
+    return model_cache.get_decimated(polydata, target_vertices,
+                    parameters, decimate)
+
+
+def decimate_actor(actor, target_vertices, model_cache = None,
+                   engine = 'pro'):
+    """
+    Function to reduce the number of triangles in the mesh
+    :param actor: the actor to work modify
+    :param target_vertices: target number of vertices
+    :param model_cache: an optional ModelCache, decimated meshes are
+        stored there and reused rather than recomputed
+    :param engine: the decimation engine to use, 'pro' or 'quadric'
+
+    :returns: the number of vertices after reduction
+
+    """
+    polydata = actor.GetMapper().GetInput()
+    decimated = get_decimated_polydata(polydata, target_vertices, model_cache,
+                                     engine)
+
     actor.GetMapper().SetInputData(decimated)
     return decimated.GetNumberOfPoints()
+
+
+def decimate_polydatas(polydatas, target_vertices, model_cache = None,
+                       workers = 1, engines = None):
+    """
+    Decimates several meshes, one at a time, or with workers > 1 on a
+    thread pool. VTK's filters may release the GIL while they run, but
+    whether that gives a speed up depends on the machine; the
+    decimation benchmark (bardBenchmark --decimation-workers) measures
+    it, so the default is to decimate serially.
+
+    :param polydatas: a list of vtkPolyData
+    :param target_vertices: a list of target numbers of vertices, one
+        per mesh
+    :param model_cache: an optional ModelCache, see decimate_actor
+    :param workers: the maximum number of threads to use
+    :param engines: a list of decimation engines, one per mesh,
+        defaults to 'pro' for all
+
+    :returns: a list of the decimated vtkPolyData
+    """
+    if engines is None:
+        engines = ['pro'] * len(polydatas)
+
+    def _decimate(polydata, target, engine):
+        return get_decimated_polydata(polydata, target, model_cache, engine)
+
+    if workers <= 1:
+        return list(map(_decimate, polydatas, target_vertices, engines))
+
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        return list(pool.map(_decimate, polydatas, target_vertices,
+                             engines))
+
+
+def decimate_actors(actors, target_vertices, model_cache = None,
+                    workers = 1, engines = None):
+    """
+    Reduces the number of triangles in several actors' meshes, see
+    decimate_polydatas. Only the decimation runs on the thread pool;
+    the decimated meshes are set on the actors' mappers on the calling
+    thread.
+
+    :param actors: a list of actors to modify
+    :param target_vertices: a list of target numbers of vertices, one
+        per actor
+    :param model_cache: an optional ModelCache, see decimate_actor
+    :param workers: the maximum number of threads to use
+    :param engines: a list of decimation engines, one per actor,
+        defaults to 'pro' for all
+
+    :returns: a list of the number of vertices after reduction
+    """
+    polydatas = [actor.GetMapper().GetInput() for actor in actors]
+    decimated = decimate_polydatas(polydatas, target_vertices, model_cache,
+                                   workers, engines)
+
+    for actor, polydata in zip(actors, decimated):
+        actor.GetMapper().SetInputData(polydata)
+
+    return [polydata.GetNumberOfPoints() for polydata in decimated]
@@ -0,0 +1,156 @@
+"""Compares the decimation engines for speed and geometric error"""
+
+from time import perf_counter
+from vtk.vtkFiltersModeling import vtkHausdorffDistancePointSetFilter
+from vtk.util import numpy_support
+from sksurgeryvtk.models.vtk_surface_model_directory_loader import \
+        VTKSurfaceModelDirectoryLoader
+from sksurgerybard.algorithms.decimation import DECIMATION_ENGINES, \
+        decimate_polydata, decimate_polydatas
+
+def surface_deviation(reference, decimated):
+    """
+    Measures how far a decimated surface is from the original, as the
+    distances from each surface's points to the other surface's cells.
+
+    :param reference: the original vtkPolyData
+    :param decimated: the decimated vtkPolyData
+    :returns: the symmetric Hausdorff distance and the mean distance
+        over both surfaces' points, in model units
+    """
+    hausdorff = vtkHausdorffDistancePointSetFilter()
+    hausdorff.SetInputData(0, reference)
+    hausdorff.SetInputData(1, decimated)
+    hausdorff.SetTargetDistanceMethodToPointToCell()
+    hausdorff.Update()
+
+    distance = hausdorff.GetOutput(0).GetFieldData().GetArray(
+                    'HausdorffDistance').GetValue(0)
+    total = 0.0
+    points = 0
+    for output in range(2):
+        distances = numpy_support.vtk_to_numpy(
+                        hausdorff.GetOutput(output).GetPointData().GetArray(
+                            'Distance'))
+        total += distances.sum()
+        points += distances.size
+    mean = total / points if points > 0 else 0.0
+    return distance, mean
+
+
+def benchmark_decimation(polydatas, target_vertices, engines = None):
+    """
+    Decimates each polydata with each engine, timing the decimation
+    and measuring the surface deviation.
+
+    :param polydatas: a dictionary of model name to vtkPolyData
+    :param target_vertices: the target number of vertices
+    :param engines: a list of engine names, defaults to all engines
+    :returns: a list of dictionaries, one per model and engine, with
+        the model, engine, original vertices, achieved vertices,
+        decimation time in seconds, Hausdorff distance and mean distance
+    """
+    if engines is None:
+        engines = list(DECIMATION_ENGINES)
+
+    results = []
+    for name, polydata in polydatas.items():
+        for engine in engines:
+            start = perf_counter()
+            decimated = decimate_polydata(polydata, target_vertices, engine)
+            seconds = perf_counter() - start
+            hausdorff, mean = surface_deviation(polydata, decimated)
+            results.append({'model' : name,
+                            'engine' : engine,
+                            'original vertices' : polydata.GetNumberOfPoints(),
+                            'vertices' : decimated.GetNumberOfPoints(),
+                            'seconds' : seconds,
+                            'hausdorff' : hausdorff,
+                            'mean deviation' : mean})
+    return results
+
+
+def benchmark_models_dir(models_dir, target_vertices, engines = None):
+    """
+    Runs benchmark_decimation on all the models in a directory
+
+    :returns: see benchmark_decimation
+    """
+    return benchmark_decimation(load_models_dir(models_dir), target_vertices,
+                                engines)
+
+
+def load_models_dir(models_dir):
+    """
+    :returns: a dictionary of model name to vtkPolyData, for all the
+        models in a directory
+    """
+    loader = VTKSurfaceModelDirectoryLoader(models_dir)
+    return {model.get_name() : model.source for model in loader.models}
+
+
+def benchmark_workers(polydatas, target_vertices, workers, engines = None):
+    """
+    Times decimating all the polydatas serially, then on a thread pool,
+    so we can see whether decimation workers help on this machine.
+
+    :param polydatas: a dictionary of model name to vtkPolyData
+    :param target_vertices: the target number of vertices
+    :param workers: the number of threads to compare with serial
+    :param engines: a list of engine names, defaults to all engines
+    :returns: a list of dictionaries, one per engine, with the engine,
+        number of models, workers, serial and parallel times in seconds,
+        and the speed up
+    """
+    if engines is None:
+        engines = list(DECIMATION_ENGINES)
+
+    models = list(polydatas.values())
+    targets = [target_vertices] * len(models)
+    results = []
+    for engine in engines:
+        seconds = {}
+        for threads in [1, workers]:
+            start = perf_counter()
+            decimate_polydatas(models, targets, workers = threads,
+                               engines = [engine] * len(models))
+            seconds[threads] = perf_counter() - start
+        results.append({'engine' : engine,
+                        'models' : len(models),
+                        'workers' : workers,
+                        'serial seconds' : seconds[1],
+                        'parallel seconds' : seconds[workers],
+                        'speed up' : seconds[1] / seconds[workers]})
+    return results
+
+
+def format_worker_results(results):
+    """
+    :returns: the decimation worker benchmark results as human
+        readable text
+    """
+    lines = [f"{'engine':<10}{'models':>8}{'workers':>9}{'serial ms':>12}"
+             f"{'parallel ms':>13}{'speed up':>10}"]
+    for result in results:
+        lines.append(f"{result['engine']:<10}{result['models']:>8}"
+                     f"{result['workers']:>9}"
+                     f"{result['serial seconds'] * 1000.0:>12.2f}"
+                     f"{result['parallel seconds'] * 1000.0:>13.2f}"
+                     f"{result['speed up']:>10.2f}")
+    return "\n".join(lines)
+
+
+def format_decimation_results(results):
+    """
+    :returns: the decimation benchmark results as human readable text
+    """
+    lines = [f"{'model':<30}{'engine':>10}{'original':>10}{'vertices':>10}"
+             f"{'time ms':>10}{'hausdorff':>12}{'mean':>10}"]
+    for result in results:
+        lines.append(f"{result['model'][:30]:<30}{result['engine']:>10}"
+                     f"{result['original vertices']:>10}"
+                     f"{result['vertices']:>10}"
+                     f"{result['seconds'] * 1000.0:>10.2f}"
+                     f"{result['hausdorff']:>12.4f}"
+                     f"{result['mean deviation']:>10.4f}")
+    return "\n".join(lines)
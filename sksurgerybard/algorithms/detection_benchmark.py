@@ -0,0 +1,101 @@
+"""Compares marker detection modes for speed and agreement"""
+
+from time import perf_counter
+import numpy as np
+import cv2
+from sksurgerybard.algorithms.prediction_benchmark import rotation_error
+
+def read_video(video_file):
+    """
+    :returns: a list of all the frames in a video file
+    """
+    video = cv2.VideoCapture(video_file)
+    frames = []
+    while True:
+        success, image = video.read()
+        if not success:
+            break
+        frames.append(image)
+    video.release()
+    return frames
+
+
+def _track_frames(tracker, frames):
+    """
+    :returns: the time taken to track all the frames, and for each
+        frame a dictionary of the poses found
+    """
+    tracker.start_tracking()
+    tracked = []
+    start = perf_counter()
+    for frame in frames:
+        port_handles, _timestamps, _framenumbers, tracking, quality = \
+                        tracker.get_frame(frame)
+        tracked.append({name : np.array(pose) for name, pose, value in
+                        zip(port_handles, tracking, quality) if value > 0.2})
+    seconds = perf_counter() - start
+    tracker.stop_tracking()
+    return seconds, tracked
+
+
+def benchmark_detection(frames, trackers, bodies = None):
+    """
+    Tracks the same frames with each tracker, timing them and comparing
+    the poses found with those found by the first tracker.
+
+    :param frames: a list of images
+    :param trackers: a dictionary of name to ArUcoTracker, the first is
+        the reference the others are compared to
+    :param bodies: an optional list of the rigid bodies to compare,
+        defaults to all those found, including single tags
+    :returns: a list of dictionaries, one per tracker, with the tracker
+        name, the milliseconds per frame, the number of poses found, the
+        number also found by the reference, and the mean translation and
+        rotation (in degrees) differences from the reference's poses
+    """
+    results = []
+    reference = None
+    for name, tracker in trackers.items():
+        seconds, tracked = _track_frames(tracker, frames)
+        if bodies is not None:
+            tracked = [{body : pose for body, pose in poses.items()
+                        if body in bodies} for poses in tracked]
+        if reference is None:
+            reference = tracked
+
+        translations = []
+        rotations = []
+        for poses, reference_poses in zip(tracked, reference):
+            for body, pose in poses.items():
+                if body in reference_poses:
+                    translations.append(np.linalg.norm(
+                            pose[0:3, 3] - reference_poses[body][0:3, 3]))
+                    rotations.append(rotation_error(pose,
+                                                    reference_poses[body]))
+
+        results.append({
+            'tracker' : name,
+            'ms per frame' : 1000.0 * seconds / max(len(frames), 1),
+            'poses' : sum(len(poses) for poses in tracked),
+            'matched poses' : len(translations),
+            'translation difference' :
+                float(np.mean(translations)) if translations else 0.0,
+            'rotation difference' :
+                float(np.mean(rotations)) if rotations else 0.0})
+    return results
+
+
+def format_detection_results(results):
+    """
+    :returns: the detection benchmark results as human readable text
+    """
+    lines = [f"{'tracker':<20}{'ms/frame':>10}{'poses':>8}{'matched':>9}"
+             f"{'mm':>10}{'deg':>8}"]
+    for result in results:
+        lines.append(f"{result['tracker'][:20]:<20}"
+                     f"{result['ms per frame']:>10.2f}"
+                     f"{result['poses']:>8}"
+                     f"{result['matched poses']:>9}"
+                     f"{result['translation difference']:>10.3f}"
+                     f"{result['rotation difference']:>8.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+"""A pool of preallocated video frame buffers"""
+
+import threading
+import numpy as np
+import cv2
+
+class FramePool:
+    """
+    Hands out preallocated frame buffers, so video capture can read
+    into the same memory each frame rather than allocating a new
+    array. Buffers are returned to the pool with release once the frame
+    (and any views of it, e.g. a region of interest) is no longer
+    needed, so frames in flight between pipeline stages are never
+    overwritten. If every buffer is in use a new one is allocated.
+    """
+    def __init__(self, shape, dtype = np.uint8, buffers = 1):
+        """
+        :param shape: the frame shape, e.g. (480, 640, 3)
+        :param dtype: the frame data type
+        :param buffers: the number of buffers to preallocate
+        """
+        self._lock = threading.Lock()
+        self._dtype = dtype
+        self._shape = None
+        self._buffers = {}
+        self._free = []
+        self.allocations = 0
+        self.resize(shape, buffers)
+
+    def resize(self, shape, buffers = 1):
+        """
+        Changes the frame shape, discarding the existing buffers and
+        preallocating new ones.
+        """
+        with self._lock:
+            self._shape = tuple(shape)
+            self._buffers = {}
+            self._free = []
+            for _ in range(buffers):
+                buffer = self._allocate()
+                self._free.append(buffer)
+
+    def get_shape(self):
+        """
+        :returns: the frame shape
+        """
+        return self._shape
+
+    def acquire(self):
+        """
+        :returns: a free buffer, allocating one if there are none
+        """
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            return self._allocate()
+
+    def release(self, frame):
+        """
+        Returns a buffer to the pool. Views of a buffer (e.g. a region
+        of interest) release the buffer they are a view of. Arrays that
+        didn't come from the pool, and buffers already released, are
+        ignored.
+
+        :param frame: a buffer from acquire, or a view of one
+        """
+        while isinstance(frame, np.ndarray) and \
+                        isinstance(frame.base, np.ndarray):
+            frame = frame.base
+        with self._lock:
+            buffer = self._buffers.get(id(frame), None)
+            if buffer is frame and \
+                    not any(free is frame for free in self._free):
+                self._free.append(frame)
+
+    def read(self, video_source):
+        """
+        Reads the next frame from a TimestampedVideoSource into a pooled
+        buffer. If the frame is not the pool's shape, the pool is
+        resized to fit.
+
+        :param video_source: a TimestampedVideoSource
+        :returns: ret, frame, as the video source's read
+        """
+        if not video_source.grab():
+            return False, None
+
+        buffer = self.acquire()
+        ret, frame = video_source.source.retrieve(buffer)
+        if not ret or frame is None:
+            self.release(buffer)
+            return False, None
+        if frame is not buffer:
+            #OpenCV allocated a new frame, as the size has changed
+            self.resize(frame.shape)
+        return ret, frame
+
+    def _allocate(self):
+        buffer = np.empty(self._shape, dtype = self._dtype)
+        self._buffers[id(buffer)] = buffer
+        self.allocations += 1
+        return buffer
+
+
+def can_read_into(video_source):
+    """
+    :returns: True if a video source can read frames into a FramePool,
+        i.e. it's a TimestampedVideoSource wrapping a cv2.VideoCapture
+    """
+    return isinstance(getattr(video_source, 'source', None),
+                      cv2.VideoCapture) and hasattr(video_source, 'grab')
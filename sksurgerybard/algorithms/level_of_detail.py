@@ -0,0 +1,141 @@
+"""Switches anatomy actors between decimation levels to hold a frame
+time budget"""
+
+from sksurgerybard.algorithms.decimation import get_decimated_polydata
+
+#pylint:disable=too-many-instance-attributes
+class LevelOfDetail:
+    """
+    Holds several decimation levels of each actor's mesh, and switches
+    all the actors to a coarser level when the smoothed frame time goes
+    over budget, and back to a finer level when there is time to spare.
+    Switching only swaps the mapper's input, so is cheap.
+    """
+    def __init__(self, actors, levels, frame_budget, model_cache = None,
+                 engine = 'pro', smoothing = 0.1, hysteresis = 0.25,
+                 hold_frames = 30):
+        """
+        :param actors: the actors to control
+        :param levels: a list of fractions of each actor's current
+            vertex count, one per level, e.g. [1.0, 0.5, 0.25]. They are
+            sorted so level 0 is the finest.
+        :param frame_budget: the target frame time in seconds
+        :param model_cache: an optional ModelCache for the decimated
+            meshes
+        :param engine: the decimation engine, 'pro' or 'quadric'
+        :param smoothing: the weight given to each new frame time in the
+            exponential moving average
+        :param hysteresis: we only move to a finer level when the
+            average frame time is below (1 - hysteresis) * frame_budget
+        :param hold_frames: the number of frames to wait after a switch
+            before switching again, so the new level's frame time can
+            be measured. Each time a finer level turns out to be over
+            budget, the wait before trying it again is doubled, so we
+            don't oscillate between levels.
+        :raises ValueError: if levels is empty or a level is not in
+            (0, 1], or frame_budget is not positive
+        """
+        if not levels:
+            raise ValueError("Level of detail needs at least one level")
+        for level in levels:
+            if not 0.0 < level <= 1.0:
+                raise ValueError("Level of detail levels should be " +
+                                 f"fractions in (0, 1], not {level}")
+        if frame_budget <= 0:
+            raise ValueError("Level of detail frame budget should be " +
+                             "positive")
+
+        self.levels = sorted(levels, reverse = True)
+        self.frame_budget = frame_budget
+        self._smoothing = smoothing
+        self._hysteresis = hysteresis
+        self._hold_frames = hold_frames
+
+        self._actors = list(actors)
+        self._meshes = []
+        for actor in self._actors:
+            polydata = actor.GetMapper().GetInput()
+            points = polydata.GetNumberOfPoints()
+            meshes = []
+            for fraction in self.levels:
+                if fraction == 1.0:
+                    meshes.append(polydata)
+                else:
+                    meshes.append(get_decimated_polydata(polydata,
+                                    max(int(points * fraction), 4),
+                                    model_cache, engine))
+            self._meshes.append(meshes)
+
+        self.level = 0
+        self.average_frame_time = None
+        self.switches = 0
+        self._frames_since_switch = 0
+        self._finer_hold = hold_frames
+        self._probing_finer = False
+        self.set_level(0)
+
+    def set_level(self, level):
+        """
+        Switches all the actors to a level
+
+        :raises ValueError: if the level doesn't exist
+        """
+        if not 0 <= level < len(self.levels):
+            raise ValueError(f"Level of detail {level} does not exist, " +
+                             f"there are {len(self.levels)} levels")
+        for actor, meshes in zip(self._actors, self._meshes):
+            actor.GetMapper().SetInputData(meshes[level])
+        if level != self.level:
+            self.switches += 1
+        self.level = level
+        self._frames_since_switch = 0
+
+    def get_vertices(self, level = None):
+        """
+        :returns: the total number of vertices at a level, defaults to
+            the current level
+        """
+        if level is None:
+            level = self.level
+        return sum(meshes[level].GetNumberOfPoints()
+                   for meshes in self._meshes)
+
+    def update(self, frame_time):
+        """
+        Adds a frame time, switching level if needed. Call once per
+        frame.
+
+        :param frame_time: the last frame's duration in seconds
+        :returns: the current level
+        """
+        if self.average_frame_time is None:
+            self.average_frame_time = frame_time
+        else:
+            self.average_frame_time += self._smoothing * \
+                            (frame_time - self.average_frame_time)
+
+        self._frames_since_switch += 1
+        if self._frames_since_switch < self._hold_frames:
+            return self.level
+
+        if self.average_frame_time > self.frame_budget:
+            if self._probing_finer:
+                self._finer_hold = min(self._finer_hold * 2,
+                                       self._hold_frames * 64)
+            self._probing_finer = False
+            if self.level < len(self.levels) - 1:
+                self.set_level(self.level + 1)
+            return self.level
+
+        if self._probing_finer:
+            #the finer level has held its budget
+            self._probing_finer = False
+            self._finer_hold = self._hold_frames
+
+        if self.average_frame_time < \
+                (1.0 - self._hysteresis) * self.frame_budget and \
+                self.level > 0 and \
+                self._frames_since_switch >= self._finer_hold:
+            self.set_level(self.level - 1)
+            self._probing_finer = True
+        return self.level
@@ -0,0 +1,238 @@
+"""An on disk cache of models in a compact binary format, to cut the
+time spent parsing models at startup"""
+
+import os
+import hashlib
+import tempfile
+import threading
+from time import perf_counter
+from vtk.vtkIOXML import vtkXMLPolyDataReader, vtkXMLPolyDataWriter
+from vtk.vtkCommonCore import vtkDoubleArray
+from vtk.util import numpy_support
+from sksurgeryvtk.models.vtk_surface_model import VTKSurfaceModel
+from sksurgeryvtk.models.vtk_surface_model_directory_loader import \
+        VTKSurfaceModelDirectoryLoader
+
+#the file types VTKSurfaceModel can read
+MODEL_EXTENSIONS = ('.vtk', '.stl', '.ply', '.vtp')
+
+#field data array used to store how long decimation took
+_DECIMATION_TIME_ARRAY = 'BardDecimationSeconds'
+
+def file_hash(filename):
+    """
+    :returns: a hash of the file's contents, as a hex string
+    """
+    hasher = hashlib.blake2b(digest_size = 20)
+    with open(filename, 'rb') as filein:
+        for block in iter(lambda: filein.read(1 << 20), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def polydata_hash(polydata):
+    """
+    :returns: a hash of a polydata's points, cells and point data,
+        as a hex string
+    """
+    hasher = hashlib.blake2b(digest_size = 20)
+    arrays = [polydata.GetPoints().GetData()]
+    for cells in [polydata.GetVerts(), polydata.GetLines(),
+                  polydata.GetPolys(), polydata.GetStrips()]:
+        arrays.append(cells.GetOffsetsArray())
+        arrays.append(cells.GetConnectivityArray())
+    point_data = polydata.GetPointData()
+    for index in range(point_data.GetNumberOfArrays()):
+        arrays.append(point_data.GetArray(index))
+
+    for array in arrays:
+        if array is not None:
+            hasher.update(numpy_support.vtk_to_numpy(array).tobytes())
+    return hasher.hexdigest()
+
+
+def save_polydata(polydata, filename):
+    """
+    Writes polydata as uncompressed binary vtp. The file is written
+    under a temporary name then moved, so a reader never sees a
+    partially written file. Each save gets its own temporary file, so
+    saves of the same model from several threads don't collide.
+
+    :raises IOError: if the file can't be written
+    """
+    handle, temp_filename = tempfile.mkstemp(
+                    dir = os.path.dirname(filename) or None,
+                    prefix = os.path.basename(filename) + '.',
+                    suffix = '.tmp')
+    os.close(handle)
+    writer = vtkXMLPolyDataWriter()
+    writer.SetFileName(temp_filename)
+    writer.SetInputData(polydata)
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    writer.SetCompressorTypeToNone()
+    if not writer.Write():
+        os.remove(temp_filename)
+        raise IOError(f"Failed to write model cache file {filename}")
+    os.replace(temp_filename, filename)
+
+
+def load_polydata(filename):
+    """
+    Reads polydata from a vtp file
+    """
+    reader = vtkXMLPolyDataReader()
+    reader.SetFileName(filename)
+    reader.Update()
+    return reader.GetOutput()
+
+
+class ModelCache:
+    """
+    Caches models as uncompressed binary vtp files, which load much
+    faster than text formats such as legacy ASCII vtk. Cache files are
+    keyed by the source file's path, size, modification time and a
+    hash of its contents, so a changed model is never served stale.
+    get_decimated may be called from several threads at once.
+    """
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: directory to store the cache in, created if
+            it doesn't exist
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok = True)
+        self.hits = 0
+        self.misses = 0
+        self.decimation_hits = 0
+        self.decimation_misses = 0
+        self.decimation_time_saved = 0.0
+        self._lock = threading.Lock()
+
+    def cache_filename(self, source_file):
+        """
+        :returns: the cache file name for a model file
+        """
+        stat = os.stat(source_file)
+        key = "|".join([os.path.abspath(source_file), str(stat.st_size),
+                        str(stat.st_mtime_ns), file_hash(source_file)])
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.vtp')
+
+    def load_model(self, source_file, colour = (1.0, 1.0, 1.0)):
+        """
+        Loads a VTKSurfaceModel, from the cache if we can, otherwise
+        from source_file, adding it to the cache.
+
+        :raises ValueError: if source_file is not a model file
+        """
+        if not (os.path.isfile(source_file) and
+                source_file.lower().endswith(MODEL_EXTENSIONS)):
+            raise ValueError(f"Not a model file: {source_file}")
+
+        cache_file = self.cache_filename(source_file)
+        if os.path.isfile(cache_file):
+            self.hits += 1
+            model = VTKSurfaceModel(cache_file, colour)
+        else:
+            self.misses += 1
+            model = VTKSurfaceModel(source_file, colour)
+            #cache the surface with normals, so they don't need to be
+            #recomputed on the next load
+            polydata = model.source
+            if model.normals is not None:
+                model.normals.Update()
+                polydata = model.normals.GetOutput()
+            save_polydata(polydata, cache_file)
+
+        model.source_file = source_file
+        model.set_name(os.path.basename(source_file))
+        return model
+
+    def get_decimated(self, polydata, target_vertices, parameters, decimate):
+        """
+        Returns a decimated copy of polydata, from the cache if we can,
+        otherwise by calling decimate and adding the result to the cache.
+        The time decimation took is stored with the result, so hits can
+        report the time saved.
+
+        :param polydata: the vtkPolyData to decimate
+        :param target_vertices: the target number of vertices
+        :param parameters: a string describing the decimation settings
+        :param decimate: a function(polydata, target_vertices) returning
+            decimated polydata
+        :returns: the decimated vtkPolyData
+        """
+        key = "|".join([polydata_hash(polydata), str(target_vertices),
+                        parameters])
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        cache_file = os.path.join(self.cache_dir,
+                                  'decimated_' + digest + '.vtp')
+
+        if os.path.isfile(cache_file):
+            decimated = load_polydata(cache_file)
+            seconds = decimated.GetFieldData().GetArray(
+                            _DECIMATION_TIME_ARRAY)
+            with self._lock:
+                if seconds is not None:
+                    self.decimation_time_saved += seconds.GetValue(0)
+                self.decimation_hits += 1
+            return decimated
+
+        with self._lock:
+            self.decimation_misses += 1
+        start = perf_counter()
+        decimated = decimate(polydata, target_vertices)
+        seconds = vtkDoubleArray()
+        seconds.SetName(_DECIMATION_TIME_ARRAY)
+        seconds.InsertNextValue(perf_counter() - start)
+        decimated.GetFieldData().AddArray(seconds)
+        save_polydata(decimated, cache_file)
+        return decimated
+
+    def decimation_report(self):
+        """
+        :returns: a one line summary of decimation cache use
+        """
+        return (f"Decimation cache: {self.decimation_hits} hits, "
+                f"{self.decimation_misses} misses, "
+                f"{self.decimation_time_saved:.2f} s saved")
+
+
+class BardModelDirectoryLoader(VTKSurfaceModelDirectoryLoader):
+    """
+    Loads all the models in a directory, as VTKSurfaceModelDirectoryLoader,
+    but going through a ModelCache.
+    """
+    def __init__(self, directory_name, model_cache):
+        """
+        :param directory_name: the directory to load
+        :param model_cache: a ModelCache
+        """
+        self._model_cache = model_cache
+        super().__init__(directory_name)
+
+    def get_models(self, directory_name):
+        """
+        Loads models from the given directory, using colours.txt or the
+        default colours.
+
+        :param directory_name: string, readable directory name.
+        """
+        self.models = []
+        counter = 0
+        for filename in sorted(os.listdir(directory_name)):
+            full_path = os.path.join(directory_name, filename)
+            try:
+                model = self._model_cache.load_model(full_path)
+            except ValueError:
+                continue
+
+            model.set_name(os.path.splitext(filename)[0])
+            if filename in self.colours:
+                model.set_colour(self.colours[filename])
+            else:
+                model.set_colour(self.colours[str(counter)])
+
+            self.models.append(model)
+            counter += 1
@@ -0,0 +1,171 @@
+"""Classes to run the BARD frame loop as a set of pipelined stages"""
+
+import queue
+import threading
+from time import sleep
+
+
+def put_latest(stage_queue, item):
+    """
+    Puts an item onto a bounded queue, discarding the oldest queued
+    items if the queue is full, so that the consumer always sees the
+    newest data.
+
+    :param stage_queue: a bounded queue.Queue
+    :param item: the item to add
+    :returns: a list of the items discarded
+    """
+    discarded = []
+    while True:
+        try:
+            stage_queue.put_nowait(item)
+            return discarded
+        except queue.Full:
+            try:
+                discarded.append(stage_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+
+class BardPipeline:
+    """
+    Runs the capture and processing stages of the BARD frame loop on
+    background threads, connected by bounded queues. The render stage
+    stays on the calling (GUI) thread and collects the newest completed
+    result with get_latest.
+    """
+    def __init__(self, capture, process, queue_size = 2, release = None):
+        """
+        :param capture: a callable returning the next frame, or None if
+            no frame was available
+        :param process: a callable taking a frame and returning a result
+            for the render stage
+        :param queue_size: the maximum number of items held between
+            stages, older items are dropped when a queue is full
+        :param release: an optional callable taking a frame, called once
+            the frame has been processed or dropped, e.g. to return its
+            buffer to a FramePool
+        :raises ValueError: if queue_size is less than 1
+        """
+        if queue_size < 1:
+            raise ValueError("Pipeline queue size must be at least 1")
+
+        self._capture = capture
+        self._process = process
+        self._release = release
+        self._frames = queue.Queue(maxsize = queue_size)
+        self._results = queue.Queue(maxsize = queue_size)
+        self._running = threading.Event()
+        self._threads = []
+        self._error = None
+
+    def start(self):
+        """
+        Starts the capture and processing threads
+        """
+        if self._running.is_set():
+            return
+        self._error = None
+        self._running.set()
+        self._threads = [
+            threading.Thread(target = self._capture_loop, daemon = True),
+            threading.Thread(target = self._process_loop, daemon = True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stops the capture and processing threads, and waits for them
+        to finish. Frames and results still queued are discarded, so
+        we don't render a stale result after a restart.
+        """
+        self._running.clear()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        while True:
+            try:
+                self._release_frame(self._frames.get_nowait())
+            except queue.Empty:
+                break
+        while True:
+            try:
+                self._results.get_nowait()
+            except queue.Empty:
+                break
+
+    def is_running(self):
+        """
+        :returns: True if the pipeline threads are running
+        """
+        return self._running.is_set()
+
+    def get_latest(self):
+        """
+        Returns the newest completed result, discarding any older ones.
+
+        :returns: the newest result, or None if no result has completed
+            since the last call
+        :raises: any exception raised by the capture or process stages
+        """
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+        latest = None
+        while True:
+            try:
+                latest = self._results.get_nowait()
+            except queue.Empty:
+                return latest
+
+    def _capture_loop(self):
+        """
+        Capture thread, pushes frames onto the frame queue
+        """
+        while self._running.is_set():
+            try:
+                frame = self._capture()
+            except Exception as error: # pylint:disable=broad-except
+                self._fail(error)
+                return
+            if frame is None:
+                sleep(0.001)
+                continue
+            for dropped in put_latest(self._frames, frame):
+                self._release_frame(dropped)
+
+    def _process_loop(self):
+        """
+        Processing thread, takes frames from the frame queue and
+        pushes results onto the result queue
+        """
+        while self._running.is_set():
+            try:
+                frame = self._frames.get(timeout = 0.1)
+            except queue.Empty:
+                continue
+            try:
+                result = self._process(frame)
+            except Exception as error: # pylint:disable=broad-except
+                self._fail(error)
+                return
+            finally:
+                self._release_frame(frame)
+            put_latest(self._results, result)
+
+    def _release_frame(self, frame):
+        """
+        Passes a frame we've finished with to the release callable
+        """
+        if self._release is not None:
+            self._release(frame)
+
+    def _fail(self, error):
+        """
+        Stores an error from a worker thread, to be raised on the
+        render thread, and stops the pipeline
+        """
+        self._error = error
+        self._running.clear()
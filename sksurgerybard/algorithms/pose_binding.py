@@ -0,0 +1,92 @@
+"""Persistent VTK matrices for named transforms, updated in place"""
+
+import numpy as np
+from vtk import vtkMatrix4x4
+
+class PoseBinding:
+    """
+    Owns one vtkMatrix4x4 per transform name. Actors are bound to a
+    transform by setting the matrix as their user matrix, after which
+    updating the transform moves them without allocating anything.
+    Updates with an unchanged pose don't touch the matrix, so VTK sees
+    no modification.
+
+    Actors can be bound as named groups (e.g. 'visible anatomy',
+    'pointers'), so a whole category shares one matrix and moving it
+    costs the same however many actors it holds. Actors stay in the
+    renderer individually, so per actor visibility and opacity work
+    as before.
+    """
+    def __init__(self):
+        self._matrices = {}
+        self._poses = {}
+        self._groups = {}
+
+    def get_matrix(self, name):
+        """
+        :returns: the vtkMatrix4x4 for a transform, created as the
+            identity if it doesn't exist yet
+        """
+        matrix = self._matrices.get(name, None)
+        if matrix is None:
+            matrix = vtkMatrix4x4()
+            self._matrices[name] = matrix
+            self._poses[name] = np.eye(4, dtype = np.float64)
+        return matrix
+
+    def bind(self, name, actors):
+        """
+        Sets the transform's matrix as the user matrix of each actor,
+        actors already bound to it are left alone.
+
+        :param name: the transform name, e.g. 'modelreference2model'
+        :param actors: an iterable of vtkActors
+        """
+        matrix = self.get_matrix(name)
+        for actor in actors:
+            if actor.GetUserMatrix() is not matrix:
+                actor.SetUserMatrix(matrix)
+
+    def add_group(self, group, name, actors):
+        """
+        Binds a group of actors to a transform, replacing any existing
+        group of the same name.
+
+        :param group: the group name, e.g. 'target anatomy'
+        :param name: the transform name the group follows
+        :param actors: an iterable of vtkActors
+        """
+        actors = list(actors)
+        self.bind(name, actors)
+        self._groups[group] = (name, actors)
+
+    def get_group(self, group):
+        """
+        :returns: the transform name and list of actors in a group
+        :raises KeyError: if the group doesn't exist
+        """
+        return self._groups[group]
+
+    def update(self, name, pose):
+        """
+        Copies a pose into the transform's matrix, if it has changed
+
+        :param name: the transform name
+        :param pose: a 4x4 numpy array
+        :returns: True if the pose changed, otherwise False
+        :raises TypeError: if pose is not a numpy array
+        :raises ValueError: if pose is not 4x4
+        """
+        if not isinstance(pose, np.ndarray):
+            raise TypeError('Invalid array object passed')
+        if pose.shape != (4, 4):
+            raise ValueError('Input array should be a 4x4 matrix')
+
+        matrix = self.get_matrix(name)
+        last_pose = self._poses[name]
+        if np.array_equal(last_pose, pose):
+            return False
+
+        np.copyto(last_pose, pose)
+        matrix.DeepCopy(last_pose.ravel())
+        return True
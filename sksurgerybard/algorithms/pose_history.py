@@ -0,0 +1,255 @@
+"""A history of timestamped rigid body poses, which can be queried at
+any time by interpolation"""
+
+import numpy as np
+
+#the motion models for predicting poses, 'none' uses the latest pose
+MOTION_MODELS = ('none', 'constant velocity')
+
+def matrix_to_quaternion(rotation):
+    """
+    Converts a 3x3 rotation matrix to a unit quaternion
+
+    :returns: the quaternion as a numpy array, [w, x, y, z], with w >= 0
+    """
+    trace = np.trace(rotation)
+    if trace > 0.0:
+        scale = 2.0 * np.sqrt(trace + 1.0)
+        quaternion = np.array([0.25 * scale,
+                               (rotation[2, 1] - rotation[1, 2]) / scale,
+                               (rotation[0, 2] - rotation[2, 0]) / scale,
+                               (rotation[1, 0] - rotation[0, 1]) / scale])
+    else:
+        #use the largest diagonal element to keep things stable
+        axis = int(np.argmax(np.diagonal(rotation)))
+        next_axis = (axis + 1) % 3
+        last_axis = (axis + 2) % 3
+        scale = 2.0 * np.sqrt(1.0 + rotation[axis, axis]
+                              - rotation[next_axis, next_axis]
+                              - rotation[last_axis, last_axis])
+        quaternion = np.zeros(4)
+        quaternion[0] = (rotation[last_axis, next_axis]
+                         - rotation[next_axis, last_axis]) / scale
+        quaternion[1 + axis] = 0.25 * scale
+        quaternion[1 + next_axis] = (rotation[next_axis, axis]
+                                     + rotation[axis, next_axis]) / scale
+        quaternion[1 + last_axis] = (rotation[last_axis, axis]
+                                     + rotation[axis, last_axis]) / scale
+
+    quaternion /= np.linalg.norm(quaternion)
+    if quaternion[0] < 0.0:
+        quaternion = -quaternion
+    return quaternion
+
+
+def quaternion_to_matrix(quaternion):
+    """
+    Converts a unit quaternion, [w, x, y, z], to a 3x3 rotation matrix
+    """
+    w, x, y, z = quaternion # pylint:disable=invalid-name
+    return np.array([
+        [1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z),
+         2.0 * (x * z + w * y)],
+        [2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z),
+         2.0 * (y * z - w * x)],
+        [2.0 * (x * z - w * y), 2.0 * (y * z + w * x),
+         1.0 - 2.0 * (x * x + y * y)]])
+
+
+def slerp(start, end, weight):
+    """
+    Spherical linear interpolation between two unit quaternions, taking
+    the shortest path.
+
+    :param start: the quaternion at weight 0
+    :param end: the quaternion at weight 1
+    :param weight: the interpolation weight, values outside [0, 1]
+        extrapolate
+    :returns: the interpolated unit quaternion
+    """
+    cos_angle = np.dot(start, end)
+    if cos_angle < 0.0:
+        end = -end
+        cos_angle = -cos_angle
+
+    if cos_angle > 0.9999999:
+        #nearly parallel, linear interpolation is accurate and stable.
+        #we don't switch to it any sooner as it distorts the angle when
+        #extrapolating
+        result = start + weight * (end - start)
+        return result / np.linalg.norm(result)
+
+    angle = np.arccos(min(cos_angle, 1.0))
+    sin_angle = np.sin(angle)
+    result = (np.sin((1.0 - weight) * angle) * start +
+              np.sin(weight * angle) * end) / sin_angle
+    return result / np.linalg.norm(result)
+
+
+class PoseHistory:
+    """
+    Keeps the last buffer_size timestamped poses of each rigid body in
+    ring buffers, as quaternions and translations, so poses can be
+    queried at any time within the history, by slerp of the rotation
+    and lerp of the translation.
+    """
+    def __init__(self, buffer_size = 64):
+        """
+        :param buffer_size: the number of poses to keep per rigid body
+        :raises ValueError: if buffer_size is less than 2
+        """
+        if buffer_size < 2:
+            raise ValueError("Pose history buffer size must be at least 2")
+        self._buffer_size = buffer_size
+        self._times = {}
+        self._quaternions = {}
+        self._translations = {}
+        self._counts = {}
+
+    def add(self, name, timestamp, pose):
+        """
+        Adds a pose to a rigid body's history. Poses older than the
+        newest in the history are ignored, a pose with the same time as
+        the newest replaces it.
+
+        :param name: the rigid body name
+        :param timestamp: the time of the pose in seconds
+        :param pose: a 4x4 rigid transform
+        :returns: True if the pose was added
+        """
+        if name not in self._times:
+            self._times[name] = np.zeros(self._buffer_size)
+            self._quaternions[name] = np.zeros((self._buffer_size, 4))
+            self._translations[name] = np.zeros((self._buffer_size, 3))
+            self._counts[name] = 0
+
+        count = self._counts[name]
+        if count > 0:
+            newest = (count - 1) % self._buffer_size
+            last_time = self._times[name][newest]
+            if timestamp < last_time:
+                return False
+            if timestamp == last_time:
+                count -= 1
+
+        index = count % self._buffer_size
+        self._times[name][index] = timestamp
+        self._quaternions[name][index] = matrix_to_quaternion(pose[0:3, 0:3])
+        self._translations[name][index] = pose[0:3, 3]
+        self._counts[name] = count + 1
+        return True
+
+    def add_frame(self, port_handles, timestamps, tracking, accepted = None):
+        """
+        Adds a frame of tracking data, as returned by a tracker's
+        get_frame.
+
+        :param accepted: an optional list of indices of the port handles
+            to add, defaults to all of them
+        """
+        if accepted is None:
+            accepted = range(len(port_handles))
+        for index in accepted:
+            self.add(port_handles[index], timestamps[index],
+                     tracking[index])
+
+    def names(self):
+        """
+        :returns: a list of the rigid bodies with history
+        """
+        return list(self._times)
+
+    def count(self, name):
+        """
+        :returns: the number of poses held for a rigid body
+        """
+        return min(self._counts.get(name, 0), self._buffer_size)
+
+    def time_range(self, name):
+        """
+        :returns: the oldest and newest times in a rigid body's history
+        :raises KeyError: if there is no history for the rigid body
+        """
+        times = self._ordered(name)[0]
+        return times[0], times[-1]
+
+    def get_pose(self, name, timestamp):
+        """
+        Returns a rigid body's pose at a time. Between two poses in the
+        history, the rotation is interpolated by slerp and the
+        translation linearly. Outside the history, the oldest or newest
+        pose is returned.
+
+        :param name: the rigid body name
+        :param timestamp: the time in seconds
+        :returns: a 4x4 rigid transform
+        :raises KeyError: if there is no history for the rigid body
+        """
+        times, quaternions, translations = self._ordered(name)
+
+        after = int(np.searchsorted(times, timestamp))
+        if after == 0:
+            return self._to_matrix(quaternions[0], translations[0])
+        if after == len(times):
+            return self._to_matrix(quaternions[-1], translations[-1])
+
+        before = after - 1
+        weight = (timestamp - times[before]) / \
+                        (times[after] - times[before])
+        quaternion = slerp(quaternions[before], quaternions[after], weight)
+        translation = translations[before] + \
+                        weight * (translations[after] - translations[before])
+        return self._to_matrix(quaternion, translation)
+
+    def predict_pose(self, name, timestamp, max_horizon = 0.1, window = 1):
+        """
+        Returns a rigid body's pose at a time, extrapolating past the
+        newest pose with a constant velocity motion model. The velocity
+        is taken between the newest pose and the one window poses
+        before it, larger windows give smoother but laggier predictions.
+        Times within the history are interpolated as get_pose.
+
+        :param name: the rigid body name
+        :param timestamp: the time in seconds
+        :param max_horizon: the furthest past the newest pose we will
+            extrapolate, in seconds. Later times get the pose at
+            max_horizon.
+        :param window: the number of poses to measure the velocity over
+        :returns: a 4x4 rigid transform
+        :raises KeyError: if there is no history for the rigid body
+        """
+        times, quaternions, translations = self._ordered(name)
+        if timestamp <= times[-1] or len(times) < 2:
+            return self.get_pose(name, timestamp)
+
+        before = max(len(times) - 1 - window, 0)
+        timestamp = min(timestamp, times[-1] + max_horizon)
+        weight = (timestamp - times[before]) / (times[-1] - times[before])
+        quaternion = slerp(quaternions[before], quaternions[-1], weight)
+        translation = translations[before] + \
+                        weight * (translations[-1] - translations[before])
+        return self._to_matrix(quaternion, translation)
+
+    def _ordered(self, name):
+        """
+        :returns: the times, quaternions and translations for a rigid
+            body, oldest first
+        :raises KeyError: if there is no history for the rigid body
+        """
+        count = self._counts[name]
+        times = self._times[name]
+        quaternions = self._quaternions[name]
+        translations = self._translations[name]
+        if count <= self._buffer_size:
+            return times[:count], quaternions[:count], translations[:count]
+
+        start = count % self._buffer_size
+        order = np.r_[start:self._buffer_size, 0:start]
+        return times[order], quaternions[order], translations[order]
+
+    @staticmethod
+    def _to_matrix(quaternion, translation):
+        pose = np.eye(4)
+        pose[0:3, 0:3] = quaternion_to_matrix(quaternion)
+        pose[0:3, 3] = translation
+        return pose
@@ -0,0 +1,127 @@
+"""Measures how well pose prediction hides latency, on recorded tracking"""
+
+import numpy as np
+import cv2
+from sksurgerybard.algorithms.pose_history import MOTION_MODELS, \
+        PoseHistory
+
+def rotation_error(first, second):
+    """
+    :returns: the angle in degrees of the rotation between two poses
+    """
+    relative = np.matmul(first[0:3, 0:3].transpose(), second[0:3, 0:3])
+    cos_angle = np.clip((np.trace(relative) - 1.0) / 2.0, -1.0, 1.0)
+    return float(np.degrees(np.arccos(cos_angle)))
+
+
+def track_video(video_file, tracker):
+    """
+    Runs an ArUco tracker on each frame of a video file, stamping each
+    frame with its time in the video.
+
+    :param video_file: the video file to read
+    :param tracker: an ArUcoTracker, with no video source of its own
+    :returns: a dictionary of rigid body name to a list of
+        (timestamp, pose) tuples, in time order
+    """
+    video = cv2.VideoCapture(video_file)
+    fps = video.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30.0
+
+    sequences = {}
+    frame_number = 0
+    tracker.start_tracking()
+    while True:
+        success, image = video.read()
+        if not success:
+            break
+        port_handles, _timestamps, _framenumbers, tracking, quality = \
+                        tracker.get_frame(image)
+        for name, pose, value in zip(port_handles, tracking, quality):
+            if value > 0.2:
+                sequences.setdefault(name, []).append(
+                                (frame_number / fps, np.array(pose)))
+        frame_number += 1
+    tracker.stop_tracking()
+    video.release()
+    return sequences
+
+
+def benchmark_prediction(sequences, latency, window = 1,
+                         max_horizon = 0.1):
+    """
+    Replays each rigid body's poses in order, and at each one compares
+    the pose we'd display latency seconds later with the pose recorded
+    at that time (interpolated), for each motion model.
+
+    :param sequences: a dictionary of rigid body name to a list of
+        (timestamp, pose) tuples, in time order, as from track_video
+    :param latency: the latency to hide, in seconds
+    :param window: the constant velocity model's velocity window
+    :param max_horizon: the constant velocity model's maximum horizon
+    :returns: a list of dictionaries, one per rigid body and motion
+        model, with the rigid body, motion model, number of samples,
+        mean translation error, mean rotation error in degrees, and
+        jitter, the mean size of the frame to frame change in velocity
+        of the displayed translation
+    """
+    results = []
+    for name, sequence in sequences.items():
+        if len(sequence) < 2:
+            continue
+        recorded = PoseHistory(len(sequence))
+        for timestamp, pose in sequence:
+            recorded.add(name, timestamp, pose)
+        last_time = recorded.time_range(name)[1]
+
+        replayed = PoseHistory(len(sequence))
+        displayed = {model : [] for model in MOTION_MODELS}
+        truths = []
+        for timestamp, pose in sequence:
+            replayed.add(name, timestamp, pose)
+            if timestamp + latency > last_time:
+                break
+            truths.append(recorded.get_pose(name, timestamp + latency))
+            displayed['none'].append(pose)
+            displayed['constant velocity'].append(replayed.predict_pose(
+                        name, timestamp + latency, max_horizon, window))
+
+        if not truths:
+            continue
+        for model in MOTION_MODELS:
+            poses = displayed[model]
+            translations = np.array([pose[0:3, 3] for pose in poses])
+            jitter = 0.0
+            if len(poses) > 2:
+                jitter = float(np.mean(np.linalg.norm(
+                                np.diff(translations, n = 2, axis = 0),
+                                axis = 1)))
+            results.append({
+                'rigid body' : name,
+                'motion model' : model,
+                'samples' : len(poses),
+                'translation error' : float(np.mean(
+                        [np.linalg.norm(pose[0:3, 3] - truth[0:3, 3])
+                         for pose, truth in zip(poses, truths)])),
+                'rotation error' : float(np.mean(
+                        [rotation_error(pose, truth)
+                         for pose, truth in zip(poses, truths)])),
+                'jitter' : jitter})
+    return results
+
+
+def format_prediction_results(results):
+    """
+    :returns: the prediction benchmark results as human readable text
+    """
+    lines = [f"{'rigid body':<30}{'model':>20}{'samples':>9}"
+             f"{'error':>10}{'deg':>8}{'jitter':>10}"]
+    for result in results:
+        lines.append(f"{result['rigid body'][:30]:<30}"
+                     f"{result['motion model']:>20}"
+                     f"{result['samples']:>9}"
+                     f"{result['translation error']:>10.3f}"
+                     f"{result['rotation error']:>8.3f}"
+                     f"{result['jitter']:>10.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,135 @@
+"""Adjusts the update rate to the highest the frame cost allows"""
+
+#pylint:disable=too-many-instance-attributes
+class RateController:
+    """
+    Measures the cost of each frame and sets the update rate to the
+    highest rate we can sustain, limited by the video source's frame
+    rate and a maximum, so ticks don't pile up behind long frames on a
+    slow machine, and we don't leave throughput unused on a fast one.
+    """
+    def __init__(self, rate, minimum_rate = 1.0, maximum_rate = 60.0,
+                 source_rate = None, headroom = 0.8, smoothing = 0.1,
+                 hold_frames = 30, tolerance = 0.1):
+        """
+        :param rate: the starting update rate, in Hz
+        :param minimum_rate: we never go below this rate
+        :param maximum_rate: we never go above this rate
+        :param source_rate: the video source's frame rate, if known.
+            There is no point updating faster than new frames arrive.
+        :param headroom: the fraction of each timer interval the frame
+            may use, leaving the rest for the event loop
+        :param smoothing: the weight given to each new frame time in the
+            exponential moving averages
+        :param hold_frames: the number of frames to wait after changing
+            rate before changing it again
+        :param tolerance: the fractional change in the best rate needed
+            before we change rate, so we don't keep restarting the timer
+        :raises ValueError: if the rates are not positive, or the
+            minimum is above the maximum
+        """
+        if minimum_rate <= 0 or maximum_rate < minimum_rate:
+            raise ValueError("Update rate limits should be positive, " +
+                             "with the minimum no more than the maximum")
+        if source_rate is not None and source_rate <= 0:
+            source_rate = None
+
+        self.minimum_rate = minimum_rate
+        self.maximum_rate = maximum_rate
+        self.source_rate = source_rate
+        self._headroom = headroom
+        self._smoothing = smoothing
+        self._hold_frames = hold_frames
+        self._tolerance = tolerance
+
+        self.rate = min(max(rate, minimum_rate), maximum_rate)
+        self.reason = None
+        self.changes = 0
+        self.average_frame_time = None
+        self.average_interval = None
+        self._last_frame_start = None
+        self._frames_since_change = 0
+
+    def update(self, frame_time, frame_start = None):
+        """
+        Adds a frame, changing rate if needed. Call once per frame.
+
+        :param frame_time: the frame's duration in seconds
+        :param frame_start: the time the frame started, in seconds, used
+            to measure the achieved rate
+        :returns: True if the rate has changed
+        """
+        self.average_frame_time = self._average(self.average_frame_time,
+                                                frame_time)
+        if frame_start is not None:
+            if self._last_frame_start is not None:
+                self.average_interval = self._average(self.average_interval,
+                                frame_start - self._last_frame_start)
+            self._last_frame_start = frame_start
+
+        self._frames_since_change += 1
+        if self._frames_since_change < self._hold_frames:
+            return False
+
+        rate, reason = self.get_best_rate()
+        self.reason = reason
+        if abs(rate - self.rate) <= self._tolerance * self.rate:
+            return False
+
+        self.rate = rate
+        self.changes += 1
+        self._frames_since_change = 0
+        return True
+
+    def get_best_rate(self):
+        """
+        :returns: the highest sustainable rate, and what limits it,
+            one of 'frame cost', 'source', 'maximum' or 'minimum'
+        """
+        rate = self.maximum_rate
+        reason = 'maximum'
+        if self.source_rate is not None and self.source_rate < rate:
+            rate = self.source_rate
+            reason = 'source'
+        if self.average_frame_time is not None and \
+                self.average_frame_time > 0:
+            sustainable = self._headroom / self.average_frame_time
+            if sustainable < rate:
+                rate = sustainable
+                reason = 'frame cost'
+        if rate < self.minimum_rate:
+            rate = self.minimum_rate
+            reason = 'minimum'
+        return rate, reason
+
+    def get_achieved_rate(self):
+        """
+        :returns: the measured rate frames are being processed at, or
+            None if it hasn't been measured yet
+        """
+        if not self.average_interval:
+            return None
+        return 1.0 / self.average_interval
+
+    def get_interval(self):
+        """
+        :returns: the timer interval for the current rate, in ms
+        """
+        return int(round(1000.0 / self.rate))
+
+    def report(self):
+        """
+        :returns: the current, achieved and best rates, and the reason
+            for the current rate, as human readable text
+        """
+        achieved = self.get_achieved_rate()
+        achieved = 'unknown' if achieved is None else f'{achieved:.1f} Hz'
+        frame_time = 'unknown' if self.average_frame_time is None else \
+                        f'{self.average_frame_time * 1000.0:.1f} ms'
+        return (f"Update rate {self.rate:.1f} Hz, achieved {achieved}, " +
+                f"limited by {self.reason}, frame time {frame_time}")
+
+    def _average(self, average, value):
+        if average is None:
+            return value
+        return average + self._smoothing * (value - average)
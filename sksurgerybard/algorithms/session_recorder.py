@@ -0,0 +1,346 @@
+"""Records the video frames and tracking BARD sees to a binary file
+
+A recording is an 8 byte file header, followed by chunks. Each chunk
+starts with a CHUNK_HEADER of a four character tag, the payload size in
+bytes and a timestamp, then the payload. Chunks are only ever appended.
+
+    FRAM: a video frame. A FRAME_HEADER of height, width, channels and
+    encoding ('raw', '.png' or '.jpg'), then the pixels, raw in row
+    order or as an encoded image.
+
+    POSE: a frame of tracking. The number of poses, then for each the
+    length of its name, the name (e.g. modelreference2tracker), and a
+    POSE_RECORD of timestamp, quality and the 4 x 4 pose in row order.
+
+    INDX: written when recording stops, an INDEX_DTYPE entry of tag,
+    offset and timestamp for every FRAM and POSE chunk so far.
+
+    TAIL: the last chunk written when recording stops, holding the INDX
+    chunk's offset, so a reader can find the index from the end of the
+    file. A recording that was never stopped has no TAIL, and is read by
+    scanning the chunks.
+"""
+
+from os import path
+import queue
+import struct
+import threading
+import numpy as np
+import cv2
+
+FILE_HEADER = b'BARDREC\x01'
+CHUNK_HEADER = struct.Struct('<4sQd')
+FRAME_HEADER = struct.Struct('<III4s')
+POSE_RECORD = struct.Struct('<dd16d')
+INDEX_DTYPE = np.dtype([('tag', 'S4'), ('offset', '<u8'),
+                        ('timestamp', '<f8')])
+TAIL = struct.Struct('<Q')
+
+#the recording compression options, and the frame encoding for each
+COMPRESSIONS = {'none' : b'raw', 'png' : b'.png', 'jpg' : b'.jpg'}
+
+#pylint:disable=too-many-instance-attributes
+class SessionRecorder:
+    """
+    Appends video frames and poses to a recording on a background
+    thread, so the caller never waits on compression or the disk. If
+    the writer falls more than max_pending_frames frames behind, new
+    frames are dropped (and counted) rather than queued. Poses are never
+    dropped.
+    """
+    def __init__(self, filename, compression = 'none',
+                 max_pending_frames = 30):
+        """
+        :param filename: the file to record to, appended to if it is
+            already a recording, in which case any partly written last
+            chunk is discarded
+        :param compression: how to store frames, one of COMPRESSIONS
+        :param max_pending_frames: the most frames that may wait to be
+            written
+        :raises ValueError: if the compression is not known
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown recording compression {compression}" +
+                             f", should be one of {list(COMPRESSIONS)}")
+        self.filename = filename
+        self._encoding = COMPRESSIONS[compression]
+        self._max_pending_frames = max_pending_frames
+
+        self._queue = queue.Queue()
+        self._pending_frames = 0
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._index = []
+        self._error = None
+
+        self.frames_written = 0
+        self.poses_written = 0
+        self.dropped_frames = 0
+
+    def start(self):
+        """
+        Opens the file and starts the writer thread
+
+        :raises OSError: if the file can't be opened
+        :raises ValueError: if the file exists but is not a recording
+        """
+        if self._thread is not None:
+            return
+        end = 0
+        if path.isfile(self.filename) and path.getsize(self.filename) > 0:
+            #carry on from the end of the last complete chunk
+            reader = SessionReader(self.filename)
+            end = reader.end
+            if not self._index:
+                self._index = [tuple(entry) for entry in reader.index]
+        self._file = open(self.filename, 'r+b' if end else 'wb') #pylint:disable=consider-using-with
+        if end:
+            self._file.seek(end)
+            self._file.truncate()
+        else:
+            self._file.write(FILE_HEADER)
+        self._thread = threading.Thread(target = self._write_loop,
+                                        daemon = True)
+        self._thread.start()
+
+    def is_recording(self):
+        """
+        :returns: True if the writer thread is running
+        """
+        return self._thread is not None
+
+    def add_frame(self, image, timestamp):
+        """
+        Queues a video frame to be written. The image is copied, so the
+        caller may reuse its buffer.
+
+        :param image: the image, e.g. a BGR video frame
+        :param timestamp: the image's capture time
+        :returns: True if the frame was queued, False if it was dropped
+        :raises: any error raised writing the recording
+        """
+        self._raise_error()
+        with self._pending_lock:
+            if self._pending_frames >= self._max_pending_frames:
+                self.dropped_frames += 1
+                return False
+            self._pending_frames += 1
+        self._queue.put((b'FRAM', timestamp, np.array(image, copy = True)))
+        return True
+
+    def add_poses(self, names, timestamps, poses, quality, timestamp):
+        """
+        Queues a frame of tracking to be written
+
+        :param names: the name of each pose, e.g. modelreference2tracker
+        :param timestamps: the time of each pose
+        :param poses: the 4 x 4 poses
+        :param quality: the quality of each pose
+        :param timestamp: the time of the tracking frame
+        :raises: any error raised writing the recording
+        """
+        self._raise_error()
+        self._queue.put((b'POSE', timestamp,
+                         (list(names), list(timestamps),
+                          np.array(poses, dtype = np.float64),
+                          list(quality))))
+
+    def stop(self):
+        """
+        Writes everything queued, then the index, and closes the file
+
+        :raises: any error raised writing the recording
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        try:
+            if self._error is None:
+                index_offset = self._write_chunk(b'INDX', 0.0,
+                        np.array(self._index, dtype = INDEX_DTYPE).tobytes(),
+                        indexed = False)
+                self._write_chunk(b'TAIL', 0.0, TAIL.pack(index_offset),
+                                  indexed = False)
+        finally:
+            self._file.close()
+            self._file = None
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+    def _write_loop(self):
+        """
+        Writer thread, encodes and writes queued chunks until stopped
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            tag, timestamp, data = item
+            if tag == b'FRAM':
+                with self._pending_lock:
+                    self._pending_frames -= 1
+            if self._error is not None:
+                continue
+            try:
+                if tag == b'FRAM':
+                    self._write_chunk(tag, timestamp, self._encode_frame(data))
+                    self.frames_written += 1
+                else:
+                    self._write_chunk(tag, timestamp, _pack_poses(*data))
+                    self.poses_written += len(data[0])
+            except Exception as error: # pylint:disable=broad-except
+                self._error = error
+
+    def _encode_frame(self, image):
+        """
+        :returns: a FRAM chunk payload for an image
+        """
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        header = FRAME_HEADER.pack(image.shape[0], image.shape[1], channels,
+                                   self._encoding)
+        if self._encoding == b'raw':
+            return header + image.tobytes()
+        success, encoded = cv2.imencode(self._encoding.decode(), image)
+        if not success:
+            raise ValueError(f"Failed to encode frame as {self._encoding}")
+        return header + encoded.tobytes()
+
+    def _write_chunk(self, tag, timestamp, payload, indexed = True):
+        """
+        Appends a chunk to the file
+
+        :returns: the chunk's offset in the file
+        """
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(tag, len(payload), timestamp))
+        self._file.write(payload)
+        if indexed:
+            self._index.append((tag, offset, timestamp))
+        return offset
+
+
+def _pack_poses(names, timestamps, poses, quality):
+    """
+    :returns: a POSE chunk payload
+    """
+    parts = [struct.pack('<I', len(names))]
+    for name, timestamp, pose, value in zip(names, timestamps, poses,
+                                            quality):
+        encoded = name.encode('utf-8')
+        parts.append(struct.pack('<H', len(encoded)))
+        parts.append(encoded)
+        parts.append(POSE_RECORD.pack(timestamp, value,
+                                      *np.ravel(pose)))
+    return b''.join(parts)
+
+
+class SessionReader:
+    """
+    Reads a recording made by SessionRecorder. Uses the index if the
+    recording was stopped, otherwise scans the chunks, ignoring a
+    partly written last chunk.
+    """
+    def __init__(self, filename):
+        """
+        :param filename: the recording
+        :raises ValueError: if the file is not a recording
+        """
+        self.filename = filename
+        with open(filename, 'rb') as recording:
+            if recording.read(len(FILE_HEADER)) != FILE_HEADER:
+                raise ValueError(f"{filename} is not a BARD recording")
+            self.index, self.end = self._read_index(recording)
+
+        self.frames = self.index[self.index['tag'] == b'FRAM']
+        self.poses = self.index[self.index['tag'] == b'POSE']
+
+    def read_frame(self, frame_number):
+        """
+        :param frame_number: the frame's position in the recording
+        :returns: the frame's timestamp and image
+        :raises IndexError: if there is no such frame
+        """
+        entry = self.frames[frame_number]
+        payload = self._read_payload(entry['offset'])
+        height, width, channels, encoding = FRAME_HEADER.unpack_from(payload)
+        data = np.frombuffer(payload, dtype = np.uint8,
+                             offset = FRAME_HEADER.size)
+        if encoding.rstrip(b'\x00') == b'raw':
+            image = data.reshape((height, width, channels))
+        else:
+            image = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        if channels == 1:
+            image = image.reshape((height, width))
+        return float(entry['timestamp']), image
+
+    def read_poses(self):
+        """
+        :returns: a dictionary of pose name to a list of (timestamp,
+            pose, quality) tuples, in the order they were recorded
+        """
+        sequences = {}
+        for entry in self.poses:
+            payload = self._read_payload(entry['offset'])
+            count, = struct.unpack_from('<I', payload)
+            position = 4
+            for _ in range(count):
+                length, = struct.unpack_from('<H', payload, position)
+                position += 2
+                name = payload[position:position + length].decode('utf-8')
+                position += length
+                record = POSE_RECORD.unpack_from(payload, position)
+                position += POSE_RECORD.size
+                sequences.setdefault(name, []).append(
+                        (record[0], np.array(record[2:]).reshape((4, 4)),
+                         record[1]))
+        return sequences
+
+    def _read_payload(self, offset):
+        with open(self.filename, 'rb') as recording:
+            recording.seek(offset)
+            _, size, _ = CHUNK_HEADER.unpack(
+                            recording.read(CHUNK_HEADER.size))
+            return recording.read(size)
+
+    def _read_index(self, recording):
+        """
+        :returns: the index from the last TAIL, or by scanning the
+            chunks, and the offset of the end of the last complete chunk
+        """
+        recording.seek(0, 2)
+        size = recording.tell()
+        tail_size = CHUNK_HEADER.size + TAIL.size
+        if size >= len(FILE_HEADER) + tail_size:
+            recording.seek(size - tail_size)
+            tag, payload_size, _ = CHUNK_HEADER.unpack(
+                            recording.read(CHUNK_HEADER.size))
+            if tag == b'TAIL' and payload_size == TAIL.size:
+                index_offset, = TAIL.unpack(recording.read(TAIL.size))
+                recording.seek(index_offset)
+                tag, payload_size, _ = CHUNK_HEADER.unpack(
+                                recording.read(CHUNK_HEADER.size))
+                if tag == b'INDX':
+                    return np.frombuffer(recording.read(payload_size),
+                                         dtype = INDEX_DTYPE), size
+
+        index = []
+        offset = len(FILE_HEADER)
+        while offset + CHUNK_HEADER.size <= size:
+            recording.seek(offset)
+            tag, payload_size, timestamp = CHUNK_HEADER.unpack(
+                            recording.read(CHUNK_HEADER.size))
+            end = offset + CHUNK_HEADER.size + payload_size
+            if end > size:
+                break
+            if tag in (b'FRAM', b'POSE'):
+                index.append((tag, offset, timestamp))
+            offset = end
+        return np.array(index, dtype = INDEX_DTYPE), offset
@@ -0,0 +1,144 @@
+"""Lightweight per-stage timing for the BARD frame loop"""
+
+from contextlib import contextmanager
+from time import perf_counter, time, strftime, localtime
+import numpy as np
+
+
+class StageTimer:
+    """
+    Records how long each stage of the frame loop takes into fixed
+    size ring buffers, so it can be left on all the time. Summaries
+    give the 50th, 95th and 99th percentiles over the buffer.
+    """
+    def __init__(self, buffer_size = 256, log_file = None,
+                 log_interval = None):
+        """
+        :param buffer_size: the number of durations to keep per stage
+        :param log_file: a file to append summaries to, or None
+        :param log_interval: if set, the interval in seconds at which
+            log_periodically writes summaries to log_file
+        :raises ValueError: if buffer_size is less than 1
+        """
+        if buffer_size < 1:
+            raise ValueError("Timing buffer size must be at least 1")
+        self._buffer_size = buffer_size
+        self._durations = {}
+        self._counts = {}
+        self._log_file = log_file
+        self._log_interval = log_interval
+        self._last_log = time()
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Context manager that records the duration of the enclosed
+        block against stage
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, perf_counter() - start)
+
+    def record(self, stage, duration):
+        """
+        Records a duration for a stage
+
+        :param stage: the name of the stage
+        :param duration: the duration in seconds
+        """
+        if stage not in self._durations:
+            self._durations[stage] = np.zeros(self._buffer_size)
+            self._counts[stage] = 0
+        count = self._counts[stage]
+        self._durations[stage][count % self._buffer_size] = duration
+        self._counts[stage] = count + 1
+
+    def count(self, stage):
+        """
+        :returns: the number of durations recorded for a stage, 0 if
+            none have been
+        """
+        return self._counts.get(stage, 0)
+
+    def last(self, stage):
+        """
+        :returns: the most recent duration recorded for a stage in
+            seconds, 0.0 if none have been
+        """
+        count = self._counts.get(stage, 0)
+        if count == 0:
+            return 0.0
+        return float(self._durations[stage][(count - 1) % self._buffer_size])
+
+    def get_durations(self, stage):
+        """
+        :returns: the buffered durations for a stage in seconds, oldest
+            first
+        :raises KeyError: if nothing has been recorded for the stage
+        """
+        count = self._counts[stage]
+        durations = self._durations[stage]
+        if count <= self._buffer_size:
+            return durations[:count].copy()
+        return np.roll(durations, -(count % self._buffer_size))
+
+    def summary(self):
+        """
+        :returns: a dictionary, for each stage a dictionary with the
+            total number of frames timed (count) and the p50, p95 and
+            p99 durations over the buffer in milliseconds
+        """
+        summary = {}
+        for stage in list(self._durations):
+            durations = self.get_durations(stage) * 1000.0
+            p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+            summary[stage] = {'count' : self._counts[stage],
+                              'p50' : p50, 'p95' : p95, 'p99' : p99}
+        return summary
+
+    def format_summary(self):
+        """
+        :returns: the summary as a human readable table
+        """
+        return format_stage_summary(self.summary())
+
+    def write_summary(self, log_file = None):
+        """
+        Appends the summary to a log file
+
+        :param log_file: the file to write to, defaults to the log
+            file set in the constructor
+        """
+        log_file = log_file if log_file is not None else self._log_file
+        if log_file is None:
+            return
+        with open(log_file, 'a', encoding = 'utf-8') as fileout:
+            fileout.write(strftime("%Y-%m-%d %H:%M:%S\n", localtime()))
+            fileout.write(self.format_summary() + "\n\n")
+        self._last_log = time()
+
+    def log_periodically(self):
+        """
+        Writes the summary to the log file if the log interval has
+        passed since the last write. Cheap enough to call every frame.
+        """
+        if self._log_interval is None or self._log_file is None:
+            return
+        if time() - self._last_log >= self._log_interval:
+            self.write_summary()
+
+
+def format_stage_summary(summary):
+    """
+    :param summary: a summary, as from StageTimer.summary
+    :returns: the summary as a human readable table
+    """
+    lines = [f"{'stage':<20}{'count':>8}{'p50 ms':>10}"
+             f"{'p95 ms':>10}{'p99 ms':>10}"]
+    for stage, stats in summary.items():
+        lines.append(f"{stage:<20}{stats['count']:>8}"
+                     f"{stats['p50']:>10.3f}{stats['p95']:>10.3f}"
+                     f"{stats['p99']:>10.3f}")
+    return "\n".join(lines)
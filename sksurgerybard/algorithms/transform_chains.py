@@ -0,0 +1,212 @@
+"""A transform manager that compiles and caches chains of transforms"""
+
+import numpy as np
+from sksurgerycore.transforms.transform_manager import TransformManager
+
+class BardTransformManager(TransformManager):
+    """
+    A TransformManager that remembers how it resolved each chained
+    transform (e.g. camera2modelreference via tracker) as a fixed list
+    of stored transforms to multiply, and caches the result. Adding a
+    transform only invalidates the cached results of chains that use
+    it. Adding a new link between coordinate systems, or removing one,
+    may change the route a chain takes, so all chains are recompiled.
+
+    Direct transforms are returned exactly as by TransformManager.
+    Chained results are returned read only, as they are shared between
+    callers.
+    """
+    def __init__(self):
+        super().__init__()
+        #chain name to list of (before, after) links to multiply
+        self._plans = {}
+        #chain name to cached result
+        self._results = {}
+        #link (as a frozenset of its two ends) to names of chains using it
+        self._chains_by_link = {}
+        #transform name to (before, after), so we only validate once
+        self._valid_names = {}
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, names):
+        """
+        Works out the chain of transforms for each name now, rather than
+        on the first get. Names that can't be resolved yet are skipped.
+
+        :param names: a list of transform names, e.g. camera2modelreference
+        """
+        for name in names:
+            try:
+                self.get(name)
+            except ValueError:
+                pass
+
+    def add(self, name, transform):
+        """
+        Adds a transform called name, as TransformManager.add, then
+        invalidates the cached chains that depend on it.
+        """
+        before, after = self._split_name(name)
+        new_link = not self.exists(name)
+        super().add(name, transform)
+        if new_link:
+            self._clear_plans()
+            return
+        for chain in self._chains_by_link.get(frozenset((before, after)),
+                                              ()):
+            self._results.pop(chain, None)
+
+    def add_batch(self, names, transforms):
+        """
+        Adds several transforms at once, equivalent to calling add for
+        each but validating the shape and inverting them as one stack.
+        Names that are not valid transform names are skipped, and an
+        empty batch does nothing.
+
+        :param names: a list of transform names, e.g. pointerref2tracker
+        :param transforms: an N x 4 x 4 array, or a list of N 4x4 arrays
+        :raises: ValueError if transforms is not N x 4 x 4
+        """
+        if len(names) == 0 and len(transforms) == 0:
+            return
+        transforms = np.asarray(transforms, dtype = np.float64)
+        if transforms.ndim != 3 or transforms.shape[1:] != (4, 4) or \
+                transforms.shape[0] != len(names):
+            raise ValueError("transforms should be an N x 4 x 4 array, " +
+                             "with a name for each")
+
+        try:
+            inverses = np.linalg.inv(transforms)
+        except np.linalg.LinAlgError:
+            #add them one at a time, so only the singular ones fail
+            for name, transform in zip(names, transforms):
+                try:
+                    self.add(name, transform)
+                except ValueError:
+                    pass
+            return
+
+        new_link = False
+        for name, transform, inverse in zip(names, transforms, inverses):
+            try:
+                before, after = self._split_name(name)
+            except ValueError:
+                continue
+
+            if after not in self.repository:
+                self.repository[after] = {}
+            if before not in self.repository:
+                self.repository[before] = {}
+            new_link = new_link or after not in self.repository[before]
+            self.repository[before][after] = transform
+            self.repository[after][before] = inverse
+            for chain in self._chains_by_link.get(
+                            frozenset((before, after)), ()):
+                self._results.pop(chain, None)
+
+        if new_link:
+            self._clear_plans()
+
+    def remove(self, name):
+        """
+        Removes a transform, as TransformManager.remove, and clears all
+        the compiled chains.
+        """
+        super().remove(name)
+        self._clear_plans()
+
+    def get(self, name):
+        """
+        Returns the named transform or throws ValueError. Chained
+        transforms are computed from a compiled plan and cached.
+
+        :raises: ValueError
+        """
+        before, after = self._split_name(name)
+        direct = self.repository.get(before, {}).get(after, None)
+        if direct is not None:
+            return direct
+
+        result = self._results.get(name, None)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        if before not in self.repository or after not in self.repository:
+            raise ValueError("name:" + name + ", could not be found.")
+
+        plan = self._plans.get(name, None)
+        if plan is None:
+            plan = self._compile_plan(name, before, after)
+            if plan is None:
+                #no route, let TransformManager handle it as it always has
+                return super().get(name)
+
+        self.misses += 1
+        result = np.eye(4)
+        for link_before, link_after in plan:
+            result = np.matmul(self.repository[link_before][link_after],
+                               result)
+        result.setflags(write = False)
+        self._results[name] = result
+        return result
+
+    def _split_name(self, name):
+        """
+        As is_valid_name, but remembers names that have been validated
+
+        :returns: the parts of the name before and after the 2
+        :raises: TypeError, ValueError
+        """
+        ends = self._valid_names.get(name, None)
+        if ends is None:
+            ends = self.is_valid_name(name)
+            self._valid_names[name] = ends
+        return ends
+
+    def _compile_plan(self, name, before, after):
+        """
+        Finds a route from before to after, searching the links in the
+        same order as TransformManager so we get the same route.
+
+        :returns: a list of (before, after) links, or None if there is
+            no route
+        """
+        nodes = [before]
+        if not self._find_route(after, nodes):
+            return None
+
+        plan = list(zip(nodes[:-1], nodes[1:]))
+        self._plans[name] = plan
+        for link in plan:
+            self._chains_by_link.setdefault(frozenset(link), set()).add(name)
+        return plan
+
+    def _find_route(self, after, nodes):
+        """
+        Depth first search from the last node in nodes to after,
+        appending the route to nodes.
+
+        :returns: True if a route was found
+        """
+        candidates = self.repository[nodes[-1]]
+        if after in candidates:
+            nodes.append(after)
+            return True
+        for candidate in candidates:
+            if candidate in nodes:
+                continue
+            nodes.append(candidate)
+            if self._find_route(after, nodes):
+                return True
+            nodes.pop()
+        return False
+
+    def _clear_plans(self):
+        """
+        Forgets all compiled chains and cached results
+        """
+        self._plans.clear()
+        self._results.clear()
+        self._chains_by_link.clear()
@@ -0,0 +1,90 @@
+"""Cached image undistortion for the BARD frame loop"""
+
+import numpy as np
+import cv2
+
+class BardUndistorter:
+    """
+    Undistorts images using remap tables that are built once per
+    calibration and frame size, rather than recomputing the distortion
+    model every frame as cv2.undistort does. The tables are stored in
+    OpenCV's fixed point format, and the output is written into a ring
+    of preallocated buffers.
+    """
+    def __init__(self, buffers = 1):
+        """
+        :param buffers: the number of output buffers to cycle through.
+            Each returned image is valid until this many more calls to
+            undistort have been made, so when the output is consumed on
+            another thread this should cover the depth of the pipeline.
+        :raises ValueError: if buffers is less than 1
+        """
+        if buffers < 1:
+            raise ValueError("BardUndistorter needs at least one buffer")
+        self._buffer_count = buffers
+        self._buffers = []
+        self._next_buffer = 0
+        self._camera_matrix = None
+        self._distortion = None
+        self._frame_shape = None
+        self._map1 = None
+        self._map2 = None
+
+    def undistort(self, image, camera_matrix, distortion):
+        """
+        Undistorts an image, equivalent to
+        cv2.undistort(image, camera_matrix, distortion).
+        The remap tables are rebuilt if the calibration or the image
+        size (e.g. due to a change in region of interest) has changed.
+
+        :param image: the image to undistort
+        :param camera_matrix: 3x3 camera matrix
+        :param distortion: distortion coefficients
+        :returns: the undistorted image, in one of the internal buffers
+        """
+        if not self._maps_valid(image, camera_matrix, distortion):
+            self._build_maps(image, camera_matrix, distortion)
+
+        output = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % self._buffer_count
+
+        cv2.remap(image, self._map1, self._map2, cv2.INTER_LINEAR,
+                  dst = output, borderMode = cv2.BORDER_CONSTANT)
+        return output
+
+    def invalidate(self):
+        """
+        Discards the remap tables and buffers, they will be rebuilt on
+        the next call to undistort
+        """
+        self._frame_shape = None
+        self._map1 = None
+        self._map2 = None
+        self._buffers = []
+
+    def _maps_valid(self, image, camera_matrix, distortion):
+        """
+        Checks whether the cached remap tables can be used for this
+        image and calibration
+        """
+        return (self._map1 is not None and
+                image.shape == self._frame_shape and
+                np.array_equal(camera_matrix, self._camera_matrix) and
+                np.array_equal(distortion, self._distortion))
+
+    def _build_maps(self, image, camera_matrix, distortion):
+        """
+        Builds the fixed point remap tables and output buffers
+        """
+        self._camera_matrix = np.array(camera_matrix, copy = True)
+        self._distortion = np.array(distortion, copy = True)
+        self._frame_shape = image.shape
+
+        height, width = image.shape[0:2]
+        self._map1, self._map2 = cv2.initUndistortRectifyMap(
+                        self._camera_matrix, self._distortion, None,
+                        self._camera_matrix, (width, height), cv2.CV_16SC2)
+
+        self._buffers = [np.empty(image.shape, dtype = image.dtype)
+                         for _ in range(self._buffer_count)]
+        self._next_buffer = 0
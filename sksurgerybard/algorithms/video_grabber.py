@@ -0,0 +1,116 @@
+"""A background video grabber that only keeps the most recent frame"""
+
+import threading
+from time import time, sleep
+
+#pylint:disable=too-many-instance-attributes
+class LatestFrameGrabber:
+    """
+    Continuously reads from a video source on a background thread,
+    keeping only the most recent frame. This stops frames queueing up
+    in the driver buffer when the consumer is slow, so the frame
+    returned by read is never more than one frame old.
+
+    Can be used in place of a TimestampedVideoSource.
+    """
+    def __init__(self, video_source, blocking = False, timeout = 1.0):
+        """
+        :param video_source: a video source implementing read(), e.g.
+            a TimestampedVideoSource or cv2.VideoCapture
+        :param blocking: if True, read waits (up to timeout) for a frame
+            that has not been read before. Otherwise read returns the
+            most recent frame immediately, which may be a repeat.
+        :param timeout: the maximum time in seconds for a blocking read
+        """
+        self._source = video_source
+        self._blocking = blocking
+        self._timeout = timeout
+        self._new_frame = threading.Condition()
+        self._running = threading.Event()
+        self._thread = None
+
+        self._ret = False
+        self._frame = None
+        self._frame_was_read = True
+        self._frame_timestamp = None
+
+        self.timestamp = None
+        self.frame_number = 0
+        self.dropped_frames = 0
+
+    def start(self):
+        """
+        Starts the background capture thread
+        """
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._thread = threading.Thread(target = self._grab_loop,
+                                        daemon = True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background capture thread
+        """
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self):
+        """
+        :returns: True if the background capture thread is running
+        """
+        return self._thread is not None
+
+    def read(self):
+        """
+        Returns the most recently captured frame. Afterwards, timestamp
+        holds the time (as time.time()) at which that frame was captured.
+
+        :returns: ret, frame. ret is False if no frame has been
+            captured yet (or a blocking read timed out).
+        """
+        with self._new_frame:
+            if self._blocking and self._frame_was_read:
+                self._new_frame.wait(self._timeout)
+                if self._frame_was_read:
+                    return False, None
+            self._frame_was_read = True
+            self.timestamp = self._frame_timestamp
+            return self._ret, self._frame
+
+    def isOpened(self): # pylint:disable=invalid-name
+        """
+        Calls the video source's isOpened function, named for
+        consistency with OpenCV
+        """
+        return self._source.isOpened()
+
+    def release(self):
+        """
+        Stops capturing and releases the video source
+        """
+        self.stop()
+        self._source.release()
+
+    def _grab_loop(self):
+        """
+        Capture thread, keeps reading from the source and stores the
+        latest frame
+        """
+        while self._running.is_set():
+            ret, frame = self._source.read()
+            if not ret or frame is None:
+                sleep(0.001)
+                continue
+            with self._new_frame:
+                if not self._frame_was_read:
+                    self.dropped_frames += 1
+                self._ret = ret
+                self._frame = frame
+                self._frame_was_read = False
+                self._frame_timestamp = time()
+                self.frame_number += 1
+                self._new_frame.notify_all()
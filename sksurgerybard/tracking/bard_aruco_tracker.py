@@ -0,0 +1,312 @@
+# coding=utf-8
+
+""" An ArUco tracker with faster ways of finding markers. """
+
+from time import time
+import numpy as np
+from numpy import ravel
+import cv2
+from cv2 import aruco
+from sksurgeryarucotracker.arucotracker import ArUcoTracker
+from sksurgeryarucotracker.algorithms.rigid_bodies import ArUcoRigidBody, \
+        configure_rigid_bodies
+
+
+def _overlap(window, other):
+    """
+    :returns: True if two [x0, y0, x1, y1] windows overlap
+    """
+    return window[0] < other[2] and other[0] < window[2] and \
+                    window[1] < other[3] and other[1] < window[3]
+
+
+def merge_windows(windows):
+    """
+    Merges overlapping windows, until none overlap
+
+    :param windows: a list of [x0, y0, x1, y1] windows
+    :returns: a list of non overlapping [x0, y0, x1, y1] windows
+    """
+    merged = []
+    for window in windows:
+        window = list(window)
+        overlapping = [other for other in merged if _overlap(window, other)]
+        #a merged window may grow to overlap others, so repeat
+        while overlapping:
+            for other in overlapping:
+                merged.remove(other)
+                window = [min(window[0], other[0]),
+                          min(window[1], other[1]),
+                          max(window[2], other[2]),
+                          max(window[3], other[3])]
+            overlapping = [other for other in merged
+                           if _overlap(window, other)]
+        merged.append(window)
+    return merged
+
+
+#pylint:disable=too-many-instance-attributes
+class BardArUcoTracker(ArUcoTracker):
+    """
+    An ArUcoTracker with faster marker detection modes. With 'search
+    windows' in the configuration, markers are looked for in windows
+    around where they were found in the last frame, only searching the
+    whole frame when some are lost, or every 'refresh interval'
+    frames to pick up new markers. With a 'detection scale' below 1,
+    markers are found in a downscaled grayscale image, then their
+    corners are refined to sub pixel accuracy in the full image.
+
+    :param configuration: as ArUcoTracker, plus optionally
+
+        search windows: a dictionary with the 'padding' around each
+        marker's last position, as a fraction of the marker's size
+        (defaults to 0.5), and the 'refresh interval' in frames between
+        whole frame searches (defaults to 30)
+
+        detection scale: the scale to find markers at, in (0, 1],
+        defaults to 1
+
+    With either, ArUcoTracker's debug window is not shown, and frames
+    must be passed to get_frame, so the video source should be 'none'.
+
+    :raises ValueError: if the detection scale is not in (0, 1], or
+        search windows or a detection scale are used with a video source
+    """
+    def __init__(self, configuration):
+        super().__init__(configuration)
+
+        window_config = configuration.get('search windows', None)
+        self._search_windows = window_config is not None
+        if window_config is None:
+            window_config = {}
+        self._window_padding = window_config.get('padding', 0.5)
+        self._refresh_interval = window_config.get('refresh interval', 30)
+
+        self._detection_scale = configuration.get('detection scale', 1.0)
+        if not 0.0 < self._detection_scale <= 1.0:
+            raise ValueError("ArUco detection scale should be in (0, 1], " +
+                             f"not {self._detection_scale}")
+        #how far corners found at the detection scale may be from the
+        #true corner, in full resolution pixels
+        self._refine_window = int(np.ceil(1.0 / self._detection_scale)) + 1
+
+        self._fast_detection = self._search_windows or \
+                        self._detection_scale < 1.0
+        if self._fast_detection and self.has_capture():
+            raise ValueError("ArUco search windows and detection scale " +
+                             "need the video source to be 'none'")
+
+        #our own rigid bodies and calibration, read from the
+        #configuration as ArUcoTracker does
+        self._dictionaries, self._dictionary_names, self._bodies = \
+                        configure_rigid_bodies(configuration)
+        self._tag_size = configuration.get('marker size', 50)
+        self._projection_matrix = configuration.get('camera projection',
+                                                    None)
+        self._distortion = configuration.get('camera distortion',
+                        np.zeros(5, dtype = np.float32))
+        if 'calibration' in configuration:
+            self._projection_matrix = np.loadtxt(
+                            configuration.get('calibration'),
+                            dtype = np.float32, max_rows = 3)
+            self._distortion = np.loadtxt(configuration.get('calibration'),
+                            dtype = np.float32, skiprows = 3, max_rows = 1)
+        self._tracking = False
+        self._frames_tracked = 0
+
+        #per dictionary, the last markers found and the frames since
+        #we last searched the whole frame
+        self._last_markers = {}
+        self._frames_since_refresh = {}
+        self.full_frame_searches = 0
+        self.window_searches = 0
+
+    def start_tracking(self):
+        """
+        Tells the tracker to start tracking, as ArUcoTracker
+
+        :raises ValueError: if not ready
+        """
+        super().start_tracking()
+        self._tracking = True
+
+    def stop_tracking(self):
+        """
+        Tells the tracker to stop tracking, as ArUcoTracker
+
+        :raises ValueError: if not tracking
+        """
+        super().stop_tracking()
+        self._tracking = False
+
+    def get_frame(self, frame=None):
+        """
+        Gets a frame of tracking data, as ArUcoTracker.get_frame. With
+        search windows or a detection scale the markers are found with
+        _detect_markers, and posed with our own copies of the rigid
+        bodies, otherwise this is ArUcoTracker.get_frame.
+
+        :param frame: the image to track in
+        :returns: as ArUcoTracker.get_frame
+        :raises ValueError: if not tracking, or there is no frame
+        """
+        if not self._fast_detection:
+            return super().get_frame(frame)
+
+        if not self._tracking:
+            raise ValueError('Attempted to get frame, when not tracking')
+        if frame is None:
+            raise ValueError('Frame not set, and capture.read failed')
+
+        for rigid_body in self._bodies:
+            rigid_body.reset_2d_points()
+        timestamp = time()
+
+        rigid_bodies = list(self._bodies)
+        for dict_index, ar_dict in enumerate(self._dictionaries):
+            marker_corners, marker_ids = self._detect_markers(frame,
+                            dict_index, ar_dict)
+            if marker_corners:
+                rigid_bodies.extend(self._assign_markers(dict_index,
+                                    marker_corners, marker_ids))
+
+        port_handles = []
+        tracking_rots = []
+        tracking_trans = []
+        quality = []
+        for rigid_body in rigid_bodies:
+            rb_rot, rb_trans, rb_quality = rigid_body.get_pose(
+                            self._projection_matrix, self._distortion)
+            port_handles.append(rigid_body.name)
+            tracking_rots.append(rb_rot)
+            tracking_trans.append(rb_trans)
+            quality.append(rb_quality)
+
+        self.add_frame_to_buffer(port_handles,
+                        [timestamp] * len(port_handles),
+                        [self._frames_tracked] * len(port_handles),
+                        tracking_rots, tracking_trans, quality,
+                        rot_is_quaternion = False)
+        self._frames_tracked += 1
+        return self.get_smooth_frame(port_handles)
+
+    def _assign_markers(self, dict_index, marker_corners, marker_ids):
+        """
+        Gives the markers found to the rigid bodies using their
+        dictionary, as ArUcoTracker does.
+
+        :returns: a single tag rigid body for each marker not on one of
+            the configured rigid bodies
+        """
+        dictionary_name = self._dictionary_names[dict_index]
+        assigned_marker_ids = []
+        for rigid_body in self._bodies:
+            if rigid_body.get_dictionary_name() == dictionary_name:
+                assigned_marker_ids.extend(rigid_body.set_2d_points(
+                                marker_corners, marker_ids))
+
+        unassigned = []
+        for index, marker_id in enumerate(marker_ids):
+            if marker_id[0] not in ravel(assigned_marker_ids):
+                rigid_body = ArUcoRigidBody(
+                                f"{dictionary_name}:{marker_id[0]}")
+                rigid_body.add_single_tag(self._tag_size, marker_id[0],
+                                          self._dictionaries[dict_index])
+                rigid_body.set_2d_points([marker_corners[index]], marker_id)
+                unassigned.append(rigid_body)
+        return unassigned
+
+    def _detect_markers(self, frame, dict_index, ar_dict):
+        """
+        Finds the markers from one dictionary in a frame, in the search
+        windows if we can, otherwise in the whole frame.
+
+        :returns: the marker corners and ids, as aruco.detectMarkers
+        """
+        last_markers = self._last_markers.get(dict_index, None)
+        frames_since_refresh = self._frames_since_refresh.get(dict_index, 0)
+        if self._search_windows and last_markers is not None and \
+                        frames_since_refresh < self._refresh_interval:
+            self.window_searches += 1
+            marker_corners, marker_ids = self._detect_in_windows(frame,
+                            ar_dict, last_markers[0])
+            #if we've lost any markers, they may have moved a long way
+            if len(marker_corners) >= len(last_markers[0]):
+                self._last_markers[dict_index] = (marker_corners,
+                                                  marker_ids)
+                self._frames_since_refresh[dict_index] = \
+                                frames_since_refresh + 1
+                return marker_corners, marker_ids
+
+        self.full_frame_searches += 1
+        marker_corners, marker_ids = self._find_markers(frame, ar_dict)
+        if marker_corners:
+            self._last_markers[dict_index] = (marker_corners, marker_ids)
+        else:
+            self._last_markers.pop(dict_index, None)
+        self._frames_since_refresh[dict_index] = 0
+        return marker_corners, marker_ids
+
+    def _detect_in_windows(self, frame, ar_dict, last_corners):
+        """
+        Finds markers in padded windows around their last corners
+
+        :returns: the marker corners and ids, as aruco.detectMarkers,
+            with the corners in frame coordinates
+        """
+        height, width = frame.shape[0:2]
+        windows = []
+        for corners in last_corners:
+            low = corners.reshape(-1, 2).min(axis = 0)
+            high = corners.reshape(-1, 2).max(axis = 0)
+            padding = self._window_padding * (high - low).max() + 8.0
+            windows.append([max(int(low[0] - padding), 0),
+                            max(int(low[1] - padding), 0),
+                            min(int(high[0] + padding) + 1, width),
+                            min(int(high[1] + padding) + 1, height)])
+
+        marker_corners = []
+        marker_ids = []
+        for x_0, y_0, x_1, y_1 in merge_windows(windows):
+            corners, ids = self._find_markers(frame[y_0:y_1, x_0:x_1],
+                                              ar_dict)
+            offset = np.array([x_0, y_0], dtype = np.float32)
+            for marker, marker_id in zip(corners, ids if ids is not None
+                                         else []):
+                marker_corners.append(marker + offset)
+                marker_ids.append(marker_id)
+
+        if not marker_ids:
+            return (), None
+        return tuple(marker_corners), np.array(marker_ids)
+
+    def _find_markers(self, image, ar_dict):
+        """
+        Finds markers in an image, at the detection scale
+
+        :returns: the marker corners and ids, as aruco.detectMarkers
+        """
+        if self._detection_scale >= 1.0:
+            marker_corners, marker_ids, _ = aruco.detectMarkers(image,
+                                                                ar_dict)
+            return marker_corners, marker_ids
+
+        gray = image
+        if image.ndim == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, None, fx = self._detection_scale,
+                           fy = self._detection_scale,
+                           interpolation = cv2.INTER_AREA)
+        marker_corners, marker_ids, _ = aruco.detectMarkers(small, ar_dict)
+        if not marker_corners:
+            return marker_corners, marker_ids
+
+        #back to full resolution pixel centres, then refine there
+        points = np.concatenate(marker_corners).reshape((-1, 1, 2))
+        points = (points + 0.5) / self._detection_scale - 0.5
+        points = cv2.cornerSubPix(gray, points.astype(np.float32),
+                        winSize = (self._refine_window, self._refine_window),
+                        zeroZone = (-1, -1),
+                        criteria = (cv2.TERM_CRITERIA_EPS +
+                                    cv2.TERM_CRITERIA_COUNT, 30, 0.01))
+        return tuple(points.reshape(-1, 1, 4, 2)), marker_ids
@@ -3,9 +3,9 @@
 """ Overlay class for the BARD application."""
 
 import numpy as np
-from sksurgerycore.transforms.transform_manager import TransformManager
-from sksurgeryarucotracker.arucotracker import ArUcoTracker
 from sksurgerybard.algorithms.bard_config_algorithms import configure_camera
+from sksurgerybard.algorithms.transform_chains import BardTransformManager
+from sksurgerybard.tracking.bard_aruco_tracker import BardArUcoTracker
 
 
 def setup_tracker(configuration):
@@ -25,14 +25,14 @@ def setup_tracker(configuration):
     default_tracker_config['camera projection'] = mtx33d
     default_tracker_config['camera distortion'] = dist5d
 
-    transform_manager = TransformManager()
+    transform_manager = BardTransformManager()
 
     if configuration is None:
-        return ArUcoTracker(default_tracker_config), transform_manager
+        return BardArUcoTracker(default_tracker_config), transform_manager
 
     tracker_config = configuration.get('tracker', None)
     if tracker_config is None:
-        return ArUcoTracker(default_tracker_config), transform_manager
+        return BardArUcoTracker(default_tracker_config), transform_manager
 
     if tracker_config.get('type', 'sksaruco') != 'sksaruco':
         raise ValueError("BARD Currently only supports ArUco trackers")
@@ -47,7 +47,7 @@ def setup_tracker(configuration):
                 transform_manager.add(name + '2tracker',
                                 np.eye(4, dtype = np.float64))
 
-    return ArUcoTracker(tracker_config), transform_manager
+    return BardArUcoTracker(tracker_config), transform_manager
 
 
 def setup_aruco_tracker_camera(configuration):
@@ -0,0 +1,296 @@
+# coding=utf-8
+
+""" Headless benchmark of the BARD frame loop against recorded video. """
+
+import os
+import sys
+import json
+from time import perf_counter
+
+from PySide6.QtWidgets import QApplication # pylint:disable=no-name-in-module
+from sksurgerycore.configuration.configuration_manager import \
+        ConfigurationManager
+from sksurgerybard.widgets.bard_overlay_app import BARDOverlayApp
+from sksurgerybard.algorithms.decimation_benchmark import \
+        benchmark_models_dir, format_decimation_results, load_models_dir, \
+        benchmark_workers, format_worker_results
+from sksurgerybard.algorithms.prediction_benchmark import \
+        track_video, benchmark_prediction, format_prediction_results
+from sksurgerybard.algorithms.detection_benchmark import read_video, \
+        benchmark_detection, format_detection_results
+from sksurgerybard.tracking.bard_tracking import setup_tracker
+from sksurgerybard.algorithms.timing import format_stage_summary
+
+
+def peak_memory_mb():
+    """
+    Returns the peak resident memory of this process in megabytes,
+    or None where the resource module is not available (Windows)
+    """
+    try:
+        import resource # pylint:disable=import-outside-toplevel
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+
+def benchmark_overlay(viewer, max_frames = None, timeout = 1.0):
+    """
+    Calls update_view as fast as possible, until max_frames have been
+    rendered or no new frame has been rendered for timeout seconds
+    (e.g. at the end of a video file).
+
+    :param viewer: a BARDOverlayApp
+    :param max_frames: the number of frames to render, None to run
+        until the video source runs out
+    :param timeout: seconds to wait for a new frame before stopping
+    :returns: a dictionary of results, frames, seconds,
+        frames per second, renders skipped, the final update rate and
+        what limited it, per stage timing and peak memory
+    """
+    #start any capture and processing threads, but we drive
+    #update_view ourselves rather than with the Qt timer
+    viewer.start()
+    viewer.timer.stop()
+
+    rendered = 0
+    start = perf_counter()
+    last_frame = start
+    while max_frames is None or rendered < max_frames:
+        viewer.update_view()
+        count = viewer.stage_timer.count('frame')
+        if count > rendered:
+            rendered = count
+            last_frame = perf_counter()
+        elif perf_counter() - last_frame > timeout:
+            break
+
+    viewer.stop()
+
+    seconds = last_frame - start
+    fps = rendered / seconds if seconds > 0 else 0.0
+    return {'frames' : rendered,
+            'seconds' : seconds,
+            'frames per second' : fps,
+            'skipped renders' : viewer.skipped_renders,
+            'update rate' : viewer.update_rate,
+            'rate limit' : None if viewer.rate_controller is None else
+                            viewer.rate_controller.reason,
+            'stages' : viewer.stage_timer.summary(),
+            'peak memory MB' : peak_memory_mb()}
+
+
+def format_results(results):
+    """
+    :returns: the benchmark results as human readable text
+    """
+    lines = [f"Frames rendered: {results['frames']}",
+             f"Time: {results['seconds']:.3f} s",
+             f"Frames per second: {results['frames per second']:.2f}",
+             f"Renders skipped: {results['skipped renders']}"]
+    if results['rate limit'] is not None:
+        lines.append(f"Update rate: {results['update rate']:.1f} Hz, " +
+                     f"limited by {results['rate limit']}")
+    if results['peak memory MB'] is not None:
+        lines.append(f"Peak memory: {results['peak memory MB']:.1f} MB")
+    lines.append(format_stage_summary(results['stages']))
+    return "\n".join(lines)
+
+
+def replace_video_source(configuration, video_file):
+    """
+    Replaces the camera source in the configuration with video_file.
+    If the tracker was using the same source as the camera, that is
+    replaced too, so we don't try to open a live camera.
+    """
+    camera_config = configuration.get('camera', {})
+    old_source = camera_config.get('source', 0)
+    camera_config['source'] = video_file
+    configuration['camera'] = camera_config
+
+    tracker_config = configuration.get('tracker', None)
+    if tracker_config is not None:
+        for key in ['source', 'video source']:
+            if tracker_config.get(key, None) == old_source:
+                tracker_config[key] = video_file
+
+    return configuration
+
+
+def run_benchmark(config_file, calib_dir, video_file = None,
+                  max_frames = None, output_file = None):
+    """
+    Runs the full BARD pipeline offscreen against a video file and
+    reports the frame rate, per stage latency and peak memory.
+
+    :param config_file: BARD configuration file, may be None
+    :param calib_dir: calibration directory, may be None
+    :param video_file: if set, overrides the camera source in the
+        configuration
+    :param max_frames: the maximum number of frames to process
+    :param output_file: if set, the results are written here as json
+    :returns: the results dictionary
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    _app = QApplication.instance() or QApplication([])
+
+    configuration = {}
+    if config_file is not None:
+        configurer = ConfigurationManager(config_file)
+        configuration = configurer.get_copy()
+
+    if video_file is not None:
+        configuration = replace_video_source(configuration, video_file)
+
+    viewer = BARDOverlayApp(configuration, calib_dir)
+    #with the offscreen platform nothing is displayed, but showing the
+    #widget gives the render window a size, so we really render
+    viewer.vtk_overlay_window.Initialize()
+    viewer.show()
+    results = benchmark_overlay(viewer, max_frames)
+
+    print(format_results(results))
+
+    if output_file:
+        with open(output_file, 'w', encoding = 'utf-8') as fileout:
+            json.dump(results, fileout, indent = 4)
+
+    return results
+
+
+def run_decimation_benchmark(config_file, target_vertices,
+                             output_file = None, workers = None):
+    """
+    Decimates the models in the configuration's models_dir with each
+    decimation engine, reporting the time taken, the achieved number of
+    vertices and the deviation from the original surface. With workers
+    set, instead compares decimating all the models serially and on
+    that many threads.
+
+    :param config_file: BARD configuration file
+    :param target_vertices: the target number of vertices
+    :param output_file: if set, the results are written here as json
+    :param workers: if set, the number of decimation workers to compare
+        with serial decimation
+    :returns: the list of results
+    :raises ValueError: if the configuration has no models_dir
+    """
+    configuration = {}
+    if config_file is not None:
+        configurer = ConfigurationManager(config_file)
+        configuration = configurer.get_copy()
+
+    models_dir = configuration.get('models', {}).get('models_dir', None)
+    if models_dir is None:
+        raise ValueError("The decimation benchmark needs a configuration "
+                         "with models_dir set in models")
+
+    if workers is not None:
+        results = benchmark_workers(load_models_dir(models_dir),
+                                    target_vertices, workers)
+        print(format_worker_results(results))
+    else:
+        results = benchmark_models_dir(models_dir, target_vertices)
+        print(format_decimation_results(results))
+
+    if output_file:
+        with open(output_file, 'w', encoding = 'utf-8') as fileout:
+            json.dump(results, fileout, indent = 4)
+
+    return results
+
+
+def _tracking_configuration(config_file, video_file):
+    """
+    Reads the configuration, set up for us to feed the video's frames
+    to the tracker ourselves.
+    """
+    configuration = {}
+    if config_file is not None:
+        configurer = ConfigurationManager(config_file)
+        configuration = configurer.get_copy()
+
+    configuration = replace_video_source(configuration, video_file)
+    tracker_config = configuration.get('tracker', {})
+    tracker_config.pop('source', None)
+    tracker_config['video source'] = 'none'
+    configuration['tracker'] = tracker_config
+    return configuration
+
+
+def run_prediction_benchmark(config_file, video_file, latency,
+                             output_file = None):
+    """
+    Tracks the rigid bodies in the configuration through a video file,
+    then replays the tracking to compare how far the displayed poses
+    are from the true poses latency seconds later, and how much they
+    jitter, with and without pose prediction.
+
+    :param config_file: BARD configuration file
+    :param video_file: the recorded video to track
+    :param latency: the latency to hide, in seconds
+    :param output_file: if set, the results are written here as json
+    :returns: the list of results
+    :raises ValueError: if there is no video file
+    """
+    if video_file is None:
+        raise ValueError("The prediction benchmark needs a video file")
+
+    configuration = _tracking_configuration(config_file, video_file)
+    tracker_config = configuration['tracker']
+    tracker, _transform_manager = setup_tracker(configuration)
+    sequences = track_video(video_file, tracker)
+    results = benchmark_prediction(sequences, latency,
+                    tracker_config.get('velocity window', 1),
+                    tracker_config.get('max prediction', 0.1))
+
+    print(format_prediction_results(results))
+
+    if output_file:
+        with open(output_file, 'w', encoding = 'utf-8') as fileout:
+            json.dump(results, fileout, indent = 4)
+
+    return results
+
+
+def run_detection_benchmark(config_file, video_file, scales,
+                            output_file = None):
+    """
+    Tracks a video with the configured tracker at each detection scale,
+    reporting the time taken and how far the configured rigid bodies'
+    poses are from those found at full scale.
+
+    :param config_file: BARD configuration file
+    :param video_file: the recorded video to track
+    :param scales: a list of detection scales in (0, 1], full scale is
+        always included, as the reference
+    :param output_file: if set, the results are written here as json
+    :returns: the list of results
+    :raises ValueError: if there is no video file
+    """
+    if video_file is None:
+        raise ValueError("The detection benchmark needs a video file")
+
+    trackers = {}
+    for scale in [1.0] + [scale for scale in scales if scale != 1.0]:
+        configuration = _tracking_configuration(config_file, video_file)
+        configuration['tracker']['detection scale'] = scale
+        trackers[f'scale {scale}'], _transform_manager = \
+                        setup_tracker(configuration)
+
+    #single tags far from the camera give noisy poses, so we only
+    #compare the configured rigid bodies
+    bodies = [body.get('name') for body in
+              configuration['tracker'].get('rigid bodies', [])] or None
+    results = benchmark_detection(read_video(video_file), trackers, bodies)
+
+    print(format_detection_results(results))
+
+    if output_file:
+        with open(output_file, 'w', encoding = 'utf-8') as fileout:
+            json.dump(results, fileout, indent = 4)
+
+    return results
@@ -0,0 +1,105 @@
+# coding=utf-8
+
+""" CLI for the headless BARD benchmark. """
+
+import argparse
+
+from sksurgerybard import __version__
+from sksurgerybard.ui.bard_benchmark_app import run_benchmark, \
+        run_decimation_benchmark, run_prediction_benchmark, \
+        run_detection_benchmark
+
+
+def main(args=None):
+
+    """ Entry point for bardBenchmark application. """
+
+    parser = argparse.ArgumentParser(
+        description='Basic Augmented Reality Demo - '
+                    'Headless benchmark against recorded video')
+
+    parser.add_argument("-c", "--config",
+                        required=False,
+                        type=str,
+                        help="Configuration file containing the parameters.")
+
+    parser.add_argument("-d", "--calib_dir",
+                        required=False,
+                        type=str,
+                        help="Directory containing calibration data.")
+
+    parser.add_argument("-i", "--video",
+                        required=False,
+                        type=str,
+                        help="Video file to replay, overrides the camera "
+                             "source in the configuration.")
+
+    parser.add_argument("-n", "--frames",
+                        required=False,
+                        type=int,
+                        help="Maximum number of frames to process, "
+                             "defaults to the whole video.")
+
+    parser.add_argument("-o", "--output",
+                        required=False,
+                        type=str,
+                        help="File to write the results to, as json.")
+
+    parser.add_argument("--decimation",
+                        required=False,
+                        type=int,
+                        help="Instead of the frame loop, benchmark each "
+                             "decimation engine on the configured models, "
+                             "with this target number of vertices.")
+
+    parser.add_argument("--decimation-workers",
+                        required=False,
+                        type=int,
+                        help="With --decimation, instead compare "
+                             "decimating all the configured models "
+                             "serially and on this many threads.")
+
+    parser.add_argument("--prediction",
+                        required=False,
+                        type=float,
+                        help="Instead of the frame loop, benchmark pose "
+                             "prediction on the tracking in the video, "
+                             "hiding this latency in milliseconds.")
+
+    parser.add_argument("--detection",
+                        required=False,
+                        type=float,
+                        nargs='+',
+                        help="Instead of the frame loop, benchmark ArUco "
+                             "detection on the video at these detection "
+                             "scales, against full scale.")
+
+    version_string = __version__
+    friendly_version_string = version_string if version_string else 'unknown'
+    parser.add_argument(
+        "--version",
+        action='version',
+        version='scikit-surgerybard version ' + friendly_version_string)
+
+    args = parser.parse_args(args)
+
+    if args.decimation_workers is not None and args.decimation is None:
+        parser.error("--decimation-workers needs --decimation")
+
+    if args.decimation is not None:
+        run_decimation_benchmark(args.config, args.decimation, args.output,
+                                 args.decimation_workers)
+        return
+
+    if args.prediction is not None:
+        run_prediction_benchmark(args.config, args.video,
+                                 args.prediction / 1000.0, args.output)
+        return
+
+    if args.detection is not None:
+        run_detection_benchmark(args.config, args.video, args.detection,
+                                args.output)
+        return
+
+    run_benchmark(args.config, args.calib_dir, args.video, args.frames,
+                  args.output)
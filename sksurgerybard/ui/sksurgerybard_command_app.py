@@ -28,4 +28,5 @@ def run_demo(config_file, calib_dir):
 
     app.exec_()
 
+    viewer.stop()
     viewer.vtk_overlay_window.Finalize()
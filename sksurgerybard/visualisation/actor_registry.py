@@ -0,0 +1,115 @@
+# # coding=utf-8
+
+""" An index of the actors in the BARD scene, by category and name. """
+
+#the categories of actor, in the order they are added to the renderer
+ACTOR_CATEGORIES = ('visible anatomy', 'target anatomy', 'reference',
+                    'pointers')
+
+class ActorRegistry:
+    """
+    Keeps the actors in the scene indexed by category and by name,
+    so we can look them up without iterating over the renderer's actor
+    collection.
+    """
+    def __init__(self):
+        self._categories = {category : [] for category in ACTOR_CATEGORIES}
+        self._names = {}
+        self._actor_names = {}
+        self._actor_categories = {}
+
+    def add(self, actor, category, name = None):
+        """
+        Adds an actor to the registry
+
+        :param actor: the vtkActor
+        :param category: one of ACTOR_CATEGORIES
+        :param name: an optional unique name to look the actor up by
+        :raises ValueError: if the category is not known, the name is
+            already used, or the actor is already registered
+        """
+        if category not in self._categories:
+            raise ValueError(f"Unknown actor category {category}, " +
+                             f"should be one of {ACTOR_CATEGORIES}")
+        if name is not None and name in self._names:
+            raise ValueError(f"An actor called {name} is already registered")
+        if actor in self._actor_categories:
+            raise ValueError("Actor is already registered")
+
+        self._categories[category].append(actor)
+        self._actor_categories[actor] = category
+        if name is not None:
+            self._names[name] = actor
+            self._actor_names[actor] = name
+
+    def remove(self, actor):
+        """
+        Removes an actor from the registry
+
+        :raises KeyError: if the actor is not registered
+        """
+        category = self._actor_categories.pop(actor)
+        self._categories[category].remove(actor)
+        name = self._actor_names.pop(actor, None)
+        if name is not None:
+            del self._names[name]
+
+    def unique_name(self, name, reserved = ()):
+        """
+        :param name: the name we'd like to register an actor with
+        :param reserved: names that may not be used, though they are
+            not registered yet
+        :returns: name, or if it is already used or reserved, name with
+            the lowest numeric suffix that isn't, e.g. 'liver 2'
+        """
+        unique = name
+        suffix = 1
+        while unique in self._names or unique in reserved:
+            suffix += 1
+            unique = f"{name} {suffix}"
+        return unique
+
+    def get(self, name):
+        """
+        :returns: the actor registered with a name
+        :raises KeyError: if there is no actor with that name
+        """
+        return self._names[name]
+
+    def get_category(self, category):
+        """
+        :returns: the list of actors in a category, in the order they
+            were added. Don't modify it, use add and remove.
+        :raises KeyError: if the category is not known
+        """
+        return self._categories[category]
+
+    def get_anatomy(self):
+        """
+        :returns: a list of the visible then target anatomy actors
+        """
+        return self._categories['visible anatomy'] + \
+                        self._categories['target anatomy']
+
+    def get_all(self):
+        """
+        :returns: a list of all the actors, in category order
+        """
+        actors = []
+        for category in ACTOR_CATEGORIES:
+            actors += self._categories[category]
+        return actors
+
+    def model_list(self):
+        """
+        :returns: a dictionary of the number of actors in each category,
+            as used by BardVisualisation
+        """
+        return {category : len(actors)
+                for category, actors in self._categories.items()}
+
+    def __len__(self):
+        return len(self._actor_categories)
+
+    def __contains__(self, actor):
+        return actor in self._actor_categories
@@ -0,0 +1,57 @@
+# # coding=utf-8
+
+""" The video background, updated in place each frame. """
+
+import cv2
+
+class VideoTexture:
+    """
+    Updates the overlay window's video background in place. The
+    window's image importer is left pointing at the window's own RGB
+    frame buffer, and each frame is colour converted straight into that
+    buffer, rather than copied into a new array and imported, as
+    VTKOverlayWindow.set_video_image does.
+
+    When the frame size changes, or something else has called the
+    window's set_video_image and so replaced its buffer, the image is
+    passed to set_video_image once more, so the window sets up its
+    extents, background camera and projection for it.
+
+    Only the layer 0 video background is handled, windows with video in
+    layer 2 should use set_video_image.
+    """
+    def __init__(self, overlay_window):
+        """
+        :param overlay_window: the VTKOverlayWindow to show the video in
+        """
+        self._overlay_window = overlay_window
+        self.image_data = overlay_window.rgb_image_importer.GetOutput()
+        self.buffer = None
+        self.allocations = 0
+
+    def set_image(self, image):
+        """
+        Updates the video background
+
+        :param image: the BGR video image, may be a view, e.g. a
+            region of interest
+        """
+        if self.buffer is None or self.buffer.shape != image.shape or \
+                self.buffer is not self._overlay_window.rgb_frame:
+            self._allocate(image)
+            return
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst = self.buffer)
+        importer = self._overlay_window.rgb_image_importer
+        importer.Modified()
+        importer.Update()
+
+    def _allocate(self, image):
+        """
+        Gives the overlay window the image, so it creates a buffer and
+        sets up its background for the image's size, then keeps the
+        window's buffer to convert later frames into.
+        """
+        self._overlay_window.set_video_image(image)
+        self.buffer = self._overlay_window.rgb_frame
+        self.image_data = self._overlay_window.rgb_image_importer.GetOutput()
+        self.allocations += 1
@@ -3,22 +3,48 @@
 """ Overlay class for the BARD application."""
 
 import os
+import datetime
+from time import perf_counter, time
 import numpy as np
 import cv2
 
-from sksurgeryvtk.utils.matrix_utils import create_vtk_matrix_from_numpy
 from sksurgeryutils.common_overlay_apps import OverlayBaseWidget
+from sksurgeryvtk.models.vtk_surface_model_directory_loader import \
+        VTKSurfaceModelDirectoryLoader
 from sksurgeryarucotracker.arucotracker import ArUcoTracker
 from sksurgerybard.algorithms.bard_config_algorithms import \
     configure_interaction, configure_camera, replace_calibration_dir
 from sksurgerybard.visualisation.bard_visualisation import \
                 configure_model_and_ref, BardVisualisation, configure_pointer
+from sksurgerybard.visualisation.actor_registry import ActorRegistry
+from sksurgerybard.visualisation.video_texture import VideoTexture
 from sksurgerybard.algorithms.bard_config_speech import \
     configure_speech_interaction
 from sksurgerybard.algorithms.pointer import BardPointerWriter
-from sksurgerybard.algorithms.decimation import decimate_actor
+from sksurgerybard.algorithms.decimation import decimate_actor, \
+        decimate_actors
+from sksurgerybard.algorithms.pipeline import BardPipeline
+from sksurgerybard.algorithms.frame_pool import FramePool, can_read_into
+from sksurgerybard.algorithms.undistortion import BardUndistorter
+from sksurgerybard.algorithms.video_grabber import LatestFrameGrabber
+from sksurgerybard.algorithms.timing import StageTimer
+from sksurgerybard.algorithms.level_of_detail import LevelOfDetail
+from sksurgerybard.algorithms.rate_control import RateController
+from sksurgerybard.algorithms.session_recorder import SessionRecorder
+from sksurgerybard.algorithms.pose_binding import PoseBinding
+from sksurgerybard.algorithms.pose_history import MOTION_MODELS, \
+        PoseHistory
+from sksurgerybard.algorithms.model_cache import ModelCache, \
+        BardModelDirectoryLoader
 from sksurgerybard.tracking.bard_tracking import setup_tracker
 
+#the names of the actors BARD adds itself, which models can't use
+BUILT_IN_ACTOR_NAMES = ('modelreference', 'pointerref', 'pointer tip')
+
+#the stages run on background threads in pipelined mode
+PIPELINE_STAGES = ('capture', 'roi', 'undistort', 'tracking', 'record')
+
+#pylint:disable=too-many-instance-attributes
 class BARDOverlayApp(OverlayBaseWidget):
     """
     Inherits from OverlayBaseApp, and adds methods to
@@ -30,6 +56,14 @@ class BARDOverlayApp(OverlayBaseWidget):
         which we need for the aruco tag detection.
         """
         self._speech_int = None
+        self._pipeline = None
+        self._grabber = None
+        self._log_timing_on_exit = False
+        self._timing_logged = False
+        #actors are moved by updating persistent matrices in place
+        self._pose_binding = PoseBinding()
+        #actors by category and name, so we never search the renderer
+        self._actors = ActorRegistry()
         if configuration is None:
             configuration = {}
 
@@ -55,6 +89,10 @@ class BARDOverlayApp(OverlayBaseWidget):
         pointer_spheres, pointer_tip_sphere, pointer_tip = \
                         configure_pointer(configuration, self.transform_manager)
 
+        #work out the chains of transforms we need every frame once
+        self.transform_manager.compile(["camera2modelreference",
+                                        "pointerref2modelreference"])
+
         # call the constructor for the base class
         try:
             super().__init__(video_source, dims, init_vtk_widget=False)
@@ -68,6 +106,9 @@ class BARDOverlayApp(OverlayBaseWidget):
         update_rate = configuration.get("update rate", 30)
         self.update_rate = update_rate
 
+        self._setup_motion_model(configuration.get('tracker', {}))
+        self._setup_frame_loop(configuration)
+
         # This sets the camera calibration matrix to a matrix that was
         # either read in from command line or from config, or a reasonable
         # default for a 640x480 webcam.
@@ -88,40 +129,48 @@ class BARDOverlayApp(OverlayBaseWidget):
                         self.transform_manager, outdir, pointer_tip)
         self._resize_flag = True
 
+        self.session_recorder = self._setup_recording(configuration, outdir)
+
+        #the video background is updated in place, unless the window
+        #also shows video in layer 2. Give it frames through
+        #_render_frame, rather than the window's set_video_image, which
+        #replaces the buffer the texture converts into
+        self._video_texture = None
+        if not self.vtk_overlay_window.video_in_layer_2:
+            self._video_texture = VideoTexture(self.vtk_overlay_window)
+
+        #with render on change, we skip the render when the video image,
+        #camera and actors haven't changed since the last one
+        self._render_on_change = configuration.get('render on change', False)
+        self._last_capture_time = None
+        self._rendered_mtime = 0
+        self.skipped_renders = 0
+
+        self._setup_model_loading(configuration)
+        models = []
         if models_path:
-            self.add_vtk_models_from_dir(models_path)
+            models = self.add_vtk_models_from_dir(models_path)
 
-
-        self._model_list = {'visible anatomy' : 0,
-                            'target anatomy' : 0,
-                            'reference' : 0,
-                            'pointers' : 0}
-
-        self._model_list['visible anatomy'] = visible_anatomy
+        self._register_models(models, visible_anatomy, models_path)
+        self._model_list = self._actors.model_list()
 
         self._decimate_actors(target_vertices)
-
-        for index, _ in enumerate(self._get_all_actors()):
-            if index >= visible_anatomy:
-                self._model_list['target anatomy'] = \
-                                self._model_list.get('target anatomy') + 1
-
-        self.position_model_actors()
+        self._setup_level_of_detail(configuration)
 
         if ref_spheres is not None:
-            self.vtk_overlay_window.add_vtk_actor(ref_spheres.actor)
-            self._model_list['reference'] = 1
+            self.add_actor(ref_spheres.actor, 'reference', 'modelreference')
 
         if pointer_spheres is not None:
-            self.vtk_overlay_window.add_vtk_actor(
-                pointer_spheres.actor)
-            self._model_list['pointers'] = self._model_list.get('pointers') + 1
+            self.add_actor(pointer_spheres.actor, 'pointers', 'pointerref')
 
         if pointer_tip_sphere is not None:
-            self.vtk_overlay_window.add_vtk_actor(pointer_tip_sphere.actor)
-            self._model_list['pointers'] = self._model_list.get('pointers') + 1
+            self.add_actor(pointer_tip_sphere.actor, 'pointers',
+                           'pointer tip')
+
+        self._group_actors()
+        self.position_model_actors()
 
-        bard_visualisation = BardVisualisation(self._get_all_actors(),
+        bard_visualisation = BardVisualisation(self._actors.get_all(),
                                                self._model_list,
                                                model_visibilities,
                                                model_opacities,
@@ -139,6 +188,254 @@ class BARDOverlayApp(OverlayBaseWidget):
     def __del__(self):
         if self._speech_int is not None:
             self._speech_int.stop_listener()
+        if self._pipeline is not None:
+            self._pipeline.stop()
+        if self._grabber is not None:
+            self._grabber.stop()
+        #stop should have written the summary, but may not have been called
+        if self._log_timing_on_exit and not self._timing_logged:
+            self.stage_timer.write_summary()
+
+    def _setup_recording(self, configuration, outdir):
+        """
+        Creates the session recorder, which records the frames and poses
+        while running, to a file in the out path unless a filename is
+        given.
+
+        :returns: a SessionRecorder, or None if recording is not
+            configured
+        """
+        recording = configuration.get('recording', None)
+        if recording is None:
+            return None
+        filename = recording.get('filename', os.path.join(outdir,
+                    'bard_session_' +
+                    datetime.datetime.now().strftime('%Y%m%d_%H%M%S') +
+                    '.bardrec'))
+        return SessionRecorder(filename,
+                    recording.get('compression', 'none'),
+                    recording.get('max pending frames', 30))
+
+    def _register_models(self, models, visible_anatomy, models_path):
+        """
+        Adds the models to the actor registry. The first visible_anatomy
+        models are visible anatomy, the rest are targets. Models are
+        renamed rather than clash with each other or with the actors
+        BARD adds itself.
+        """
+        for index, model in enumerate(models):
+            category = 'target anatomy'
+            if index < visible_anatomy:
+                category = 'visible anatomy'
+            name = self._actors.unique_name(model.get_name(),
+                                            BUILT_IN_ACTOR_NAMES)
+            if name != model.get_name():
+                print(f"Warning: model {model.get_name()} in models_dir " +
+                      f"{models_path} is already used as an actor name, " +
+                      f"renaming it {name}")
+            self._actors.add(model.actor, category, name)
+
+    def _setup_model_loading(self, configuration):
+        """
+        Models can be cached in a binary format for faster loading,
+        and decimated on several threads.
+        """
+        self._model_cache = None
+        model_config = configuration.get('models', None)
+        if model_config is None:
+            model_config = {}
+        if model_config.get('cache directory', None) is not None:
+            self._model_cache = ModelCache(
+                            model_config.get('cache directory'))
+        self._decimation_workers = model_config.get('decimation workers', 1)
+        #the decimation engine, 'pro' or 'quadric', one for all models
+        #or one per model
+        self._decimation_engines = model_config.get('decimation engines',
+                                                    ['pro'])
+        self._level_of_detail = None
+
+    def _setup_level_of_detail(self, configuration):
+        """
+        If level of detail is configured, builds decimation levels for
+        the anatomy, which are switched between to hold the frame budget.
+        Call after the models are loaded and decimated.
+        """
+        model_config = configuration.get('models', None)
+        if model_config is None or \
+                model_config.get('level of detail', None) is None:
+            return
+
+        #in pipelined mode the frame time judged against the budget
+        #includes the background stages, see _get_frame_cost
+        lod_config = model_config.get('level of detail')
+        self._level_of_detail = LevelOfDetail(
+                        self._actors.get_anatomy(),
+                        lod_config.get('levels', [1.0, 0.5, 0.25]),
+                        lod_config.get('frame budget', 1.0 / self.update_rate),
+                        self._model_cache,
+                        lod_config.get('engine', 'pro'),
+                        hold_frames = lod_config.get('hold frames', 30))
+
+    def _setup_frame_loop(self, configuration):
+        """
+        Sets up stage timing and undistortion, and optionally background
+        video capture and pipelined processing.
+        """
+        timing_config = configuration.get('timing', {})
+        self.stage_timer = StageTimer(
+                        timing_config.get('buffer size', 256),
+                        timing_config.get('log file', None),
+                        timing_config.get('log interval', None))
+        self._log_timing_on_exit = timing_config.get('log on exit', False)
+
+        self._undistorter = BardUndistorter()
+        pipelined = configuration.get("pipelined", False)
+
+        #a history of tracked poses, so we can use the poses at the
+        #time each video frame was captured, or predict them forward
+        #to the time they are drawn
+        tracker_config = configuration.get('tracker', {})
+        self._align_to_capture_time = tracker_config.get(
+                        'align to capture time', False)
+        self.pose_history = None
+        history_size = tracker_config.get('pose history', 0)
+        if (self._align_to_capture_time or self._predict_poses) and \
+                        history_size == 0:
+            history_size = 64
+        if history_size > 0:
+            self.pose_history = PoseHistory(history_size)
+
+        #an adaptive update rate starts at the update rate, then moves to
+        #the highest rate the frame cost and video source allow
+        self.rate_controller = None
+        rate_config = configuration.get('adaptive update rate', None)
+        if rate_config is not None:
+            self.rate_controller = RateController(self.update_rate,
+                        rate_config.get('minimum', 1.0),
+                        rate_config.get('maximum', 60.0),
+                        rate_config.get('source rate',
+                                        self._get_source_rate()),
+                        hold_frames = rate_config.get('hold frames', 30))
+            self.update_rate = self.rate_controller.rate
+
+        #capture reads into preallocated frames, which are handed back
+        #once processed. Not with a background grabber, which can't know
+        #when the frames it hands out have been finished with.
+        camera_config = configuration.get('camera', {})
+        queue_size = configuration.get("pipeline queue size", 2)
+        self._frame_pool = None
+        if camera_config.get('frame pool', True) and \
+                not camera_config.get('background capture', False) and \
+                can_read_into(self.video_source):
+            capture = self.video_source.source
+            self._frame_pool = FramePool(
+                        (int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                         int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), 3),
+                        buffers = queue_size + 2 if pipelined else 1)
+
+        #a background grabber drains the video source so that we only
+        #ever see the latest frame, while running
+        if camera_config.get('background capture', False):
+            self._grabber = LatestFrameGrabber(self.video_source,
+                                               blocking = pipelined)
+            self.video_source = self._grabber
+
+        #in pipelined mode capture, undistortion and tracking run on
+        #background threads, and update_view only renders
+        if pipelined:
+            self._pipeline = BardPipeline(self._capture_frame,
+                            self._process_frame, queue_size,
+                            self._release_frame)
+            #undistorted images may be queued or rendering while the
+            #next one is written, so they need their own buffers
+            self._undistorter = BardUndistorter(buffers = queue_size + 2)
+
+    def _setup_motion_model(self, tracker_config):
+        """
+        Reads the optional motion model from the tracker configuration.
+        With 'constant velocity', each tracked pose is extrapolated
+        forward by the time since its frame was captured, so the overlay
+        doesn't lag behind camera motion by the processing latency.
+
+        :raises ValueError: if the motion model is not known
+        """
+        motion_model = tracker_config.get('motion model', 'none')
+        if motion_model not in MOTION_MODELS:
+            raise ValueError(f"Unknown motion model {motion_model}, " +
+                             f"should be one of {MOTION_MODELS}")
+        self._predict_poses = motion_model == 'constant velocity'
+        #the furthest we'll extrapolate, and any fixed latency after
+        #the render (e.g. the display's) to add to the measured latency
+        self._max_prediction = tracker_config.get('max prediction', 0.1)
+        self._prediction_lead = tracker_config.get('prediction lead', 0.0)
+        self._velocity_window = tracker_config.get('velocity window', 1)
+
+    def _get_source_rate(self):
+        """
+        :returns: the video source's frame rate, or None if it doesn't
+            say
+        """
+        capture = getattr(self.video_source, 'source', None)
+        if not isinstance(capture, cv2.VideoCapture):
+            return None
+        rate = capture.get(cv2.CAP_PROP_FPS)
+        if rate <= 0:
+            return None
+        return rate
+
+    def add_vtk_models_from_dir(self, directory):
+        """
+        Add VTK models to the foreground, going through the model
+        cache if there is one.
+        :param: directory, location of models
+        :returns: the list of models added
+        """
+        if self._model_cache is None:
+            model_loader = VTKSurfaceModelDirectoryLoader(directory)
+        else:
+            model_loader = BardModelDirectoryLoader(directory,
+                                                    self._model_cache)
+        self.vtk_overlay_window.add_vtk_models(model_loader.models)
+        return model_loader.models
+
+    def add_actor(self, actor, category, name = None):
+        """
+        Adds an actor to the overlay, registering it by category and
+        name, and binding it to its category's transform.
+        Actors added after startup are not controlled by the
+        interaction and speech visualisation.
+
+        :param actor: the vtkActor
+        :param category: 'visible anatomy', 'target anatomy',
+            'reference' or 'pointers'
+        :param name: an optional unique name for the actor
+        :raises ValueError: if the category is not known or the name is
+            already used
+        """
+        self._actors.add(actor, category, name)
+        self.vtk_overlay_window.add_vtk_actor(actor)
+        self._model_list = self._actors.model_list()
+        self._group_actors()
+
+    def remove_actor(self, name):
+        """
+        Removes a named actor from the overlay and the registry
+
+        :raises KeyError: if there is no actor with that name
+        """
+        actor = self._actors.get(name)
+        self._actors.remove(actor)
+        self.vtk_overlay_window.get_renderer(layer=1).RemoveActor(actor)
+        self._model_list = self._actors.model_list()
+        self._group_actors()
+
+    def get_actor(self, name):
+        """
+        :returns: the actor with a name, models are named after their
+            file name, without the extension
+        :raises KeyError: if there is no actor with that name
+        """
+        return self._actors.get(name)
 
     def position_model_actors(self, increment = None):
         """
@@ -154,36 +451,242 @@ class BARDOverlayApp(OverlayBaseWidget):
                     self.transform_manager.get('model2modelreference'),
                     fmt='%.4e')
 
-        matrix = create_vtk_matrix_from_numpy(np_mref2model)
-        for index, actor in enumerate(self._get_all_actors()):
-            if index < self._model_list['visible anatomy'] + \
-                    self._model_list['target anatomy']:
-                actor.SetUserMatrix(matrix)
+        self._pose_binding.update('modelreference2model', np_mref2model)
+
+    def start(self):
+        """
+        Starts the timer, the background grabber and the capture and
+        processing threads if configured, and recording if configured.
+        """
+        self._timing_logged = False
+        if self.session_recorder is not None:
+            self.session_recorder.start()
+        if self._grabber is not None:
+            self._grabber.start()
+        if self._pipeline is not None:
+            self._pipeline.start()
+        super().start()
+
+    def stop(self):
+        """
+        Stops the timer, the capture and processing threads and the
+        background grabber if running, then finishes the recording and
+        writes the timing summary if configured.
+        """
+        super().stop()
+        if self._pipeline is not None:
+            self._pipeline.stop()
+        if self._grabber is not None:
+            self._grabber.stop()
+        if self._log_timing_on_exit and not self._timing_logged:
+            self.stage_timer.write_summary()
+            self._timing_logged = True
+        if self.session_recorder is not None:
+            self.session_recorder.stop()
+            print(f"Recorded {self.session_recorder.frames_written} " +
+                  f"frames to {self.session_recorder.filename}, dropped " +
+                  f"{self.session_recorder.dropped_frames}")
 
     def update_view(self):
         """
-        Update the background render with a new frame
+        Update the background render with a new frame. In pipelined
+        mode capture, undistortion and tracking have already been
+        done on background threads, so we just render the newest result.
+        """
+        frame_start = perf_counter()
+        if self._pipeline is not None:
+            result = self._pipeline.get_latest()
+            if result is None:
+                return
+            undistorted, tracking, capture_time = result #pylint:disable=unpacking-non-sequence
+        else:
+            frame = self._capture_frame()
+            if frame is None:
+                return
+            undistorted, tracking, capture_time = self._process_frame(frame)
+            self._release_frame(frame)
+
+        self._render_frame(undistorted, tracking, capture_time)
+
+        frame_time = perf_counter() - frame_start
+        self.stage_timer.record('frame', frame_time)
+        self.stage_timer.log_periodically()
+        if self._level_of_detail is not None:
+            self._level_of_detail.update(self._get_frame_cost(frame_time))
+        if self.rate_controller is not None:
+            self._update_rate(frame_time, frame_start)
+
+    def _get_frame_cost(self, frame_time):
+        """
+        :param frame_time: the time update_view took
+        :returns: the time spent on the frame. In pipelined mode the
+            latest capture, undistortion, tracking and recording times
+            from the background threads are added, so level of detail
+            also drops when those are the bottleneck. As the stages
+            overlap this errs towards a lower level of detail.
+        """
+        if self._pipeline is None:
+            return frame_time
+        return frame_time + sum(self.stage_timer.last(stage)
+                                for stage in PIPELINE_STAGES)
+
+    def _update_rate(self, frame_time, frame_start):
+        """
+        Passes the frame time to the rate controller, and if it changes
+        the update rate, changes the timer interval and reports why.
+        """
+        if not self.rate_controller.update(frame_time, frame_start):
+            return
+        self.update_rate = self.rate_controller.rate
+        if self.timer.isActive():
+            self.timer.setInterval(self.rate_controller.get_interval())
+        print(self.rate_controller.report())
+
+    def _capture_frame(self):
+        """
+        Capture stage, reads a frame from the video source and crops
+        it to the region of interest.
+
+        :returns: the cropped image and its capture time in seconds,
+            or None if the read failed
         """
-        _, image = self.video_source.read()
+        capture_start = perf_counter()
+        if self._frame_pool is not None:
+            _, image = self._frame_pool.read(self.video_source)
+        else:
+            _, image = self.video_source.read()
+        if image is None:
+            return None
+        capture_time = self._get_capture_time()
+        self.stage_timer.record('capture', perf_counter() - capture_start)
         if self.roi is not None:
-            image = image[self.roi[1]:self.roi[3],
-                          self.roi[0]:self.roi[2],
-                          :]
+            with self.stage_timer.time('roi'):
+                image = image[self.roi[1]:self.roi[3],
+                              self.roi[0]:self.roi[2],
+                              :]
+        return image, capture_time
 
-        undistorted = cv2.undistort(image, self.mtx33d, self.dist15d)
+    def _release_frame(self, frame):
+        """
+        Hands a captured frame's buffer back to the frame pool, once it
+        has been processed
+
+        :param frame: the image and capture time from _capture_frame
+        """
+        if self._frame_pool is not None:
+            self._frame_pool.release(frame[0])
 
-        self._update_tracking(image)
+    def _get_capture_time(self):
+        """
+        :returns: the video source's timestamp for the last frame read,
+            in seconds since the epoch, or the current time if the
+            source doesn't have one
+        """
+        timestamp = getattr(self.video_source, 'timestamp', None)
+        if isinstance(timestamp, datetime.datetime):
+            return timestamp.timestamp()
+        if timestamp is None:
+            return time()
+        return float(timestamp)
+
+    def _process_frame(self, frame):
+        """
+        Processing stage, undistorts the image and gets the tracking
+        data. Does not touch the transform manager or VTK, so it is safe
+        to run off the GUI thread.
+
+        :param frame: the image and capture time from _capture_frame
+        :returns: the undistorted image, the tracking result and the
+            capture time
+        """
+        image, capture_time = frame
+        with self.stage_timer.time('undistort'):
+            undistorted = self._undistorter.undistort(image, self.mtx33d,
+                        self.dist15d)
+        with self.stage_timer.time('tracking'):
+            tracking = self._get_tracking(image, capture_time)
+        if self.session_recorder is not None and \
+                self.session_recorder.is_recording():
+            with self.stage_timer.time('record'):
+                self._record_frame(image, tracking, capture_time)
+        return undistorted, tracking, capture_time
+
+    def _record_frame(self, image, tracking, capture_time):
+        """
+        Queues a captured frame and its tracking for the session
+        recorder, which writes them on its own thread.
+        """
+        self.session_recorder.add_frame(image, capture_time)
+        if tracking is not None and len(tracking[0]) > 0:
+            port_handles, timestamps, poses, quality = tracking
+            self.session_recorder.add_poses(
+                        [handle + '2tracker' for handle in port_handles],
+                        timestamps, poses, quality, capture_time)
+
+    def _render_frame(self, undistorted, tracking, capture_time = None):
+        """
+        Render stage, updates the transform manager and the overlay
+        window, then renders.
+        """
+        with self.stage_timer.time('apply tracking'):
+            self._apply_tracking(tracking, capture_time)
 
-        self._update_overlay_window()
+        with self.stage_timer.time('overlay'):
+            self._update_overlay_window()
 
-        self.vtk_overlay_window.set_video_image(undistorted)
+        with self.stage_timer.time('video image'):
+            changed = self._set_video_image(undistorted, capture_time)
 
         if self._resize_flag:
             self.vtk_overlay_window.resize(undistorted.shape[1],
                         undistorted.shape[0])
             self._resize_flag = False
+            changed = True
+
+        if self._render_on_change and not changed and \
+                self._get_scene_mtime() <= self._rendered_mtime:
+            self.skipped_renders += 1
+            return
+
+        with self.stage_timer.time('render'):
+            self.vtk_overlay_window.Render()
+        if self._render_on_change:
+            self._rendered_mtime = self._get_scene_mtime()
 
-        self.vtk_overlay_window.Render()
+    def _set_video_image(self, image, capture_time = None):
+        """
+        Sets the overlay window's video image. With render on change,
+        a frame with the same capture time as the last one is skipped,
+        as it is a repeat, e.g. from a background grabber that hasn't
+        got a new frame yet.
+
+        :param capture_time: the frame's capture time, if None the frame
+            is treated as new
+        :returns: True if the video image was set
+        """
+        if self._render_on_change:
+            if capture_time is not None and \
+                    capture_time == self._last_capture_time:
+                return False
+            self._last_capture_time = capture_time
+
+        if self._video_texture is not None:
+            self._video_texture.set_image(image)
+        else:
+            self.vtk_overlay_window.set_video_image(image)
+        return True
+
+    def _get_scene_mtime(self):
+        """
+        :returns: the latest VTK modification time of the foreground
+            camera and the actors, including their matrices, properties
+            and meshes
+        """
+        mtime = self.vtk_overlay_window.get_renderer(1).GetActiveCamera(
+                        ).GetMTime()
+        for actor in self._actors.get_all():
+            mtime = max(mtime, actor.GetRedrawMTime())
+        return mtime
 
     def _update_tracking(self, image):
         """
@@ -191,28 +694,90 @@ class BARDOverlayApp(OverlayBaseWidget):
         up to date versions of the required transforms. Image
         is only used if we're using an ArUcoTracker
         """
-        tracking = []
+        self._apply_tracking(self._get_tracking(image))
+
+    def _get_tracking(self, image, capture_time = None):
+        """
+        Internal method to get a frame of tracking data. Image
+        is only used if we're using an ArUcoTracker
+
+        :param capture_time: the image's capture time. If set, poses
+            found in the image by an ArUcoTracker are stamped with it,
+            rather than the time they were found.
+        :returns: the port handles, timestamps, tracking and quality,
+            or None if the tracker failed to return a frame
+        """
         if (isinstance(self.tracker, ArUcoTracker) and not
                         self.tracker.has_capture()):
             try:
-                port_handles, _timestamps, _framenumbers, tracking, \
+                port_handles, timestamps, _framenumbers, tracking, \
                     quality = self.tracker.get_frame(image)
             except ValueError:
-                return
+                return None
+            if capture_time is not None:
+                timestamps = [capture_time] * len(port_handles)
         else:
             try:
-                port_handles, _timestamps, _framenumbers, tracking, \
+                port_handles, timestamps, _framenumbers, tracking, \
                         quality = self.tracker.get_frame()
             except ValueError:
-                return
+                return None
+
+        return port_handles, timestamps, tracking, quality
+
+    def _apply_tracking(self, tracking_frame, capture_time = None):
+        """
+        Internal method to add a frame of tracking data to
+        the transform manager, in one batch. With a pose history, the
+        poses are added to it. With a motion model the poses are
+        predicted forward to now, otherwise if we're aligning to capture
+        time the poses at the video frame's capture time are used.
+        """
+        if tracking_frame is None:
+            return
+
+        port_handles, timestamps, tracking, quality = tracking_frame
+        #NaN quality compares False, so is rejected too
+        accepted = np.flatnonzero(np.asarray(quality, dtype = np.float64)
+                                  > 0.2)
+        if accepted.size == 0:
+            return
+
+        poses = np.asarray(tracking)[accepted]
+        if self.pose_history is not None:
+            self.pose_history.add_frame(port_handles, timestamps, tracking,
+                                        accepted)
+            if self._predict_poses:
+                poses = self._predict_tracking(port_handles, timestamps,
+                                               accepted, capture_time)
+            elif self._align_to_capture_time and capture_time is not None:
+                poses = np.stack([self.pose_history.get_pose(
+                                    port_handles[index], capture_time)
+                                  for index in accepted])
+
+        try:
+            self.transform_manager.add_batch(
+                            [port_handles[index] + '2tracker'
+                             for index in accepted], poses)
+        except ValueError:
+            pass
+
+    def _predict_tracking(self, port_handles, timestamps, accepted,
+                          capture_time = None):
+        """
+        Predicts the accepted poses forward from their capture time to
+        the time they'll be displayed, recording the measured latency.
 
-        for index, port_handle in enumerate(port_handles):
-            if (not np.isnan(quality[index])) and quality[index] > 0.2:
-                try:
-                    self.transform_manager.add(port_handle + '2tracker',
-                                    tracking[index])
-                except ValueError:
-                    pass
+        :returns: an N x 4 x 4 array of the predicted poses
+        """
+        display_time = time() + self._prediction_lead
+        if capture_time is None:
+            capture_time = min(timestamps[index] for index in accepted)
+        self.stage_timer.record('latency', display_time - capture_time)
+        return np.stack([self.pose_history.predict_pose(
+                            port_handles[index], display_time,
+                            self._max_prediction, self._velocity_window)
+                         for index in accepted])
 
     def _update_overlay_window(self):
         """
@@ -226,22 +791,25 @@ class BARDOverlayApp(OverlayBaseWidget):
         except ValueError:
             pass
 
-        actors = self._get_pointer_actors()
-        if len(actors) > 0:
+        if self._model_list.get('pointers') > 0:
             ptrref2modelref = self.transform_manager.get(
                                     "pointerref2modelreference")
-            matrix = create_vtk_matrix_from_numpy(ptrref2modelref)
-            for actor in actors:
-                actor.SetUserMatrix(matrix)
-
-    def _get_pointer_actors(self):
-        actors = self._get_all_actors()
-        no_actors = actors.GetNumberOfItems()
-        return_actors = []
-        for index, actor in enumerate(actors):
-            if index >= no_actors - self._model_list.get('pointers'):
-                return_actors.append(actor)
-        return return_actors
+            self._pose_binding.update('pointerref2modelreference',
+                                      ptrref2modelref)
+
+    def _group_actors(self):
+        """
+        Binds each category of actors to the transform it follows, so
+        a pose update moves the whole category through one shared
+        matrix.
+        """
+        for category, transform in [
+                        ('visible anatomy', 'modelreference2model'),
+                        ('target anatomy', 'modelreference2model'),
+                        ('reference', 'modelreference2modelreference'),
+                        ('pointers', 'pointerref2modelreference')]:
+            self._pose_binding.add_group(category, transform,
+                            self._actors.get_category(category))
 
     def _get_all_actors(self):
         return self.vtk_overlay_window.get_renderer(layer=1).GetActors()
@@ -249,21 +817,46 @@ class BARDOverlayApp(OverlayBaseWidget):
     def _decimate_actors(self, target_vertices):
         """
         Goes through the actors and reduces their verticy count is
-        required
+        required. With more than one decimation worker the actors
+        are decimated concurrently.
         """
+        actors = self._actors.get_anatomy()
         if len(target_vertices) == 1:
-            if target_vertices[0] > 0:
-                for actor in self._get_all_actors():
-                    decimate_actor(actor, 2000)
-            return
+            if target_vertices[0] <= 0:
+                self._report_decimation_cache()
+                return
+            target_vertices = [2000] * len(actors)
 
-        actor_count = 0
-        for _ in self._get_all_actors():
-            actor_count += 1
-        if len(target_vertices) != actor_count:
+        if len(target_vertices) != len(actors):
             raise ValueError("target_model_vertices should have one value,",
                     " or a value for all models")
 
-        for index, actor in enumerate(self._get_all_actors()):
-            if target_vertices[index] > 0:
-                decimate_actor(actor, target_vertices[index])
+        engines = self._decimation_engines
+        if len(engines) == 1:
+            engines = engines * len(actors)
+
+        if len(engines) != len(actors):
+            raise ValueError("decimation engines should have one value,",
+                    " or a value for all models")
+
+        to_decimate = [(actor, target, engine) for actor, target, engine
+                       in zip(actors, target_vertices, engines) if target > 0]
+
+        if self._decimation_workers > 1:
+            decimate_actors([actor for actor, _, _ in to_decimate],
+                            [target for _, target, _ in to_decimate],
+                            self._model_cache, self._decimation_workers,
+                            [engine for _, _, engine in to_decimate])
+        else:
+            for actor, target, engine in to_decimate:
+                decimate_actor(actor, target, self._model_cache, engine)
+        self._report_decimation_cache()
+
+    def _report_decimation_cache(self):
+        """
+        Prints the decimation cache hits and misses, if any
+        """
+        if self._model_cache is not None and \
+                (self._model_cache.decimation_hits +
+                 self._model_cache.decimation_misses) > 0:
+            print(self._model_cache.decimation_report())
@@ -2,6 +2,8 @@
 
 """ Tests for BARD configuration module. """
 
+import os
+import shutil
 import numpy as np
 import pytest
 import sksurgerybard.algorithms.bard_config_algorithms as bca
@@ -131,3 +133,40 @@ def test_replace_calib_dir():
     config_out = bca.replace_calibration_dir(config_in, calibration_dir)
     camera_config = config_out.get('camera', None)
     assert camera_config.get('calibration directory', None) == 'test_string'
+
+
+def test_calibration_cache(tmp_path):
+    """
+    Calibrations should only be loaded once, unless the files change
+    """
+    calib_dir = tmp_path / 'calibration'
+    shutil.copytree('data/calibration/matts_mbp_640_x_480', calib_dir)
+
+    bca.clear_calibration_cache()
+    mtx33d, dist15d = bca.load_calibration(str(calib_dir))
+    assert np.isclose(mtx33d[0][0], 608.67179504)
+    assert not mtx33d.flags.writeable
+    assert not dist15d.flags.writeable
+
+    mtx33d_again, dist15d_again = bca.load_calibration(str(calib_dir))
+    assert mtx33d_again is mtx33d
+    assert dist15d_again is dist15d
+
+    #configure_camera shares the same arrays
+    config = {'camera' : {'calibration directory' : str(calib_dir)}}
+    _, mtx33d_again, _, _, _ = bca.configure_camera(config)
+    assert mtx33d_again is mtx33d
+
+    #changing the calibration invalidates the cache
+    intrinsics = calib_dir / 'calib.intrinsics.txt'
+    np.savetxt(intrinsics, np.eye(3))
+    stat = os.stat(intrinsics)
+    os.utime(intrinsics, ns = (stat.st_atime_ns,
+                               stat.st_mtime_ns + 1000000000))
+    mtx33d_again, _ = bca.load_calibration(str(calib_dir))
+    assert mtx33d_again is not mtx33d
+    assert np.array_equal(mtx33d_again, np.eye(3))
+
+    bca.clear_calibration_cache()
+    with pytest.raises(IOError):
+        bca.load_calibration(str(tmp_path))
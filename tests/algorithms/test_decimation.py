@@ -2,9 +2,13 @@
 
 """ Tests for BARD decimation module. """
 
+import pytest
 import numpy as np
 from sksurgeryvtk.models.vtk_sphere_model import VTKSphereModel
-from sksurgerybard.algorithms.decimation import decimate_actor
+from sksurgerybard.algorithms.decimation import decimate_actor, \
+        decimate_actors, decimate_polydata
+from sksurgerybard.algorithms.decimation_benchmark import \
+        benchmark_models_dir, format_decimation_results
 
 def test_decimation():
     """
@@ -13,3 +17,66 @@ def test_decimation():
     sphere = VTKSphereModel(np.array([[0., 0., 0.]]), radius = 5.0)
     vertices = decimate_actor(sphere.actor, 10)
     assert vertices < 122
+
+
+def test_parallel_decimation():
+    """
+    Decimating several actors on a thread pool should give the same
+    result as doing them one at a time
+    """
+    centres = [np.array([[0., 0., 0.]]), np.array([[10., 0., 0.]]),
+               np.array([[0., 10., 0.]])]
+    serial = [VTKSphereModel(centre, radius = 5.0) for centre in centres]
+    parallel = [VTKSphereModel(centre, radius = 5.0) for centre in centres]
+
+    targets = [10, 50, 80]
+    expected = [decimate_actor(sphere.actor, target)
+                for sphere, target in zip(serial, targets)]
+
+    vertices = decimate_actors([sphere.actor for sphere in parallel],
+                               targets, workers = 3)
+    assert vertices == expected
+    for sphere, count in zip(parallel, vertices):
+        assert sphere.actor.GetMapper().GetInput().GetNumberOfPoints() \
+                        == count
+
+
+def test_decimation_engines():
+    """
+    Both engines should reduce the vertex count, quadric decimation
+    gets closer to the target, unknown engines raise
+    """
+    sphere = VTKSphereModel(np.array([[0., 0., 0.]]), radius = 5.0)
+    polydata = sphere.actor.GetMapper().GetInput()
+    start_points = polydata.GetNumberOfPoints()
+
+    pro = decimate_polydata(polydata, 30, 'pro')
+    quadric = decimate_polydata(polydata, 30, 'quadric')
+    assert polydata.GetNumberOfPoints() == start_points
+    assert pro.GetNumberOfPoints() < start_points
+    assert quadric.GetNumberOfPoints() <= pro.GetNumberOfPoints()
+    assert abs(quadric.GetNumberOfPoints() - 30) < 10
+
+    with pytest.raises(ValueError):
+        decimate_polydata(polydata, 30, 'not an engine')
+
+    sphere = VTKSphereModel(np.array([[0., 0., 0.]]), radius = 5.0)
+    vertices = decimate_actor(sphere.actor, 30, engine = 'quadric')
+    assert vertices == quadric.GetNumberOfPoints()
+
+
+def test_decimation_benchmark():
+    """
+    The benchmark should report every model and engine, with no
+    deviation when decimation leaves a surface unchanged
+    """
+    results = benchmark_models_dir('data/models', 1000)
+    assert len(results) == 4
+    assert {result['engine'] for result in results} == {'pro', 'quadric'}
+    for result in results:
+        assert result['vertices'] <= result['original vertices']
+        assert result['seconds'] >= 0
+        assert result['hausdorff'] >= result['mean deviation'] >= 0
+        if result['vertices'] == result['original vertices']:
+            assert result['hausdorff'] == pytest.approx(0.0)
+    assert 'quadric' in format_decimation_results(results)
@@ -0,0 +1,70 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD frame pool module. """
+
+import numpy as np
+from sksurgeryimage.acquire.video_source import TimestampedVideoSource
+from sksurgerybard.algorithms.frame_pool import FramePool, can_read_into
+
+
+def test_acquire_release():
+    """
+    Released buffers, or views of them, should be handed out again
+    """
+    pool = FramePool((4, 6, 3), buffers = 2)
+    assert pool.get_shape() == (4, 6, 3)
+    assert pool.allocations == 2
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    assert first.shape == (4, 6, 3)
+    assert first.dtype == np.uint8
+
+    #all in use, so a new one
+    third = pool.acquire()
+    assert pool.allocations == 3
+
+    pool.release(first[1:3, 2:5])
+    assert pool.acquire() is first
+
+    #releasing twice, or something not from the pool, does nothing
+    pool.release(second)
+    pool.release(second)
+    pool.release(np.zeros((4, 6, 3), dtype = np.uint8))
+    assert pool.acquire() is second
+    pool.acquire()
+    assert pool.allocations == 4
+    assert third is not None
+
+    pool.resize((2, 2, 3))
+    assert pool.get_shape() == (2, 2, 3)
+    assert pool.acquire().shape == (2, 2, 3)
+
+
+def test_read():
+    """
+    Reading from a video source should reuse the pool's buffers
+    """
+    video_source = TimestampedVideoSource('data/multipattern.avi')
+    assert can_read_into(video_source)
+    assert not can_read_into(None)
+
+    pool = FramePool((10, 10, 3))
+    ret, frame = pool.read(video_source)
+    assert ret
+    #the wrong size, so the pool is resized
+    assert pool.get_shape() == frame.shape
+    pool.release(frame)
+
+    allocations = pool.allocations
+    buffer = None
+    for _ in range(5):
+        ret, frame = pool.read(video_source)
+        assert ret
+        if buffer is not None:
+            assert frame is buffer
+        buffer = frame
+        pool.release(frame)
+    assert pool.allocations == allocations
+    video_source.release()
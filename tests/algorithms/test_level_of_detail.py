@@ -0,0 +1,110 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the level of detail controller"""
+
+import pytest
+import numpy as np
+from sksurgeryvtk.models.vtk_sphere_model import VTKSphereModel
+from sksurgerybard.algorithms.level_of_detail import LevelOfDetail
+
+def _make_spheres():
+    return [VTKSphereModel(np.array([[0., 0., 0.]]), radius = 5.0),
+            VTKSphereModel(np.array([[10., 0., 0.]]), radius = 5.0)]
+
+
+def test_levels():
+    """
+    Each level should be coarser than the last, and switching level
+    should change the actors' meshes
+    """
+    spheres = _make_spheres()
+    actors = [sphere.actor for sphere in spheres]
+    full_vertices = sum(actor.GetMapper().GetInput().GetNumberOfPoints()
+                        for actor in actors)
+
+    lod = LevelOfDetail(actors, [0.25, 1.0, 0.5], 0.03, engine = 'quadric')
+    assert lod.levels == [1.0, 0.5, 0.25]
+    assert lod.get_vertices(0) == full_vertices
+    assert lod.get_vertices(0) > lod.get_vertices(1) > lod.get_vertices(2)
+
+    lod.set_level(2)
+    assert lod.switches == 1
+    assert sum(actor.GetMapper().GetInput().GetNumberOfPoints()
+               for actor in actors) == lod.get_vertices(2)
+
+    with pytest.raises(ValueError):
+        lod.set_level(3)
+
+
+def test_invalid_levels():
+    """
+    Levels must be fractions, and the budget positive
+    """
+    actors = [sphere.actor for sphere in _make_spheres()]
+    with pytest.raises(ValueError):
+        LevelOfDetail(actors, [], 0.03)
+    with pytest.raises(ValueError):
+        LevelOfDetail(actors, [1.0, 1.5], 0.03)
+    with pytest.raises(ValueError):
+        LevelOfDetail(actors, [1.0, 0.0], 0.03)
+    with pytest.raises(ValueError):
+        LevelOfDetail(actors, [1.0, 0.5], 0.0)
+
+
+def test_budget():
+    """
+    Slow frames should make the meshes coarser, fast frames finer
+    """
+    actors = [sphere.actor for sphere in _make_spheres()]
+    lod = LevelOfDetail(actors, [1.0, 0.5, 0.25], 0.03, hold_frames = 5)
+
+    #nothing changes while we are within budget at the finest level
+    for _ in range(20):
+        assert lod.update(0.02) == 0
+
+    #over budget, we step down a level every hold_frames
+    for _ in range(20):
+        lod.update(0.1)
+    assert lod.level == 2
+    assert lod.switches == 2
+
+    #with time to spare we step back up
+    for _ in range(200):
+        lod.update(0.001)
+    assert lod.level == 0
+    assert lod.switches == 4
+
+
+def test_backoff():
+    """
+    A finer level that goes over budget should be retried after
+    twice as long
+    """
+    actors = [sphere.actor for sphere in _make_spheres()]
+    lod = LevelOfDetail(actors, [1.0, 0.5], 0.03, smoothing = 1.0,
+                        hold_frames = 5)
+    lod.set_level(1)
+
+    for _ in range(5):
+        lod.update(0.01)
+    assert lod.level == 0
+
+    #the finer level is too slow, so we go back
+    for _ in range(5):
+        lod.update(0.1)
+    assert lod.level == 1
+
+    #and wait 10 frames rather than 5 before trying again
+    for _ in range(9):
+        assert lod.update(0.01) == 1
+    assert lod.update(0.01) == 0
+
+    #this time the finer level holds, so the wait is reset
+    for _ in range(5):
+        lod.update(0.02)
+    assert lod.level == 0
+    lod.update(0.1)
+    assert lod.level == 1
+    for _ in range(4):
+        assert lod.update(0.01) == 1
+    assert lod.update(0.01) == 0
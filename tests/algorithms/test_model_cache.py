@@ -0,0 +1,122 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD model cache module. """
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sksurgeryvtk.models.vtk_surface_model_directory_loader import \
+        VTKSurfaceModelDirectoryLoader
+from sksurgerybard.algorithms import model_cache as mc
+from sksurgerybard.algorithms.decimation import decimate_actor
+
+
+def test_model_cache(tmp_path):
+    """
+    The second load should come from the cache, and be the same
+    """
+    cache = mc.ModelCache(str(tmp_path / 'cache'))
+    source_file = 'data/models/2_lump_scale.vtk'
+
+    with pytest.raises(ValueError):
+        cache.load_model('data/models')
+    with pytest.raises(ValueError):
+        cache.load_model('data/id.txt')
+
+    cold = cache.load_model(source_file)
+    assert cache.misses == 1
+    assert cache.hits == 0
+    assert cold.get_name() == '2_lump_scale.vtk'
+
+    warm = cache.load_model(source_file)
+    assert cache.misses == 1
+    assert cache.hits == 1
+    assert warm.get_name() == '2_lump_scale.vtk'
+    assert warm.source_file == source_file
+    assert warm.normals is None
+
+    assert warm.source.GetNumberOfPoints() == \
+            cold.actor.GetMapper().GetInput().GetNumberOfPoints()
+    assert warm.source.GetNumberOfCells() == \
+            cold.actor.GetMapper().GetInput().GetNumberOfCells()
+
+
+def test_cache_invalidation(tmp_path):
+    """
+    A changed source file should not be served from the cache
+    """
+    cache = mc.ModelCache(str(tmp_path / 'cache'))
+    source_file = str(tmp_path / 'model.vtk')
+    shutil.copy('data/models/2_lump_scale.vtk', source_file)
+
+    first_name = cache.cache_filename(source_file)
+    assert cache.cache_filename(source_file) == first_name
+
+    shutil.copy('data/models/1_hepatic veins_scaled.vtk', source_file)
+    assert cache.cache_filename(source_file) != first_name
+
+    with pytest.raises(IOError):
+        mc.save_polydata(None, str(tmp_path / 'nodir' / 'model.vtp'))
+
+
+def test_directory_loader(tmp_path):
+    """
+    Should load the same models as the sksurgeryvtk loader
+    """
+    cache = mc.ModelCache(str(tmp_path / 'cache'))
+    reference = VTKSurfaceModelDirectoryLoader('data/models')
+    for _ in range(2):
+        loader = mc.BardModelDirectoryLoader('data/models', cache)
+        assert len(loader.models) == len(reference.models)
+        for model, ref_model in zip(loader.models, reference.models):
+            assert model.get_name() == ref_model.get_name()
+            assert model.get_colour() == ref_model.get_colour()
+
+    assert cache.hits == 2
+    assert cache.misses == 2
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+
+
+def test_decimation_cache(tmp_path):
+    """
+    Decimated meshes should be cached and reused
+    """
+    cache = mc.ModelCache(str(tmp_path))
+    first = cache.load_model('data/models/1_hepatic veins_scaled.vtk')
+    second = cache.load_model('data/models/1_hepatic veins_scaled.vtk')
+
+    start_points = first.actor.GetMapper().GetInput().GetNumberOfPoints()
+    assert decimate_actor(first.actor, 1000, cache) < start_points
+    assert cache.decimation_misses == 1
+    assert cache.decimation_hits == 0
+
+    assert decimate_actor(second.actor, 1000, cache) == \
+            first.actor.GetMapper().GetInput().GetNumberOfPoints()
+    assert cache.decimation_misses == 1
+    assert cache.decimation_hits == 1
+    assert cache.decimation_time_saved > 0.0
+
+    #a different target, or a different mesh, is a miss
+    lump = cache.load_model('data/models/2_lump_scale.vtk')
+    decimate_actor(second.actor, 500, cache)
+    decimate_actor(lump.actor, 1000, cache)
+    assert cache.decimation_misses == 3
+    assert '1 hits, 3 misses' in cache.decimation_report()
+
+
+def test_concurrent_saves(tmp_path):
+    """
+    Saving the same model from several threads at once should leave
+    one complete file and no temporary files
+    """
+    polydata = mc.ModelCache(str(tmp_path / 'cache')).load_model(
+                    'data/models/2_lump_scale.vtk').source
+    filename = str(tmp_path / 'model.vtp')
+    with ThreadPoolExecutor(max_workers = 4) as pool:
+        list(pool.map(lambda _: mc.save_polydata(polydata, filename),
+                      range(8)))
+
+    assert sorted(os.listdir(tmp_path)) == ['cache', 'model.vtp']
+    assert mc.load_polydata(filename).GetNumberOfPoints() == \
+                    polydata.GetNumberOfPoints()
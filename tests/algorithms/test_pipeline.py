@@ -0,0 +1,141 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD pipeline module. """
+
+import queue
+from time import sleep, time
+import pytest
+from sksurgerybard.algorithms.pipeline import BardPipeline, put_latest
+
+
+def _wait_for_result(pipeline, timeout = 5.0):
+    """Polls the pipeline until a result arrives"""
+    start = time()
+    while time() - start < timeout:
+        result = pipeline.get_latest()
+        if result is not None:
+            return result
+        sleep(0.001)
+    return None
+
+
+def test_put_latest():
+    """
+    A full queue should drop the oldest item
+    """
+    stage_queue = queue.Queue(maxsize = 2)
+    for item in range(5):
+        put_latest(stage_queue, item)
+
+    assert stage_queue.get_nowait() == 3
+    assert stage_queue.get_nowait() == 4
+    assert not put_latest(stage_queue, 5)
+    put_latest(stage_queue, 6)
+    assert put_latest(stage_queue, 7) == [5]
+
+
+def test_pipeline():
+    """
+    Results should come back processed, and newer than the last
+    """
+    counter = {'frame' : 0}
+    def capture():
+        counter['frame'] += 1
+        return counter['frame']
+
+    def process(frame):
+        return frame * 10
+
+    with pytest.raises(ValueError):
+        BardPipeline(capture, process, queue_size = 0)
+
+    pipeline = BardPipeline(capture, process)
+    assert pipeline.get_latest() is None
+    pipeline.start()
+    assert pipeline.is_running()
+
+    first = _wait_for_result(pipeline)
+    assert first is not None
+    assert first % 10 == 0
+    second = _wait_for_result(pipeline)
+    assert second > first
+
+    pipeline.stop()
+    assert not pipeline.is_running()
+
+
+def test_pipeline_errors():
+    """
+    Errors on the worker threads should be raised by get_latest
+    """
+    def capture():
+        return None
+
+    def process(frame):
+        return frame
+
+    def bad_capture():
+        raise IOError("no camera")
+
+    pipeline = BardPipeline(capture, process)
+    pipeline.start()
+    sleep(0.01)
+    assert pipeline.get_latest() is None
+    pipeline.stop()
+
+    pipeline = BardPipeline(bad_capture, process)
+    pipeline.start()
+    start = time()
+    while pipeline.is_running() and time() - start < 5.0:
+        sleep(0.001)
+    with pytest.raises(IOError):
+        pipeline.get_latest()
+    pipeline.stop()
+
+
+def test_pipeline_release():
+    """
+    Every captured frame should be released, once processed or dropped
+    """
+    counter = {'frame' : 0}
+    released = []
+    def capture():
+        counter['frame'] += 1
+        return counter['frame']
+
+    def process(frame):
+        sleep(0.002)
+        return frame
+
+    pipeline = BardPipeline(capture, process, queue_size = 1,
+                            release = released.append)
+    pipeline.start()
+    assert _wait_for_result(pipeline) is not None
+    sleep(0.05)
+    pipeline.stop()
+
+    assert sorted(released) == list(range(1, counter['frame'] + 1))
+
+
+def test_pipeline_restart():
+    """
+    Results from before a stop should not be returned after a restart
+    """
+    counter = {'frame' : 0}
+    def capture():
+        counter['frame'] += 1
+        return counter['frame']
+
+    def process(frame):
+        return frame
+
+    pipeline = BardPipeline(capture, process)
+    pipeline.start()
+    assert _wait_for_result(pipeline) is not None
+    sleep(0.01)
+    pipeline.stop()
+    last_frame = counter['frame']
+
+    pipeline.start()
+    assert _wait_for_result(pipeline) > last_frame
+    pipeline.stop()
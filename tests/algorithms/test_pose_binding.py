@@ -0,0 +1,54 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the pose binding"""
+
+import pytest
+import numpy as np
+from vtk import vtkActor
+from sksurgerybard.algorithms.pose_binding import PoseBinding
+
+def test_pose_binding():
+    """
+    Bound actors should follow the pose without their user matrix
+    being replaced
+    """
+    binding = PoseBinding()
+    actors = [vtkActor(), vtkActor()]
+    binding.bind('pointerref2modelreference', actors)
+    matrix = binding.get_matrix('pointerref2modelreference')
+    assert matrix.GetElement(0, 3) == 0.0
+
+    pose = np.eye(4)
+    pose[0, 3] = 10.0
+    assert binding.update('pointerref2modelreference', pose)
+    for actor in actors:
+        assert actor.GetUserMatrix() is matrix
+        assert actor.GetMatrix().GetElement(0, 3) == 10.0
+
+    #changing our copy of the pose shouldn't change the binding's
+    pose[0, 3] = 20.0
+    assert matrix.GetElement(0, 3) == 10.0
+
+    #an unchanged pose shouldn't modify the matrix
+    pose[0, 3] = 10.0
+    mtime = matrix.GetMTime()
+    assert not binding.update('pointerref2modelreference', pose)
+    assert matrix.GetMTime() == mtime
+
+    #rebinding is a no-op
+    binding.bind('pointerref2modelreference', actors)
+    assert actors[0].GetUserMatrix() is matrix
+
+    #different names get different matrices
+    assert binding.get_matrix('modelreference2model') is not matrix
+
+
+def test_invalid_pose():
+    """
+    Poses should be 4x4 numpy arrays
+    """
+    binding = PoseBinding()
+    with pytest.raises(TypeError):
+        binding.update('pointerref2modelreference', [[1, 0], [0, 1]])
+    with pytest.raises(ValueError):
+        binding.update('pointerref2modelreference', np.eye(3))
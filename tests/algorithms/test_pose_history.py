@@ -0,0 +1,138 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the pose history"""
+
+import pytest
+import numpy as np
+from sksurgerybard.algorithms.pose_history import PoseHistory, \
+        matrix_to_quaternion, quaternion_to_matrix, slerp
+
+def _rotation_z(degrees):
+    angle = np.radians(degrees)
+    rotation = np.eye(4)
+    rotation[0:2, 0:2] = [[np.cos(angle), -np.sin(angle)],
+                          [np.sin(angle), np.cos(angle)]]
+    return rotation
+
+
+def test_quaternions():
+    """
+    Converting to a quaternion and back should give the same rotation,
+    including rotations near 180 degrees
+    """
+    rng = np.random.default_rng(0)
+    rotations = [np.linalg.qr(rng.standard_normal((3, 3)))[0]
+                 for _ in range(50)]
+    rotations = [rotation * np.linalg.det(rotation)
+                 for rotation in rotations]
+    rotations.append(np.diag([1.0, -1.0, -1.0]))
+    rotations.append(np.diag([-1.0, 1.0, -1.0]))
+    rotations.append(np.diag([-1.0, -1.0, 1.0]))
+    for rotation in rotations:
+        quaternion = matrix_to_quaternion(rotation)
+        assert np.isclose(np.linalg.norm(quaternion), 1.0)
+        assert np.allclose(quaternion_to_matrix(quaternion), rotation)
+
+
+def test_slerp():
+    """
+    Slerp should interpolate the rotation angle, the short way round
+    """
+    start = matrix_to_quaternion(_rotation_z(0)[0:3, 0:3])
+    end = matrix_to_quaternion(_rotation_z(90)[0:3, 0:3])
+    assert np.allclose(quaternion_to_matrix(slerp(start, end, 0.5)),
+                       _rotation_z(45)[0:3, 0:3])
+    assert np.allclose(slerp(start, end, 0.0), start)
+    assert np.allclose(slerp(start, end, 1.0), end)
+
+    #the same rotation with the opposite sign
+    assert np.allclose(quaternion_to_matrix(slerp(start, -end, 0.5)),
+                       _rotation_z(45)[0:3, 0:3])
+
+    #nearly parallel quaternions
+    close = matrix_to_quaternion(_rotation_z(0.1)[0:3, 0:3])
+    assert np.allclose(quaternion_to_matrix(slerp(start, close, 0.5)),
+                       _rotation_z(0.05)[0:3, 0:3])
+
+
+def test_pose_history():
+    """
+    Poses between samples are interpolated, outside they are clamped
+    """
+    history = PoseHistory(buffer_size = 4)
+    with pytest.raises(KeyError):
+        history.get_pose('pointerref', 0.0)
+
+    for step in range(10):
+        pose = _rotation_z(step * 10)
+        pose[0:3, 3] = [step * 10.0, 0.0, 0.0]
+        assert history.add('pointerref', float(step), pose)
+
+    assert history.count('pointerref') == 4
+    assert history.names() == ['pointerref']
+    assert history.time_range('pointerref') == (6.0, 9.0)
+
+    pose = history.get_pose('pointerref', 7.5)
+    expected = _rotation_z(75)
+    expected[0:3, 3] = [75.0, 0.0, 0.0]
+    assert np.allclose(pose, expected)
+
+    assert np.allclose(history.get_pose('pointerref', 0.0)[0:3, 3],
+                       [60.0, 0.0, 0.0])
+    assert np.allclose(history.get_pose('pointerref', 20.0)[0:3, 3],
+                       [90.0, 0.0, 0.0])
+
+    #older poses are ignored, a pose at the same time replaces the last
+    assert not history.add('pointerref', 8.5, np.eye(4))
+    assert history.add('pointerref', 9.0, np.eye(4))
+    assert np.allclose(history.get_pose('pointerref', 9.0), np.eye(4))
+    assert history.time_range('pointerref') == (6.0, 9.0)
+
+    with pytest.raises(ValueError):
+        PoseHistory(buffer_size = 1)
+
+
+def test_add_frame():
+    """
+    We can add a frame of tracking, optionally only some rigid bodies
+    """
+    history = PoseHistory()
+    history.add_frame(['modelreference', 'pointerref'], [1.0, 1.0],
+                      [np.eye(4), np.eye(4)], accepted = [1])
+    assert history.names() == ['pointerref']
+    history.add_frame(['modelreference', 'pointerref'], [2.0, 2.0],
+                      [np.eye(4), np.eye(4)])
+    assert history.count('modelreference') == 1
+    assert history.count('pointerref') == 2
+
+
+def test_predict_pose():
+    """
+    Constant velocity prediction should be exact for constant velocity
+    motion, up to the maximum horizon
+    """
+    history = PoseHistory(8)
+    for step in range(4):
+        pose = _rotation_z(10.0 * step)
+        pose[0:3, 3] = [5.0 * step, 0.0, 1.0]
+        history.add('pointer', 0.1 * step, pose)
+
+    expected = _rotation_z(40.0)
+    expected[0:3, 3] = [20.0, 0.0, 1.0]
+    assert np.allclose(history.predict_pose('pointer', 0.4), expected)
+    assert np.allclose(history.predict_pose('pointer', 0.4, window = 3),
+                       expected)
+
+    #we don't extrapolate beyond the horizon
+    assert np.allclose(history.predict_pose('pointer', 10.0,
+                                            max_horizon = 0.1), expected)
+
+    #within the history it's the same as get_pose
+    assert np.allclose(history.predict_pose('pointer', 0.15),
+                       history.get_pose('pointer', 0.15))
+
+    history.add('reference', 0.0, np.eye(4))
+    assert np.allclose(history.predict_pose('reference', 1.0), np.eye(4))
+
+    with pytest.raises(KeyError):
+        history.predict_pose('camera', 0.0)
@@ -0,0 +1,51 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the pose prediction benchmark"""
+
+import numpy as np
+from sksurgerybard.algorithms.prediction_benchmark import \
+        benchmark_prediction, format_prediction_results, rotation_error
+
+def _pose(degrees, translation):
+    angle = np.radians(degrees)
+    pose = np.eye(4)
+    pose[0:2, 0:2] = [[np.cos(angle), -np.sin(angle)],
+                      [np.sin(angle), np.cos(angle)]]
+    pose[0:3, 3] = translation
+    return pose
+
+
+def test_rotation_error():
+    """
+    Rotation error is the angle between the poses
+    """
+    assert np.isclose(rotation_error(_pose(10.0, [0, 0, 0]),
+                                     _pose(-20.0, [5, 0, 0])), 30.0)
+
+
+def test_prediction_benchmark():
+    """
+    For constant velocity motion the constant velocity model should
+    hide the latency once it has two poses, while using the latest
+    pose lags behind
+    """
+    sequences = {'modelreference' :
+                    [(0.1 * step, _pose(2.0 * step, [3.0 * step, 0, 0]))
+                     for step in range(10)],
+                 'pointerref' : [(0.0, np.eye(4))]}
+    results = benchmark_prediction(sequences, 0.25,
+                                   max_horizon = 0.5)
+
+    assert len(results) == 2
+    latest = results[0]
+    predicted = results[1]
+    assert latest['motion model'] == 'none'
+    assert latest['samples'] == 7
+    assert np.isclose(latest['translation error'], 7.5)
+    assert np.isclose(latest['rotation error'], 5.0)
+    assert np.isclose(latest['jitter'], 0.0)
+    assert predicted['motion model'] == 'constant velocity'
+    assert np.isclose(predicted['translation error'], 7.5 / 7)
+    assert np.isclose(predicted['rotation error'], 5.0 / 7, atol = 1e-4)
+
+    assert 'constant velocity' in format_prediction_results(results)
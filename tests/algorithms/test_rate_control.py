@@ -0,0 +1,77 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the update rate controller"""
+
+import pytest
+from sksurgerybard.algorithms.rate_control import RateController
+
+def test_rate_limits():
+    """
+    The best rate is limited by the frame cost, the source, and the
+    maximum and minimum rates
+    """
+    controller = RateController(30, 5.0, 60.0, headroom = 1.0)
+    assert controller.get_best_rate() == (60.0, 'maximum')
+
+    controller.source_rate = 25.0
+    assert controller.get_best_rate() == (25.0, 'source')
+
+    controller.average_frame_time = 0.1
+    assert controller.get_best_rate() == (10.0, 'frame cost')
+
+    controller.average_frame_time = 0.5
+    assert controller.get_best_rate() == (5.0, 'minimum')
+
+    assert RateController(100, 5.0, 60.0).rate == 60.0
+    assert RateController(30, source_rate = 0.0).source_rate is None
+
+    with pytest.raises(ValueError):
+        RateController(30, 0.0, 60.0)
+    with pytest.raises(ValueError):
+        RateController(30, 20.0, 10.0)
+
+
+def test_rate_changes():
+    """
+    The rate only changes after the hold frames, and when the best
+    rate has moved by more than the tolerance
+    """
+    controller = RateController(30, source_rate = 30.0, headroom = 1.0,
+                                smoothing = 1.0, hold_frames = 3)
+    assert controller.get_interval() == 33
+
+    #fast frames, but the source limits us
+    for frame in range(5):
+        assert not controller.update(0.01, frame * 0.033)
+    assert controller.reason == 'source'
+    assert controller.rate == 30.0
+    assert abs(controller.get_achieved_rate() - 1.0 / 0.033) < 1e-6
+
+    #slow frames, we slow down
+    assert controller.update(0.05)
+    assert controller.reason == 'frame cost'
+    assert controller.rate == pytest.approx(20.0)
+    assert controller.changes == 1
+    assert 'limited by frame cost' in controller.report()
+
+    #a small change in frame time isn't worth changing the rate
+    for _ in range(5):
+        assert not controller.update(0.052)
+    assert controller.rate == pytest.approx(20.0)
+
+    #after a change we wait for the hold frames before the next one
+    assert controller.update(0.1)
+    assert not controller.update(0.01)
+    assert not controller.update(0.01)
+    assert controller.update(0.01)
+    assert controller.reason == 'source'
+    assert controller.rate == 30.0
+
+
+def test_report_before_frames():
+    """
+    We can report before we've measured anything
+    """
+    controller = RateController(15)
+    assert controller.get_achieved_rate() is None
+    assert 'unknown' in controller.report()
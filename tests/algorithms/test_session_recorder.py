@@ -0,0 +1,119 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD session recorder module. """
+
+import numpy as np
+import pytest
+from sksurgerybard.algorithms.session_recorder import SessionRecorder, \
+        SessionReader
+
+
+def _frame(value):
+    frame = np.zeros((12, 16, 3), dtype = np.uint8)
+    frame[:, :, 0] = value
+    frame[3:6, 4:8, 2] = 200
+    return frame
+
+
+def _record(filename, compression = 'none', frames = 3):
+    recorder = SessionRecorder(filename, compression)
+    recorder.start()
+    assert recorder.is_recording()
+    for index in range(frames):
+        pose = np.eye(4)
+        pose[0:3, 3] = [index, 2.0 * index, 3.0]
+        assert recorder.add_frame(_frame(10 * index), float(index))
+        recorder.add_poses(['modelreference2tracker', 'pointerref2tracker'],
+                           [index, index], [pose, np.eye(4)], [1.0, 0.0],
+                           float(index))
+    recorder.stop()
+    assert not recorder.is_recording()
+    return recorder
+
+
+def test_record_and_read(tmp_path):
+    """
+    Frames and poses should read back as they were recorded, raw or
+    compressed
+    """
+    for compression in ['none', 'png']:
+        filename = str(tmp_path / f'session_{compression}.bardrec')
+        recorder = _record(filename, compression)
+        assert recorder.frames_written == 3
+        assert recorder.poses_written == 6
+
+        reader = SessionReader(filename)
+        assert len(reader.frames) == 3
+        for index in range(3):
+            timestamp, image = reader.read_frame(index)
+            assert timestamp == index
+            assert np.array_equal(image, _frame(10 * index))
+
+        poses = reader.read_poses()
+        assert len(poses['modelreference2tracker']) == 3
+        timestamp, pose, quality = poses['modelreference2tracker'][2]
+        assert timestamp == 2.0
+        assert quality == 1.0
+        assert np.array_equal(pose[0:3, 3], [2.0, 4.0, 3.0])
+        assert poses['pointerref2tracker'][0][2] == 0.0
+
+    filename = str(tmp_path / 'session_jpg.bardrec')
+    _record(filename, 'jpg')
+    _, image = SessionReader(filename).read_frame(1)
+    assert image.shape == (12, 16, 3)
+
+    with pytest.raises(ValueError):
+        SessionRecorder(filename, 'gif')
+
+
+def test_unfinished_recording(tmp_path):
+    """
+    A recording that wasn't stopped, or was cut short, should be read by
+    scanning, and can be appended to
+    """
+    filename = str(tmp_path / 'session.bardrec')
+    _record(filename)
+    with open(filename, 'rb') as recording:
+        data = recording.read()
+    index_offset = SessionReader(filename).end
+    assert index_offset == len(data)
+
+    #cut off the index and half the last pose chunk
+    cut = str(tmp_path / 'cut.bardrec')
+    last_pose = int(SessionReader(filename).poses[-1]['offset'])
+    with open(cut, 'wb') as recording:
+        recording.write(data[:last_pose + 30])
+    reader = SessionReader(cut)
+    assert len(reader.frames) == 3
+    assert len(reader.poses) == 2
+    assert reader.end == last_pose
+
+    #appending carries on from the last complete chunk
+    _record(cut, frames = 2)
+    reader = SessionReader(cut)
+    assert len(reader.frames) == 5
+    assert len(reader.poses) == 4
+    assert reader.read_frame(4)[0] == 1.0
+
+    with open(cut, 'wb') as recording:
+        recording.write(b'not a recording')
+    with pytest.raises(ValueError):
+        SessionReader(cut)
+
+
+def test_dropped_frames(tmp_path):
+    """
+    Frames past the pending limit are dropped, poses never are
+    """
+    filename = str(tmp_path / 'session.bardrec')
+    recorder = SessionRecorder(filename, max_pending_frames = 0)
+    recorder.start()
+    assert not recorder.add_frame(_frame(0), 0.0)
+    recorder.add_poses(['modelreference2tracker'], [0.0], [np.eye(4)],
+                       [1.0], 0.0)
+    recorder.stop()
+    assert recorder.dropped_frames == 1
+
+    reader = SessionReader(filename)
+    assert len(reader.frames) == 0
+    assert len(reader.read_poses()['modelreference2tracker']) == 1
@@ -0,0 +1,64 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD timing module. """
+
+import pytest
+import numpy as np
+from sksurgerybard.algorithms.timing import StageTimer
+
+
+def test_stage_timer():
+    """
+    Durations should be kept in a ring buffer and summarised
+    """
+    with pytest.raises(ValueError):
+        StageTimer(buffer_size = 0)
+
+    timer = StageTimer(buffer_size = 4)
+    assert timer.count('render') == 0
+    assert timer.last('render') == 0.0
+    with pytest.raises(KeyError):
+        timer.get_durations('render')
+
+    for duration in [1.0, 2.0, 3.0]:
+        timer.record('render', duration)
+    assert np.array_equal(timer.get_durations('render'), [1.0, 2.0, 3.0])
+
+    for duration in [4.0, 5.0, 6.0]:
+        timer.record('render', duration)
+    assert np.array_equal(timer.get_durations('render'),
+                          [3.0, 4.0, 5.0, 6.0])
+
+    assert timer.count('render') == 6
+    assert timer.last('render') == 6.0
+    summary = timer.summary()
+    assert summary['render']['count'] == 6
+    assert summary['render']['p50'] == pytest.approx(4500.0)
+    assert summary['render']['p99'] <= 6000.0
+
+    with timer.time('capture'):
+        pass
+    assert timer.summary()['capture']['count'] == 1
+    assert 'capture' in timer.format_summary()
+
+
+def test_timing_log(tmp_path):
+    """
+    Summaries can be written to a log file, periodically
+    """
+    log_file = tmp_path / 'timing.txt'
+    timer = StageTimer(log_file = log_file, log_interval = 0.0)
+    timer.record('render', 0.01)
+    timer.log_periodically()
+    timer.log_periodically()
+    assert log_file.read_text(encoding = 'utf-8').count('render') == 2
+
+    #no log file, so nothing happens
+    timer = StageTimer(log_interval = 0.0)
+    timer.record('render', 0.01)
+    timer.log_periodically()
+    timer.write_summary()
+
+    other_file = tmp_path / 'other.txt'
+    timer.write_summary(other_file)
+    assert 'render' in other_file.read_text(encoding = 'utf-8')
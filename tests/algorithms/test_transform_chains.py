@@ -0,0 +1,138 @@
+#  -*- coding: utf-8 -*-
+
+"""Tests for the cached transform chains"""
+
+import pytest
+import numpy as np
+from sksurgerycore.transforms.transform_manager import TransformManager
+from sksurgerybard.algorithms.transform_chains import BardTransformManager
+
+def _random_pose(rng):
+    rotation, _ = np.linalg.qr(rng.standard_normal((3, 3)))
+    pose = np.eye(4)
+    pose[0:3, 0:3] = rotation
+    pose[0:3, 3] = rng.standard_normal(3) * 100.0
+    return pose
+
+
+def _add_to_both(managers, name, pose):
+    for manager in managers:
+        manager.add(name, pose)
+
+
+def test_chains_match():
+    """
+    Chained transforms should match TransformManager as tracking
+    updates, and only be recomputed when a link they use changes
+    """
+    rng = np.random.default_rng(0)
+    reference = TransformManager()
+    cached = BardTransformManager()
+    managers = [reference, cached]
+
+    _add_to_both(managers, 'tracker2camera', np.eye(4))
+    _add_to_both(managers, 'modelreference2tracker', _random_pose(rng))
+    _add_to_both(managers, 'pointerref2tracker', _random_pose(rng))
+    _add_to_both(managers, 'model2modelreference', _random_pose(rng))
+
+    names = ['camera2modelreference', 'pointerref2modelreference',
+             'model2camera']
+    cached.compile(names + ['unknown2camera'])
+
+    for _ in range(5):
+        for name in names:
+            assert np.allclose(reference.get(name), cached.get(name))
+        _add_to_both(managers, 'modelreference2tracker', _random_pose(rng))
+
+    #a pointer update shouldn't invalidate camera2modelreference
+    cached.get('camera2modelreference')
+    misses = cached.misses
+    _add_to_both(managers, 'pointerref2tracker', _random_pose(rng))
+    assert np.allclose(reference.get('camera2modelreference'),
+                       cached.get('camera2modelreference'))
+    assert cached.misses == misses
+    assert np.allclose(reference.get('pointerref2modelreference'),
+                       cached.get('pointerref2modelreference'))
+    assert cached.misses == misses + 1
+
+    #cached results are shared, so read only
+    with pytest.raises(ValueError):
+        cached.get('camera2modelreference')[0, 0] = 2.0
+
+    #direct transforms are returned as stored
+    pose = _random_pose(rng)
+    cached.add('model2modelreference', pose)
+    assert cached.get('model2modelreference') is pose
+
+    with pytest.raises(ValueError):
+        cached.get('unknown2camera')
+
+
+def test_new_links():
+    """
+    Adding or removing links should reroute the chains
+    """
+    rng = np.random.default_rng(1)
+    reference = TransformManager()
+    cached = BardTransformManager()
+    managers = [reference, cached]
+
+    _add_to_both(managers, 'tracker2camera', _random_pose(rng))
+    _add_to_both(managers, 'modelreference2tracker', _random_pose(rng))
+    assert np.allclose(reference.get('camera2modelreference'),
+                       cached.get('camera2modelreference'))
+
+    #a direct link replaces the chain
+    _add_to_both(managers, 'camera2modelreference', _random_pose(rng))
+    assert np.allclose(reference.get('camera2modelreference'),
+                       cached.get('camera2modelreference'))
+
+    for manager in managers:
+        manager.remove('camera2modelreference')
+    assert np.allclose(reference.get('camera2modelreference'),
+                       cached.get('camera2modelreference'))
+
+    #coordinate systems with no route behave as TransformManager
+    _add_to_both(managers, 'model2world', _random_pose(rng))
+    assert np.allclose(reference.get('model2camera'),
+                       cached.get('model2camera'))
+
+
+def test_add_batch():
+    """
+    Adding a batch should be the same as adding one at a time
+    """
+    rng = np.random.default_rng(2)
+    reference = TransformManager()
+    cached = BardTransformManager()
+    _add_to_both([reference, cached], 'tracker2camera', _random_pose(rng))
+    cached.compile(['camera2modelreference'])
+
+    for _ in range(3):
+        poses = np.stack([_random_pose(rng), _random_pose(rng)])
+        names = ['modelreference2tracker', 'pointerref2tracker']
+        for name, pose in zip(names, poses):
+            reference.add(name, pose)
+        cached.add_batch(names, poses)
+
+        for name in ['camera2modelreference', 'pointerref2modelreference',
+                     'tracker2pointerref']:
+            assert np.allclose(reference.get(name), cached.get(name))
+
+    #invalid names are skipped, singular matrices don't stop the others
+    poses = np.stack([_random_pose(rng), _random_pose(rng), np.zeros((4, 4))])
+    cached.add_batch(['Bad2tracker', 'pointerref2tracker', 'other2tracker'],
+                     poses)
+    assert np.allclose(cached.get('pointerref2tracker'), poses[1])
+    assert not cached.exists('other2tracker')
+
+    #an empty batch, e.g. when no markers were seen, does nothing
+    before = cached.get('camera2modelreference')
+    cached.add_batch([], [])
+    cached.add_batch([], np.empty((0, 4, 4)))
+    assert np.array_equal(cached.get('camera2modelreference'), before)
+
+    with pytest.raises(ValueError):
+        cached.add_batch(['pointerref2tracker'], np.eye(4))
+    with pytest.raises(ValueError):
+        cached.add_batch(['pointerref2tracker'], poses)
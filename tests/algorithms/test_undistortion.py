@@ -0,0 +1,68 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD undistortion module. """
+
+import pytest
+import numpy as np
+import cv2
+from sksurgerybard.algorithms.undistortion import BardUndistorter
+
+def _get_frame():
+    """Reads the first frame of the test video"""
+    capture = cv2.VideoCapture('data/multipattern.avi')
+    _, frame = capture.read()
+    capture.release()
+    return frame
+
+
+def test_undistortion_as_opencv():
+    """
+    Should give the same result as cv2.undistort
+    """
+    frame = _get_frame()
+    mtx33d = np.loadtxt(
+            'data/calibration/matts_mbp_640_x_480/calib.intrinsics.txt')
+    dist15d = np.loadtxt(
+            'data/calibration/matts_mbp_640_x_480/calib.distortion.txt')
+
+    undistorter = BardUndistorter()
+    undistorted = undistorter.undistort(frame, mtx33d, dist15d)
+
+    assert np.array_equal(undistorted, cv2.undistort(frame, mtx33d, dist15d))
+
+    #with a single buffer, the same memory is reused each frame
+    assert undistorter.undistort(frame, mtx33d, dist15d) is undistorted
+
+    #a region of interest changes the size, so the maps are rebuilt
+    roi = frame[10:400, 20:600, :]
+    assert np.array_equal(undistorter.undistort(roi, mtx33d, dist15d),
+                    cv2.undistort(roi, mtx33d, dist15d))
+
+    #as does a change in calibration
+    dist15d = np.zeros(5)
+    assert np.array_equal(undistorter.undistort(frame, mtx33d, dist15d),
+                    frame)
+
+
+def test_undistortion_buffers():
+    """
+    Output buffers should cycle
+    """
+    with pytest.raises(ValueError):
+        BardUndistorter(buffers = 0)
+
+    frame = _get_frame()
+    mtx33d = np.array([[1000.0, 0.0, 320.0],
+                       [0.0, 1000.0, 240.0],
+                       [0.0, 0.0, 1.0]])
+    dist15d = np.array([0.1, 0.0, 0.0, 0.0, 0.0])
+
+    undistorter = BardUndistorter(buffers = 3)
+    outputs = [undistorter.undistort(frame, mtx33d, dist15d)
+               for _ in range(4)]
+    assert outputs[0] is not outputs[1]
+    assert outputs[1] is not outputs[2]
+    assert outputs[3] is outputs[0]
+
+    undistorter.invalidate()
+    assert undistorter.undistort(frame, mtx33d, dist15d) is not outputs[0]
@@ -0,0 +1,75 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for BARD video grabber module. """
+
+from time import sleep, time
+import cv2
+from sksurgerybard.algorithms.video_grabber import LatestFrameGrabber
+
+
+class _SlowSource:
+    """A video source that counts the frames it has produced"""
+    def __init__(self):
+        self.frames = 0
+        self.released = False
+
+    def read(self):
+        """Makes a new frame"""
+        sleep(0.001)
+        self.frames += 1
+        return True, self.frames
+
+    def isOpened(self): # pylint:disable=invalid-name
+        """Always open"""
+        return True
+
+    def release(self):
+        """Release the source"""
+        self.released = True
+
+
+def test_latest_frame_wins():
+    """
+    The grabber should return the latest frame, and count the
+    ones we didn't read
+    """
+    source = _SlowSource()
+    grabber = LatestFrameGrabber(source)
+    assert grabber.read() == (False, None)
+    assert grabber.isOpened()
+
+    grabber.start()
+    sleep(0.05)
+    ret, frame = grabber.read()
+    assert ret
+    assert frame == grabber.frame_number
+    assert grabber.timestamp <= time()
+    assert grabber.dropped_frames > 0
+    assert grabber.dropped_frames < grabber.frame_number
+
+    grabber.release()
+    assert source.released
+    frames = source.frames
+    sleep(0.01)
+    assert source.frames == frames
+
+
+def test_blocking_grabber():
+    """
+    A blocking grabber never returns the same frame twice
+    """
+    source = cv2.VideoCapture('data/multipattern.avi')
+    grabber = LatestFrameGrabber(source, blocking = True)
+    grabber.start()
+
+    _, first = grabber.read()
+    first_number = grabber.frame_number
+    _, second = grabber.read()
+    assert first is not second
+    assert grabber.frame_number > first_number
+    grabber.stop()
+
+    #with nothing capturing, a blocking read should time out
+    grabber = LatestFrameGrabber(source, blocking = True, timeout = 0.01)
+    assert grabber.read() == (False, None)
+    source.release()
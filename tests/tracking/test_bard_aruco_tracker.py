@@ -0,0 +1,130 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for the BARD ArUco tracker. """
+
+import cv2
+import numpy as np
+import pytest
+from sksurgerybard.tracking.bard_tracking import setup_tracker
+from sksurgerybard.tracking.bard_aruco_tracker import BardArUcoTracker, \
+        merge_windows
+
+def _read_video(video_file = 'data/multipattern.avi'):
+    video = cv2.VideoCapture(video_file)
+    frames = []
+    while True:
+        success, image = video.read()
+        if not success:
+            break
+        frames.append(image)
+    return frames
+
+
+def _setup_tracker(search_windows = None, detection_scale = None):
+    config = {'camera' : {'source' : 'data/multipattern.avi',
+                          'calibration directory' :
+                            'data/calibration/matts_mbp_640_x_480'},
+              'tracker' : {'source' : 'data/multipattern.avi',
+                           'rigid bodies' : [
+                               {'name' : 'modelreference',
+                                'filename' : 'data/reference.txt',
+                                'aruco dictionary' :
+                                    'DICT_ARUCO_ORIGINAL'}]}}
+    if search_windows is not None:
+        config['tracker']['search windows'] = search_windows
+    if detection_scale is not None:
+        config['tracker']['detection scale'] = detection_scale
+    tracker, _transform_manager = setup_tracker(config)
+    tracker.start_tracking()
+    return tracker
+
+
+def test_merge_windows():
+    """
+    Overlapping windows are merged, including ones that only overlap
+    once merged
+    """
+    windows = merge_windows([[0, 0, 10, 10], [20, 0, 30, 10],
+                             [5, 5, 25, 8], [50, 50, 60, 60]])
+    assert sorted(windows) == [[0, 0, 30, 10], [50, 50, 60, 60]]
+    assert merge_windows([[0, 0, 10, 10], [10, 0, 20, 10]]) == \
+                    [[0, 0, 10, 10], [10, 0, 20, 10]]
+    assert not merge_windows([])
+
+
+def test_search_windows():
+    """
+    Searching windows around the last markers should find the same
+    reference pose as searching the whole frame
+    """
+    frames = _read_video()
+    tracker = _setup_tracker()
+    window_tracker = _setup_tracker({'refresh interval' : 5})
+    assert isinstance(window_tracker, BardArUcoTracker)
+
+    for frame in frames:
+        handles, _, _, tracking, _ = tracker.get_frame(frame)
+        window_handles, _, _, window_tracking, _ = \
+                        window_tracker.get_frame(frame)
+        assert window_handles[0] == handles[0] == 'modelreference'
+        assert np.allclose(window_tracking[0], tracking[0])
+
+    #without search windows or a detection scale, ArUcoTracker does it
+    assert tracker.window_searches == tracker.full_frame_searches == 0
+    assert window_tracker.window_searches > 0
+    #the test video has markers from two dictionaries
+    assert window_tracker.full_frame_searches < 2 * len(frames) / 4
+
+
+def test_lost_markers():
+    """
+    When the markers are lost we search the whole frame
+    """
+    frames = _read_video()
+    tracker = _setup_tracker({})
+    #the test video has markers from two dictionaries
+    tracker.get_frame(frames[0])
+    dictionaries = tracker.full_frame_searches
+    assert dictionaries == 2
+
+    tracker.get_frame(np.zeros_like(frames[0]))
+    assert tracker.window_searches == dictionaries
+    assert tracker.full_frame_searches == 2 * dictionaries
+
+    #nothing to search around, so another whole frame search
+    _, _, _, _, quality = tracker.get_frame(frames[1])
+    assert tracker.full_frame_searches == 3 * dictionaries
+    assert quality[0] > 0.2
+
+    tracker.get_frame(frames[2])
+    assert tracker.window_searches == 2 * dictionaries
+    assert tracker.full_frame_searches == 3 * dictionaries
+
+
+def test_detection_scale():
+    """
+    Finding markers at half scale, then refining the corners, should
+    give nearly the same reference pose as at full scale
+    """
+    frames = _read_video()
+    tracker = _setup_tracker()
+    half_tracker = _setup_tracker(detection_scale = 0.5)
+    window_tracker = _setup_tracker({}, detection_scale = 0.5)
+
+    for frame in frames:
+        _, _, _, tracking, _ = tracker.get_frame(frame)
+        _, _, _, half_tracking, quality = half_tracker.get_frame(frame)
+        _, _, _, window_tracking, _ = window_tracker.get_frame(frame)
+        assert quality[0] > 0.2
+        for scaled_tracking in [half_tracking, window_tracking]:
+            assert np.linalg.norm(scaled_tracking[0][0:3, 3] -
+                                  tracking[0][0:3, 3]) < 3.0
+
+    for scale in [0.0, 1.5]:
+        with pytest.raises(ValueError):
+            _setup_tracker(detection_scale = scale)
+
+    #the frames must be passed in
+    with pytest.raises(ValueError):
+        BardArUcoTracker({'video source' : 'data/multipattern.avi',
+                          'detection scale' : 0.5})
@@ -0,0 +1,129 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for the BARD benchmark. """
+
+import json
+import pytest
+from sksurgerybard.ui import bard_benchmark_app as bench
+from sksurgerybard.ui.bard_benchmark_command_line import main
+from sksurgerybard.algorithms.timing import format_stage_summary
+
+
+def test_replace_video_source():
+    """
+    The tracker source should follow the camera source
+    """
+    config = {'camera' : {'source' : 0},
+              'tracker' : {'source' : 0}}
+    config = bench.replace_video_source(config, 'data/multipattern.avi')
+    assert config['camera']['source'] == 'data/multipattern.avi'
+    assert config['tracker']['source'] == 'data/multipattern.avi'
+
+    config = {'tracker' : {'video source' : 'none'}}
+    config = bench.replace_video_source(config, 'data/multipattern.avi')
+    assert config['camera']['source'] == 'data/multipattern.avi'
+    assert config['tracker']['video source'] == 'none'
+
+
+def test_benchmark(tmp_path):
+    """
+    Runs the benchmark on the test video
+    """
+    output_file = tmp_path / 'results.json'
+    results = bench.run_benchmark('config/reference_with_model.json',
+                                  None, 'data/multipattern.avi',
+                                  max_frames = 5,
+                                  output_file = output_file)
+
+    assert results['frames'] == 5
+    assert results['frames per second'] > 0
+    assert results['stages']['frame']['count'] == 5
+    assert 'tracking' in bench.format_results(results)
+    assert format_stage_summary(results['stages']) in \
+                    bench.format_results(results)
+
+    with open(output_file, 'r', encoding = 'utf-8') as filein:
+        assert json.load(filein)['frames'] == 5
+
+
+def test_benchmark_command_line():
+    """
+    Runs to the end of the video from the command line
+    """
+    main(['-c', 'config/reference_with_model.json',
+          '-i', 'data/multipattern.avi'])
+
+    with pytest.raises(SystemExit):
+        main(['--version'])
+
+
+def test_decimation_benchmark(tmp_path):
+    """
+    Benchmarks the decimation engines on the configured models
+    """
+    config_file = tmp_path / 'config.json'
+    with open(config_file, 'w', encoding = 'utf-8') as fileout:
+        json.dump({'models' : {'models_dir' : 'data/models'}}, fileout)
+
+    output_file = tmp_path / 'decimation.json'
+    main(['-c', str(config_file), '--decimation', '1000',
+          '-o', str(output_file)])
+
+    with open(output_file, 'r', encoding = 'utf-8') as filein:
+        assert len(json.load(filein)) == 4
+
+    with pytest.raises(ValueError):
+        bench.run_decimation_benchmark(None, 1000)
+
+    main(['-c', str(config_file), '--decimation', '1000',
+          '--decimation-workers', '2', '-o', str(output_file)])
+    with open(output_file, 'r', encoding = 'utf-8') as filein:
+        results = json.load(filein)
+    assert [result['engine'] for result in results] == ['pro', 'quadric']
+    for result in results:
+        assert result['workers'] == 2
+        assert result['models'] == 2
+        assert result['speed up'] > 0.0
+
+    with pytest.raises(SystemExit):
+        main(['-c', str(config_file), '--decimation-workers', '2'])
+
+
+def test_prediction_benchmark(tmp_path):
+    """
+    Benchmarks pose prediction on the tracking in the test video
+    """
+    output_file = tmp_path / 'prediction.json'
+    main(['-c', 'config/reference_with_model.json',
+          '-i', 'data/multipattern.avi', '--prediction', '66',
+          '-o', str(output_file)])
+
+    with open(output_file, 'r', encoding = 'utf-8') as filein:
+        results = json.load(filein)
+    models = [result['motion model'] for result in results
+              if result['rigid body'] == 'modelreference']
+    assert models == ['none', 'constant velocity']
+
+    with pytest.raises(ValueError):
+        bench.run_prediction_benchmark(None, None, 0.066)
+
+
+def test_detection_benchmark(tmp_path):
+    """
+    Benchmarks ArUco detection at half scale on the test video
+    """
+    output_file = tmp_path / 'detection.json'
+    main(['-c', 'config/reference_with_model.json',
+          '-i', 'data/multipattern.avi', '--detection', '0.5',
+          '-o', str(output_file)])
+
+    with open(output_file, 'r', encoding = 'utf-8') as filein:
+        results = json.load(filein)
+    assert [result['tracker'] for result in results] == \
+                    ['scale 1.0', 'scale 0.5']
+    assert results[0]['poses'] == results[0]['matched poses'] > 0
+    assert results[1]['matched poses'] > 0
+    assert results[1]['translation difference'] < 3.0
+
+    with pytest.raises(ValueError):
+        bench.run_detection_benchmark(None, None, [0.5])
@@ -0,0 +1,76 @@
+#  -*- coding: utf-8 -*-
+
+""" Tests for the actor registry. """
+
+import pytest
+from vtk import vtkActor
+from sksurgerybard.visualisation.actor_registry import ActorRegistry
+
+def test_actor_registry():
+    """
+    Actors can be looked up by name and category, and removed
+    """
+    registry = ActorRegistry()
+    liver = vtkActor()
+    tumour = vtkActor()
+    pointer = vtkActor()
+    tip = vtkActor()
+
+    registry.add(pointer, 'pointers', 'pointerref')
+    registry.add(liver, 'visible anatomy', 'liver')
+    registry.add(tumour, 'target anatomy', 'tumour')
+    registry.add(tip, 'pointers')
+
+    assert len(registry) == 4
+    assert registry.get('liver') is liver
+    assert registry.get_category('pointers') == [pointer, tip]
+    assert registry.get_anatomy() == [liver, tumour]
+    assert registry.get_all() == [liver, tumour, pointer, tip]
+    assert registry.model_list() == {'visible anatomy' : 1,
+                                     'target anatomy' : 1,
+                                     'reference' : 0,
+                                     'pointers' : 2}
+
+    registry.remove(tumour)
+    assert tumour not in registry
+    assert registry.get_anatomy() == [liver]
+    with pytest.raises(KeyError):
+        registry.get('tumour')
+    with pytest.raises(KeyError):
+        registry.remove(tumour)
+
+    #names can be reused once removed
+    registry.add(tumour, 'target anatomy', 'tumour')
+    assert registry.get('tumour') is tumour
+
+
+def test_invalid_actors():
+    """
+    Unknown categories, duplicate names and duplicate actors raise
+    """
+    registry = ActorRegistry()
+    liver = vtkActor()
+    registry.add(liver, 'visible anatomy', 'liver')
+
+    with pytest.raises(ValueError):
+        registry.add(vtkActor(), 'not a category')
+    with pytest.raises(ValueError):
+        registry.add(vtkActor(), 'target anatomy', 'liver')
+    with pytest.raises(ValueError):
+        registry.add(liver, 'target anatomy')
+    with pytest.raises(KeyError):
+        registry.get_category('not a category')
+
+
+def test_unique_name():
+    """
+    Names already used or reserved get a numeric suffix
+    """
+    registry = ActorRegistry()
+    assert registry.unique_name('liver') == 'liver'
+    registry.add(vtkActor(), 'visible anatomy', 'liver')
+    assert registry.unique_name('liver') == 'liver 2'
+    registry.add(vtkActor(), 'visible anatomy', 'liver 2')
+    assert registry.unique_name('liver') == 'liver 3'
+    assert registry.unique_name('pointerref', ('pointerref',)) == \
+                    'pointerref 2'
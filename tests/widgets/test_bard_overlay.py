@@ -3,11 +3,16 @@
 """ Tests for BARD configuration module. """
 
 import copy
+import shutil
+from time import sleep, time
 import numpy as np
+import cv2
+from vtk.util import numpy_support
 import pytest
 from sksurgeryarucotracker.algorithms.compare_matrices \
         import matrices_equivalent
 import sksurgerybard.widgets.bard_overlay_app as boa
+from sksurgerybard.algorithms.session_recorder import SessionReader
 
 
 config = {
@@ -43,15 +48,17 @@ config = {
 
 }
 
-def test_valid_config():
+def test_valid_config(tmp_path, monkeypatch):
     """
     Loads a valid config file, and checks that we have retrieved the calibration
     """
     calib_dir = 'data/calibration/matts_mbp_640_x_480/'
 
     bard_overlay = boa.BARDOverlayApp(config, calib_dir)
-    #a hack to get full coverage on position model actor
+    #a hack to get full coverage on position model actor, which writes
+    #the model to reference to the current directory
     identity = np.eye(4)
+    monkeypatch.chdir(tmp_path)
     bard_overlay.position_model_actors(identity)
 
     assert np.allclose(
@@ -102,6 +109,11 @@ def test_valid_config():
     for _ in range(5):
         bard_overlay.update_view()
 
+    timing = bard_overlay.stage_timer.summary()
+    for stage in ['capture', 'undistort', 'tracking', 'apply tracking',
+                  'overlay', 'video image', 'render', 'frame']:
+        assert timing[stage]['count'] == 6
+
     cam2model_regression = np.array([
         [-8.50551488e-01,  5.17049795e-01, -9.60295592e-02, -8.10664190e+01],
         [ -4.60336969e-01, -6.43720070e-01,  6.11321803e-01,  5.02856242e+01],
@@ -272,3 +284,475 @@ def test_with_decimation():
     model_conf['target_model_vertices'] = [1000, 100, 100]
     dec_config['models'] = model_conf
     _bard_overlay = boa.BARDOverlayApp(dec_config)
+
+
+def test_decimation_engines():
+    """
+    We can choose the decimation engine for all models or each model
+    """
+    dec_config = copy.deepcopy(config)
+    model_conf = dec_config.get("models")
+    model_conf['models_dir'] = 'data/models'
+    model_conf['target_model_vertices'] = [1000]
+    model_conf['decimation engines'] = ['quadric']
+    _bard_overlay = boa.BARDOverlayApp(dec_config)
+
+    #or one for each model
+    model_conf['decimation engines'] = ['quadric', 'pro']
+    _bard_overlay = boa.BARDOverlayApp(dec_config)
+
+    #we should get a value error if there are an unequal number
+    #of decimation engines and models
+    model_conf['decimation engines'] = ['quadric', 'pro', 'pro']
+    with pytest.raises(ValueError):
+        _bard_overlay = boa.BARDOverlayApp(dec_config)
+
+    #or if we ask for an engine that doesn't exist
+    model_conf['decimation engines'] = ['not an engine']
+    with pytest.raises(ValueError):
+        _bard_overlay = boa.BARDOverlayApp(dec_config)
+
+
+def test_pipelined():
+    """
+    In pipelined mode update_view renders the results of the
+    background capture and tracking threads
+    """
+    pipe_config = copy.deepcopy(config)
+    pipe_config['pipelined'] = True
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(pipe_config, calib_dir)
+    assert bard_overlay._pipeline is not None #pylint:disable=protected-access
+
+    bard_overlay.start()
+    start = time()
+    while time() - start < 5.0:
+        bard_overlay.update_view()
+        if not np.allclose(
+                bard_overlay.transform_manager.get("modelreference2camera"),
+                np.eye(4)):
+            break
+        sleep(0.01)
+    bard_overlay.stop()
+
+    assert not np.allclose(
+            bard_overlay.transform_manager.get("modelreference2camera"),
+            np.eye(4))
+
+    #level of detail should see the background stages' time too
+    timer = bard_overlay.stage_timer
+    timer.record('tracking', 0.5)
+    background = sum(timer.last(stage) for stage in boa.PIPELINE_STAGES)
+    assert background >= 0.5
+    assert bard_overlay._get_frame_cost(0.01) == pytest.approx( #pylint:disable=protected-access
+                    0.01 + background)
+
+
+def test_background_capture():
+    """
+    With background capture on, the video source is drained on a
+    background thread
+    """
+    grab_config = copy.deepcopy(config)
+    grab_config['camera']['background capture'] = True
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(grab_config, calib_dir)
+    grabber = bard_overlay.video_source
+    assert not grabber.is_running()
+
+    bard_overlay.start()
+    assert grabber.is_running()
+    start = time()
+    while grabber.frame_number == 0 and time() - start < 5.0:
+        sleep(0.01)
+    bard_overlay.update_view()
+
+    assert not np.allclose(
+            bard_overlay.transform_manager.get("modelreference2camera"),
+            np.eye(4))
+
+    #stopping the app stops the capture thread, starting restarts it
+    bard_overlay.stop()
+    assert not grabber.is_running()
+    frame_number = grabber.frame_number
+    sleep(0.05)
+    assert grabber.frame_number == frame_number
+    bard_overlay.start()
+    assert grabber.is_running()
+    bard_overlay.stop()
+    grabber.release()
+
+
+def test_model_cache(tmp_path):
+    """
+    Models can be loaded through a binary cache
+    """
+    cache_config = copy.deepcopy(config)
+    cache_config['models']['models_dir'] = 'data/models'
+    cache_config['models']['cache directory'] = str(tmp_path)
+    cache_config['models']['target_model_vertices'] = [1000]
+    cache_config['models']['decimation workers'] = 2
+
+    for _ in range(2):
+        bard_overlay = boa.BARDOverlayApp(cache_config)
+        actors = bard_overlay._get_all_actors() #pylint:disable=protected-access
+        assert actors.GetNumberOfItems() == 5
+
+    #pylint:disable=protected-access
+    assert bard_overlay._model_cache.hits == 2
+    assert bard_overlay._model_cache.decimation_hits == 2
+    assert bard_overlay._model_cache.decimation_misses == 0
+
+
+def test_level_of_detail():
+    """
+    With level of detail configured, a slow frame loop should switch
+    the anatomy to coarser meshes
+    """
+    lod_config = copy.deepcopy(config)
+    lod_config['models']['models_dir'] = 'data/models'
+    lod_config['models']['level of detail'] = {'levels' : [1.0, 0.5],
+                                               'frame budget' : 1e-6,
+                                               'engine' : 'quadric',
+                                               'hold frames' : 2}
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(lod_config, calib_dir)
+    lod = bard_overlay._level_of_detail #pylint:disable=protected-access
+    assert lod.get_vertices(1) < lod.get_vertices(0)
+
+    for _ in range(5):
+        bard_overlay.update_view()
+    assert lod.level == 1
+
+
+def test_actor_groups(tmp_path, monkeypatch):
+    """
+    Each category of actors should share one matrix, so moving the
+    category is one update
+    """
+    group_config = copy.deepcopy(config)
+    group_config['models']['models_dir'] = 'data/models'
+    group_config['models']['visible_anatomy'] = 1
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(group_config, calib_dir)
+    binding = bard_overlay._pose_binding #pylint:disable=protected-access
+
+    expected = {'visible anatomy' : 1, 'target anatomy' : 1,
+                'reference' : 1, 'pointers' : 2}
+    for group, count in expected.items():
+        name, actors = binding.get_group(group)
+        assert len(actors) == count
+        for actor in actors:
+            assert actor.GetUserMatrix() is binding.get_matrix(name)
+
+    increment = np.eye(4)
+    increment[0, 3] = 5.0
+    monkeypatch.chdir(tmp_path)
+    bard_overlay.position_model_actors(increment)
+    assert (tmp_path / 'bard_model2modelref.txt').is_file()
+    for group in ['visible anatomy', 'target anatomy']:
+        for actor in binding.get_group(group)[1]:
+            assert actor.GetMatrix().GetElement(0, 3) == 5.0
+
+
+def test_actor_registry():
+    """
+    Actors can be found by name, and added and removed after startup
+    """
+    registry_config = copy.deepcopy(config)
+    registry_config['models']['models_dir'] = 'data/models'
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(registry_config, calib_dir)
+    renderer = bard_overlay.vtk_overlay_window.get_renderer(layer=1)
+    lump = bard_overlay.get_actor('2_lump_scale')
+    assert bard_overlay.get_actor('pointer tip') is not None
+
+    bard_overlay.remove_actor('2_lump_scale')
+    assert renderer.GetActors().GetNumberOfItems() == 4
+    with pytest.raises(KeyError):
+        bard_overlay.get_actor('2_lump_scale')
+
+    bard_overlay.add_actor(lump, 'target anatomy', 'lump')
+    assert renderer.GetActors().GetNumberOfItems() == 5
+    binding = bard_overlay._pose_binding #pylint:disable=protected-access
+    assert lump.GetUserMatrix() is \
+                    binding.get_matrix('modelreference2model')
+
+
+def test_align_to_capture_time():
+    """
+    With align to capture time the tracked poses go through the pose
+    history, stamped with the video frame's capture time
+    """
+    align_config = copy.deepcopy(config)
+    align_config['tracker']['align to capture time'] = True
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(align_config, calib_dir)
+    assert bard_overlay.pose_history is not None
+
+    for _ in range(3):
+        bard_overlay.update_view()
+
+    history = bard_overlay.pose_history
+    assert 'modelreference' in history.names()
+    _, newest = history.time_range('modelreference')
+    assert np.allclose(history.get_pose('modelreference', newest),
+                bard_overlay.transform_manager.get("modelreference2tracker"))
+
+
+def test_motion_model():
+    """
+    With a constant velocity motion model the tracked poses are
+    predicted forward to the time they are drawn
+    """
+    predict_config = copy.deepcopy(config)
+    predict_config['tracker']['motion model'] = 'constant velocity'
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(predict_config, calib_dir)
+    assert bard_overlay.pose_history is not None
+
+    #a reference moving at 100 mm/s in x, last seen 50 ms ago
+    now = time()
+    poses = []
+    for step in range(3):
+        pose = np.eye(4)
+        pose[0, 3] = 10.0 * step
+        poses.append(pose)
+    for step, pose in enumerate(poses):
+        bard_overlay._apply_tracking( #pylint:disable=protected-access
+                        (['modelreference'], [now - 0.25 + 0.1 * step],
+                         [pose], [1.0]))
+
+    predicted = bard_overlay.transform_manager.get("modelreference2tracker")
+    assert 24.5 < predicted[0, 3] <= 30.0
+    assert bard_overlay.stage_timer.count('latency') == 3
+
+    predict_config['tracker']['motion model'] = 'kalman'
+    with pytest.raises(ValueError):
+        boa.BARDOverlayApp(predict_config, calib_dir)
+
+
+def test_render_on_change():
+    """
+    With render on change we only render when the video image, the
+    camera or an actor has changed
+    """
+    change_config = copy.deepcopy(config)
+    change_config['render on change'] = True
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(change_config, calib_dir)
+    _, image = bard_overlay.video_source.read()
+    tracking = bard_overlay._get_tracking(image) #pylint:disable=protected-access
+
+    #the first frame renders, repeats of it (with the same capture
+    #time) don't
+    for _ in range(3):
+        bard_overlay._render_frame( #pylint:disable=protected-access
+                        image, tracking, 1.0)
+    assert bard_overlay.skipped_renders == 2
+    assert bard_overlay.stage_timer.count('render') == 1
+
+    bard_overlay.get_actor('modelreference').GetProperty().SetOpacity(0.3)
+    bard_overlay._render_frame(image, tracking, 1.0) #pylint:disable=protected-access
+    assert bard_overlay.stage_timer.count('render') == 2
+
+    bard_overlay._render_frame(image, tracking, 2.0) #pylint:disable=protected-access
+    assert bard_overlay.stage_timer.count('render') == 3
+    assert bard_overlay.skipped_renders == 2
+
+    #without render on change, we don't look at the scene's
+    #modification times at all
+    bard_overlay = boa.BARDOverlayApp(config, calib_dir)
+    for _ in range(2):
+        bard_overlay._render_frame(image, tracking, 1.0) #pylint:disable=protected-access
+    assert bard_overlay.stage_timer.count('render') == 2
+    assert bard_overlay._rendered_mtime == 0 #pylint:disable=protected-access
+
+
+def test_adaptive_update_rate():
+    """
+    With an adaptive update rate, the rate follows the video source's
+    frame rate or the frame cost
+    """
+    rate_config = copy.deepcopy(config)
+    rate_config['update rate'] = 5
+    rate_config['adaptive update rate'] = {'hold frames' : 2}
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(rate_config, calib_dir)
+    controller = bard_overlay.rate_controller
+    assert controller.source_rate == 30.0
+    assert bard_overlay.update_rate == 5
+
+    bard_overlay.start()
+    for _ in range(4):
+        bard_overlay.update_view()
+    bard_overlay.stop()
+
+    assert controller.changes > 0
+    assert controller.reason in ['source', 'frame cost', 'minimum']
+    assert bard_overlay.update_rate == controller.rate
+    assert bard_overlay.update_rate <= 30.0
+
+    rate_config['adaptive update rate'] = {'minimum' : 0.0}
+    with pytest.raises(ValueError):
+        boa.BARDOverlayApp(rate_config, calib_dir)
+
+
+def test_frame_pool():
+    """
+    Capture should read into the frame pool's buffers, and release them
+    once the frame has been processed
+    """
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+    bard_overlay = boa.BARDOverlayApp(config, calib_dir)
+    frame_pool = bard_overlay._frame_pool #pylint:disable=protected-access
+    assert frame_pool is not None
+    assert frame_pool.get_shape() == (480, 640, 3)
+
+    for _ in range(5):
+        bard_overlay.update_view()
+    assert frame_pool.allocations == 1
+
+    pool_config = copy.deepcopy(config)
+    pool_config['camera']['frame pool'] = False
+    bard_overlay = boa.BARDOverlayApp(pool_config, calib_dir)
+    assert bard_overlay._frame_pool is None #pylint:disable=protected-access
+    bard_overlay.update_view()
+
+
+def test_video_texture():
+    """
+    The video background should be updated in place, and hold the
+    last video image in RGB
+    """
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+    bard_overlay = boa.BARDOverlayApp(config, calib_dir)
+    video_texture = bard_overlay._video_texture #pylint:disable=protected-access
+    assert video_texture is not None
+
+    _, image = bard_overlay.video_source.read()
+    tracking = bard_overlay._get_tracking(image) #pylint:disable=protected-access
+    for _ in range(3):
+        bard_overlay._render_frame(image, tracking) #pylint:disable=protected-access
+    assert video_texture.allocations == 1
+    assert np.array_equal(video_texture.buffer, image[:, :, ::-1])
+    assert bard_overlay.vtk_overlay_window.get_background_image_actor(
+                    0).GetInput() is video_texture.image_data
+
+
+def test_video_texture_resize():
+    """
+    When the frame size changes the window's extents and background
+    should follow, and the video should still be shown
+    """
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+    bard_overlay = boa.BARDOverlayApp(config, calib_dir)
+    video_texture = bard_overlay._video_texture #pylint:disable=protected-access
+    window = bard_overlay.vtk_overlay_window
+    actor = window.get_background_image_actor(0)
+
+    _, image = bard_overlay.video_source.read()
+    small = cv2.resize(image, (320, 240))
+    for frame, allocations in [(image, 1), (small, 2),
+                               (cv2.bitwise_not(small), 2), (image, 3)]:
+        video_texture.set_image(frame)
+        assert video_texture.allocations == allocations
+        height, width = frame.shape[0:2]
+        assert window.rgb_image_extent == (0, width - 1, 0, height - 1,
+                                           0, 2)
+        assert actor.GetInput() is video_texture.image_data
+        assert actor.GetInput().GetDimensions()[0:2] == (width, height)
+        assert np.array_equal(video_texture.buffer, frame[:, :, ::-1])
+        scalars = numpy_support.vtk_to_numpy(
+                        actor.GetInput().GetPointData().GetScalars())
+        assert np.array_equal(scalars[0:width * height],
+                              frame[:, :, ::-1].reshape((-1, 3)))
+
+    #if the window's buffer is replaced, we go back to using the window's
+    window.set_video_image(image)
+    video_texture.set_image(small)
+    assert video_texture.allocations == 4
+    assert video_texture.buffer is window.rgb_frame
+
+
+def test_recording(tmp_path):
+    """
+    With recording configured, the captured frames and poses should be
+    written while running
+    """
+    record_config = copy.deepcopy(config)
+    filename = str(tmp_path / 'session.bardrec')
+    record_config['recording'] = {'filename' : filename,
+                                  'compression' : 'png'}
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(record_config, calib_dir)
+    bard_overlay.start()
+    for _ in range(3):
+        bard_overlay.update_view()
+    bard_overlay.stop()
+
+    reader = SessionReader(filename)
+    assert len(reader.frames) == 3
+    _, image = reader.read_frame(0)
+    assert image.shape == (480, 640, 3)
+    poses = reader.read_poses()
+    assert len(poses['modelreference2tracker']) == 3
+
+    #without a filename we record to the out path
+    record_config['recording'] = {}
+    record_config['out path'] = str(tmp_path / 'out')
+    bard_overlay = boa.BARDOverlayApp(record_config, calib_dir)
+    assert bard_overlay.session_recorder.filename.startswith(
+                    str(tmp_path / 'out'))
+
+
+def test_timing_log_on_stop(tmp_path):
+    """
+    With log on exit, stopping should write the timing summary
+    """
+    timing_config = copy.deepcopy(config)
+    log_file = tmp_path / 'timing.log'
+    timing_config['timing'] = {'log file' : str(log_file),
+                               'log on exit' : True}
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(timing_config, calib_dir)
+    bard_overlay.start()
+    bard_overlay.update_view()
+    bard_overlay.stop()
+    assert 'render' in log_file.read_text(encoding = 'utf-8')
+
+
+def test_clashing_model_names(tmp_path):
+    """
+    Models named the same as another actor are renamed rather than
+    stopping the app starting
+    """
+    models_dir = tmp_path / 'models'
+    models_dir.mkdir()
+    shutil.copy('data/models/2_lump_scale.vtk',
+                models_dir / 'modelreference.vtk')
+    shutil.copy('data/models/2_lump_scale.vtk', models_dir / 'lump.vtk')
+
+    clash_config = copy.deepcopy(config)
+    clash_config['models'] = {'models_dir' : str(models_dir),
+                              'reference_to_model' :
+                                'data/reference_to_model.txt',
+                              'visible_anatomy' : 1}
+    calib_dir = 'data/calibration/matts_mbp_640_x_480/'
+
+    bard_overlay = boa.BARDOverlayApp(clash_config, calib_dir)
+    reference = bard_overlay.get_actor('modelreference')
+    renamed = bard_overlay.get_actor('modelreference 2')
+    assert reference is not renamed
+    assert bard_overlay.get_actor('lump') is not None